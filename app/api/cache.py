@@ -0,0 +1,200 @@
+"""Cache of rendered API responses, invalidated by the data generation of the database.
+
+Loads and summaries bump the data generation (see `app.core.schema.bump_generation`), and the
+cache drops every response when it sees a new generation. The generation is read from the
+database at most once per `CACHE_TTL` seconds, so a response can be up to that old. Responses
+are kept as rendered JSON, up to `CACHE_BYTES` bytes of bodies, least recently used first out.
+
+The ETag of a response is made from the generation and the cache key, so a request with a
+matching If-None-Match is answered 304 without a query or serializing a body.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import run_db
+from app.core.config import settings
+from app.core.queries import route_generation
+
+# a cache key: route path, then its normalized parameters
+Key = tuple
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    """Rendered response."""
+
+    body: bytes
+    headers: dict[str, str]
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """Counters of the response cache since the API started."""
+
+    hits: int = 0
+    misses: int = 0
+    # responses dropped to fit in the size of the cache
+    evictions: int = 0
+    # requests answered 304 Not Modified
+    not_modified: int = 0
+    # new data generations seen, each dropping every response
+    invalidations: int = 0
+
+
+@dataclass(slots=True)
+class ResponseCache:
+    """LRU cache of the rendered responses of one data generation, bounded by body bytes."""
+
+    max_bytes: int
+    # seconds a generation read from the database is trusted
+    ttl: float
+    generation: int | None = None
+    checked: float = float("-inf")
+    entries: OrderedDict[Key, CachedResponse] = field(default_factory=OrderedDict)
+    size: int = 0
+    stats: CacheStats = field(default_factory=CacheStats)
+
+    def set_generation(self, generation: int) -> None:
+        """Keep the newest generation seen in the database, dropping every response of older ones.
+
+        An older generation, read by a transaction that began before a load committed, is
+        ignored, so the cache never goes back to a generation it dropped.
+        """
+        self.checked = time.monotonic()
+        if self.generation is None or generation > self.generation:
+            if self.generation is not None:
+                self.stats.invalidations += 1
+            self.clear()
+            self.generation = generation
+
+    def get(self, key: Key) -> CachedResponse | None:
+        """Cached response of a key, marked as the most recently used."""
+        response = self.entries.get(key)
+        if response is not None:
+            self.entries.move_to_end(key)
+        return response
+
+    def put(self, key: Key, response: CachedResponse) -> None:
+        """Cache a response, evicting the least recently used ones to make room."""
+        if len(response.body) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key).body)
+        self.entries[key] = response
+        self.size += len(response.body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every response."""
+        self.entries.clear()
+        self.size = 0
+
+    def info(self) -> dict:
+        """Counters, size and generation of the cache."""
+        return asdict(self.stats) | {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "generation": self.generation,
+        }
+
+
+response_cache = ResponseCache(settings.CACHE_BYTES, settings.CACHE_TTL)
+
+
+def etag(key: Key, generation: int) -> str:
+    """Entity tag of the response of a key in a generation."""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    return f'"{generation}-{digest}"'
+
+
+def matches(request: Request, tag: str) -> bool:
+    """Whether the If-None-Match header of a request matches an entity tag."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or tag in tags
+
+
+def read_generation(session: Session) -> int:
+    """Data generation of the database of a session."""
+    return route_generation(session.connection())
+
+
+def render_with_generation(
+    session: Session, render: Callable[..., CachedResponse], *args
+) -> tuple[int, CachedResponse]:
+    """Render a response and read the data generation in the same transaction."""
+    return read_generation(session), render(session, *args)
+
+
+async def cached_response(
+    request: Request,
+    session: Session,
+    key: Key,
+    render: Callable[..., CachedResponse],
+    *args,
+) -> Response:
+    """Response of a route from the cache, or rendered and cached.
+
+    Parameters
+    ----------
+    request : Request
+        Request, for its If-None-Match header
+    session : Session
+        Database session
+    key : Key
+        Route path and normalized parameters, which determine the response in a generation
+    render : Callable[..., CachedResponse]
+        Function of the session and `args` running the queries of the route and rendering its
+        response, in the database threads
+    *args
+        Other arguments of `render`
+
+    Returns
+    -------
+    Response
+        304 if If-None-Match has the ETag of the response, otherwise the JSON response. The
+        X-Cache header tells whether it was cached.
+
+    """
+    cache = response_cache
+    if cache.max_bytes <= 0:
+        response = await run_db(session, render, *args)
+        return Response(response.body, headers=response.headers, media_type="application/json")
+
+    if time.monotonic() - cache.checked > cache.ttl:
+        cache.set_generation(await run_db(session, read_generation))
+    tag = etag(key, cache.generation)
+    if matches(request, tag):
+        cache.stats.not_modified += 1
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+
+    response = cache.get(key)
+    if response is not None:
+        cache.stats.hits += 1
+        state = "HIT"
+    else:
+        cache.stats.misses += 1
+        state = "MISS"
+        generation, response = await run_db(session, render_with_generation, render, *args)
+        # the response is of the generation read with it, which may be newer than the cache's,
+        # or older if its transaction began before the cache saw a load; that one is not kept
+        if generation > cache.generation:
+            cache.set_generation(generation)
+        if generation == cache.generation:
+            cache.put(key, response)
+        tag = etag(key, generation)
+    headers = response.headers | {"ETag": tag, "X-Cache": state}
+    return Response(response.body, headers=headers, media_type="application/json")
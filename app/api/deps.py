@@ -1,14 +1,121 @@
-from collections.abc import Generator
-from typing import Annotated
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Concatenate, ParamSpec, TypeVar
 
 from fastapi import Depends
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.db import engine
 
+P = ParamSpec("P")
+T = TypeVar("T")
 
-def get_db() -> Generator[Session, None, None]:
-    """Get databse session."""
+# dedicated threads of the blocking database calls, so they never hold up the event loop, and
+# at most DB_THREADS requests hold a connection at a time
+db_executor = (
+    ThreadPoolExecutor(settings.DB_THREADS, thread_name_prefix="db")
+    if settings.DB_THREADS
+    else None
+)
+
+
+async def run_db(
+    session: Session, func: Callable[Concatenate[Session, P], T], *args: P.args, **kwargs: P.kwargs
+) -> T:
+    """Run blocking queries of a session in the database threads.
+
+    The session is closed in the same thread once `func` returns, so its connection goes back
+    to the pool before the thread takes the next call.
+
+    Parameters
+    ----------
+    session : Session
+        Database session, passed to `func` first
+    func : Callable
+        Function running queries
+    *args, **kwargs
+        Other arguments of `func`
+
+    Returns
+    -------
+    T
+        Result of `func`
+
+    """
+
+    def call() -> T:
+        try:
+            return func(session, *args, **kwargs)
+        finally:
+            session.close()
+
+    if db_executor is None:
+        return call()
+    return await asyncio.get_running_loop().run_in_executor(db_executor, call)
+
+
+async def stream_db(
+    session: Session,
+    func: Callable[Concatenate[Session, P], Iterator[T]],
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> AsyncIterator[T]:
+    """Iterate over the items of blocking queries of a session in the database threads.
+
+    Every item is taken in its own call to the database threads, so a long iteration holds a
+    connection but not a thread between items. The iterator is closed and the session with
+    it in the database threads, once it is exhausted or the consumer stops early.
+
+    Parameters
+    ----------
+    session : Session
+        Database session, passed to `func` first
+    func : Callable
+        Function returning an iterator over the results of its queries
+    *args, **kwargs
+        Other arguments of `func`
+
+    Yields
+    ------
+    T
+        Items of the iterator of `func`
+
+    """
+    done = object()
+    iterator = None
+
+    def step() -> T | object:
+        nonlocal iterator
+        if iterator is None:
+            iterator = func(session, *args, **kwargs)
+        return next(iterator, done)
+
+    def close() -> None:
+        try:
+            if hasattr(iterator, "close"):
+                iterator.close()
+        finally:
+            session.close()
+
+    async def call(fn: Callable[[], T]) -> T:
+        if db_executor is None:
+            return fn()
+        return await asyncio.get_running_loop().run_in_executor(db_executor, fn)
+
+    try:
+        while (item := await call(step)) is not done:
+            yield item
+    finally:
+        await call(close)
+
+
+async def get_db() -> AsyncGenerator[Session, None]:
+    """Get databse session.
+
+    The session connects on its first query, in the database threads, see `run_db`.
+    """
     with Session(engine) as session:
         yield session
 
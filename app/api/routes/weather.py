@@ -1,25 +1,308 @@
 """Weather API routes."""
 
+import base64
+import binascii
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterator, Sequence
+from datetime import date as date_type
 from datetime import datetime
+from functools import cache
+from itertools import chain
+from typing import Any, TypedDict
 
-from fastapi import APIRouter, Query
-from sqlalchemy import text
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import ColumnElement, Row, Select
 
-from app.api.deps import SessionDep
-from app.core.types import SummaryReturn, WeatherReturn
+from app.api.cache import CachedResponse, cached_response, response_cache
+from app.api.deps import SessionDep, run_db, stream_db
+from app.core.queries import (
+    AFTER_PARAM,
+    LOOKUP_PARAM,
+    export_template,
+    lookup_param,
+    route_layout,
+    station_data_template,
+    station_lookup_template,
+    summary_lookup_template,
+    summary_template,
+    unique_key,
+)
+from app.core.types import (
+    CacheReturn,
+    DecadalReturn,
+    ExportFormat,
+    MonthlyReturn,
+    Season,
+    SeasonalReturn,
+    SummaryKey,
+    SummaryReturn,
+    WeatherKey,
+    WeatherReturn,
+)
+from app.models import StationSummary
 
 router = APIRouter(prefix="/weather", tags=["weather"])
 
+# response header with the cursor of the next page, set when there are more rows
+NEXT_CURSOR = "X-Next-Cursor"
+# rows fetched and encoded at a time by an export
+EXPORT_ROWS = 5000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# keys of a lookup request
+LOOKUP_MAX = 50000
 
-@router.get("/")
+
+def encode_cursor(values: tuple) -> str:
+    """Opaque cursor of the key values of the last row of a page.
+
+    Parameters
+    ----------
+    values : tuple
+        Key values, dates as ISO text
+
+    Returns
+    -------
+    str
+        URL-safe base64 of the values as JSON
+
+    """
+    data = json.dumps(values, default=date_type.isoformat, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: list[ColumnElement]) -> tuple:
+    """Key values of a cursor from `encode_cursor`.
+
+    Parameters
+    ----------
+    cursor : str
+        Cursor from the X-Next-Cursor header of the previous page
+    keys : list[ColumnElement]
+        Key columns, to convert the values to their types
+
+    Returns
+    -------
+    tuple
+        Key values
+
+    Raises
+    ------
+    HTTPException
+        400 if the cursor was not made for these keys
+
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return tuple(
+            python_type.fromisoformat(value)
+            if issubclass(python_type, date_type)
+            else python_type(value)
+            for python_type, value in zip(
+                (key.type.python_type for key in keys), values, strict=True
+            )
+        )
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor") from e
+
+
+def station_ids(values: list[str] | None) -> tuple[str, ...]:
+    """Station IDs to select, once each and in key order.
+
+    Empty values, as in `?station_id=`, are dropped; without any other the route selects every
+    station.
+    """
+    return tuple(sorted({value for value in values or () if value}))
+
+
+def given(**values) -> dict[str, Any]:
+    """Query parameters that were given. Unset or empty parameters do not filter."""
+    return {name: value for name, value in values.items() if value}
+
+
+@cache
+def row_type(model: type[BaseModel]) -> type:
+    """Typed dict with the fields of a response model."""
+    fields = {name: field.annotation for name, field in model.model_fields.items()}
+    return TypedDict(model.__name__, fields)
+
+
+@cache
+def row_adapter(model: type[BaseModel]) -> TypeAdapter:
+    """Adapter of a JSON list of rows with the fields of a response model.
+
+    Rows are typed dicts rather than models, so they are serialized by the types of the fields
+    without building and validating a model per row. The JSON is that of the model.
+    """
+    return TypeAdapter(list[row_type(model)])
+
+
+@cache
+def line_adapter(model: type[BaseModel]) -> TypeAdapter:
+    """Adapter of a JSON row with the fields of a response model, see `row_adapter`."""
+    return TypeAdapter(row_type(model))
+
+
+@cache
+def check_columns(model: type[BaseModel], columns: tuple[str, ...]) -> None:
+    """Check the columns of rows start with the fields of a response model, once per query."""
+    fields = tuple(model.model_fields)
+    if columns[: len(fields)] != fields:
+        raise ValueError(f"Columns {columns} do not start with the fields of {model.__name__}")
+
+
+def encode_rows(model: type[BaseModel], rows: Sequence[Row]) -> bytes:
+    """JSON list of rows as a response model, from the database values as they are.
+
+    Parameters
+    ----------
+    model : type[BaseModel]
+        Response model of the rows
+    rows : Sequence[Row]
+        Rows starting with the fields of the model, in order. Columns after them are ignored.
+
+    Returns
+    -------
+    bytes
+        JSON list
+
+    """
+    if not rows:
+        return b"[]"
+    check_columns(model, rows[0]._fields)
+    fields = list(model.model_fields)
+    return row_adapter(model).dump_json([dict(zip(fields, row, strict=False)) for row in rows])
+
+
+@cache
+def lookup_adapter(model: type[BaseModel]) -> TypeAdapter:
+    """Adapter of a JSON list of rows or nulls, see `row_adapter`."""
+    return TypeAdapter(list[row_type(model) | None])
+
+
+def encode_ndjson(model: type[BaseModel], rows: Sequence[Row]) -> bytes:
+    """JSON lines of rows as a response model, see `encode_rows`."""
+    adapter, fields = line_adapter(model), list(model.model_fields)
+    return b"".join(adapter.dump_json(dict(zip(fields, row, strict=False))) + b"\n" for row in rows)
+
+
+def encode_csv(model: type[BaseModel], rows: Sequence[Row]) -> bytes:
+    """CSV lines of rows as a response model, values as in its JSON, see `encode_rows`."""
+    fields = list(model.model_fields)
+    values = row_adapter(model).dump_python(
+        [dict(zip(fields, row, strict=False)) for row in rows], mode="json"
+    )
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(value.values() for value in values)
+    return buffer.getvalue().encode()
+
+
+def render_page(session: SessionDep, model: type[BaseModel], page, *args) -> CachedResponse:
+    """Render a page of rows as the JSON list of a response model.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    model : type[BaseModel]
+        Response model of the rows
+    page : Callable
+        Function of the session and `args`, returning the rows and the cursor of the next page
+    *args
+        Other arguments of `page`
+
+    Returns
+    -------
+    CachedResponse
+        JSON body, with the X-Next-Cursor header if there is a next page
+
+    """
+    rows, next_cursor = page(session, *args)
+    headers = {NEXT_CURSOR: next_cursor} if next_cursor else {}
+    return CachedResponse(encode_rows(model, rows), headers)
+
+
+def keyset_page(
+    session: SessionDep,
+    stmt: Select,
+    keys: list[ColumnElement],
+    filters: dict[str, Any],
+    cursor: str | None,
+    limit: int,
+    offset: int,
+) -> tuple[list[Row], str | None]:
+    """Rows of a page of a template from `app.core.queries`, in the order of its unique key.
+
+    The page starts after the key of the cursor, which is a range seek on the unique index, so
+    every page of a crawl costs the same. Whether there is a next page is known by fetching one
+    row more than the limit.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    stmt : Select
+        Template of the filters, starting after a cursor if one is given
+    keys : list[ColumnElement]
+        Columns of the unique key
+    filters : dict[str, Any]
+        Values of the filters
+    cursor : str, optional
+        Cursor of the page
+    limit : int
+        pagination size
+    offset : int
+        rows skipped after the cursor
+
+    Returns
+    -------
+    tuple[list[Row], str | None]
+        Rows, followed by their key columns, and the cursor of the next page if there is one
+
+    """
+    params = {**filters, "limit": limit + 1, "offset": offset}
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        params |= {AFTER_PARAM.format(i): value for i, value in enumerate(values)}
+    rows = session.execute(stmt, params).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if rows:
+            next_cursor = encode_cursor(tuple(rows[-1][-len(keys) :]))
+    return rows, next_cursor
+
+
+def station_data_page(
+    session: SessionDep,
+    filters: dict[str, Any],
+    cursor: str | None,
+    limit: int,
+    offset: int,
+) -> tuple[list[Row], str | None]:
+    """Page of station data of the storage schema of the database, see `keyset_page`."""
+    # station_data columns on either storage schema; on schema v2 the date is bound as a day
+    # number and the station ID is matched through the stations table. Pages follow the unique
+    # (station, date) key of the schema, so on schema v2 cursors hold the station key.
+    layout = route_layout(session.connection())
+    stmt = station_data_template(layout.version, layout.clustered, tuple(filters), bool(cursor))
+    return keyset_page(session, stmt, layout.key_columns, filters, cursor, limit, offset)
+
+
+@router.get("/", response_model=list[WeatherReturn])
 async def weather_router(
+    request: Request,
     session: SessionDep,
-    station_id: str | None = Query(
+    station_id: list[str] | None = Query(
         default=None,
-        description="Station ID to select",
+        description="Station IDs to select, repeated for several stations",
         openapi_examples={
-            "example": {"summary": "Station", "value": "USC00110072"},
-            "example2": {"summary": "Station 2", "value": "USC00111436"},
+            "example": {"summary": "Station", "value": ["USC00110072"]},
+            "example2": {"summary": "Station 2", "value": ["USC00111436"]},
             "null": {"summary": "Null", "value": None},
         },
     ),
@@ -32,19 +315,50 @@ async def weather_router(
             "null": {"summary": "null", "value": None},
         },
     ),
-    limit: int = Query(default=20, description="Records return limit"),
-    offset: int = Query(default=0, description="Records returned offset from start"),
-) -> list[WeatherReturn]:
+    start_date: datetime | None = Query(
+        default=None,
+        description="First date of records, inclusive",
+        openapi_examples={
+            "example": {"summary": "1/1/1985", "value": "1985-01-01"},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    end_date: datetime | None = Query(
+        default=None,
+        description="Last date of records, inclusive",
+        openapi_examples={
+            "example": {"summary": "3/31/1985", "value": "1985-03-31"},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    cursor: str | None = Query(
+        default=None, description="Cursor of the page, from the X-Next-Cursor header"
+    ),
+    limit: int = Query(default=20, ge=1, description="Records return limit"),
+    offset: int = Query(default=0, ge=0, description="Records returned offset from the cursor"),
+) -> Response:
     """API router for weather station data endpoint
 
+    Rows are ordered by station and date. When there are more rows, the X-Next-Cursor header
+    holds the cursor of the next page. Several stations and a range of dates are read as one
+    range of the (station, date) index per station.
+
     Parameters
     ----------
+    request : Request
+        Request, for the cache
     session : SessionDep
         Database session
-    station_id : str , optional
-        station_id to select
+    station_id : list[str] , optional
+        station_ids to select
     date : datetime , optional
         date to select,
+    start_date : datetime , optional
+        first date to select
+    end_date : datetime , optional
+        last date to select
+    cursor : str, optional
+        cursor of the page
     limit : int, optional
         pagination size
     offset : int, optional
@@ -52,38 +366,256 @@ async def weather_router(
 
     Returns
     -------
-    WeatherReturn
-        JSON model
+    Response
+        JSON list of WeatherReturn
 
     """
-    if station_id and date:
-        t = text(
-            f"SELECT * FROM station_data WHERE station_id = '{station_id}' and date = date('{date}') limit {limit} offset {offset};"
-        )
-    elif station_id and not date:
-        t = text(
-            f"SELECT * FROM station_data WHERE station_id = '{station_id}' limit {limit} offset {offset};"
-        )
-    elif not station_id and date:
-        t = text(
-            f"SELECT * FROM station_data WHERE date = date('{date}') limit {limit} offset {offset};"
-        )
-    else:
-        t = text(f"SELECT * FROM station_data limit {limit} offset {offset};")
+    filters = given(
+        station_id=station_ids(station_id),
+        date=date and date.date(),
+        start_date=start_date and start_date.date(),
+        end_date=end_date and end_date.date(),
+    )
+    key = (request.url.path, *filters.items(), cursor, limit, offset)
+    args = (WeatherReturn, station_data_page, filters, cursor, limit, offset)
+    return await cached_response(request, session, key, render_page, *args)
+
+
+def export_chunks(
+    session: SessionDep, filters: dict[str, Any], export_format: ExportFormat, compress: bool
+) -> Iterator[bytes]:
+    """Chunks of an export of the station data of filters, in the order of the unique key.
+
+    Rows are fetched `EXPORT_ROWS` at a time from a server-side cursor and each batch is
+    encoded as one chunk, so memory stays the same whatever the number of rows.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    filters : dict[str, Any]
+        Values of the filters
+    export_format : ExportFormat
+        ndjson for JSON lines, csv for CSV with a header
+    compress : bool
+        Whether to gzip the chunks, each flushed so it can be decompressed as it arrives
+
+    Yields
+    ------
+    bytes
+        Chunk of the export
+
+    """
+    layout = route_layout(session.connection())
+    stmt = export_template(layout.version, layout.clustered, tuple(filters))
+    result = session.execute(stmt, filters, execution_options={"yield_per": EXPORT_ROWS})
+    check_columns(WeatherReturn, tuple(result.keys()))
+    chunks = (
+        (encode_csv if export_format == "csv" else encode_ndjson)(WeatherReturn, rows)
+        for rows in result.partitions()
+    )
+    if export_format == "csv":
+        chunks = chain([",".join(WeatherReturn.model_fields).encode() + b"\r\n"], chunks)
+    if not compress:
+        yield from chunks
+        return
+    # gzip container, unlike the zlib one of zlib.compress
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}},
+)
+async def weather_export_router(
+    session: SessionDep,
+    station_id: list[str] | None = Query(
+        default=None,
+        description="Station IDs to select, repeated for several stations",
+        openapi_examples={
+            "example": {"summary": "Station", "value": ["USC00110072"]},
+            "null": {"summary": "Null", "value": None},
+        },
+    ),
+    date: datetime | None = Query(
+        default=None,
+        description="Date of records",
+        openapi_examples={
+            "example": {"summary": "1/1/1985", "value": "1985-01-01"},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    start_date: datetime | None = Query(
+        default=None,
+        description="First date of records, inclusive",
+        openapi_examples={
+            "example": {"summary": "1/1/1985", "value": "1985-01-01"},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    end_date: datetime | None = Query(
+        default=None,
+        description="Last date of records, inclusive",
+        openapi_examples={
+            "example": {"summary": "3/31/1985", "value": "1985-03-31"},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    export_format: ExportFormat = Query(
+        default="ndjson", alias="format", description="ndjson for JSON lines, or csv"
+    ),
+    gzip: bool = Query(default=False, description="Compress the export with gzip"),
+) -> StreamingResponse:
+    """API router to export weather station data in one streamed response
+
+    Every row of the filters is streamed, ordered by station and date, without pagination.
+    Rows have the fields of the weather endpoint.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    station_id : list[str] , optional
+        station_ids to select
+    date : datetime , optional
+        date to select
+    start_date : datetime , optional
+        first date to select
+    end_date : datetime , optional
+        last date to select
+    export_format : ExportFormat, optional
+        ndjson or csv
+    gzip : bool, optional
+        compress with gzip, as the Content-Encoding of the response
+
+    Returns
+    -------
+    StreamingResponse
+        Rows as JSON lines or CSV
+
+    """
+    filters = given(
+        station_id=station_ids(station_id),
+        date=date and date.date(),
+        start_date=start_date and start_date.date(),
+        end_date=end_date and end_date.date(),
+    )
+    headers = {"Content-Disposition": f'attachment; filename="weather.{export_format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_db(session, export_chunks, filters, export_format, gzip),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers,
+    )
+
+
+def lookup_rows(
+    session: SessionDep,
+    model: type[BaseModel],
+    stmt: Select,
+    matches: list[ColumnElement],
+    keys: list[BaseModel],
+) -> bytes:
+    """JSON list of the rows of keys from a lookup template, in the order of the keys.
+
+    Every distinct key is looked up once, in one query, and matched back to its row by the
+    fields of the key, which the rows have too.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    model : type[BaseModel]
+        Response model of the rows
+    stmt : Select
+        Lookup template from `app.core.queries`
+    matches : list[ColumnElement]
+        Columns matched by the template, in the order of the fields of the keys
+    keys : list[BaseModel]
+        Keys to look up
+
+    Returns
+    -------
+    bytes
+        JSON list of a row or null for each key
+
+    """
+    if not keys:
+        return b"[]"
+    names = list(type(keys[0]).model_fields)
+    values = [tuple(getattr(key, name) for name in names) for key in keys]
+    param = lookup_param(session.connection().dialect, matches, sorted(set(values)))
+    rows = session.execute(stmt, {LOOKUP_PARAM: param}).all()
+    if rows:
+        check_columns(model, rows[0]._fields)
+    fields = list(model.model_fields)
+    found = {
+        tuple(getattr(row, name) for name in names): dict(zip(fields, row, strict=False))
+        for row in rows
+    }
+    return lookup_adapter(model).dump_json([found.get(value) for value in values])
 
-    result = session.execute(t)
-    return [WeatherReturn.model_validate(row._asdict()) for row in result]
 
+def station_data_lookup(session: SessionDep, keys: list[WeatherKey]) -> bytes:
+    """Station data of stations and dates, on the storage schema of the database."""
+    layout = route_layout(session.connection())
+    stmt = station_lookup_template(layout.version, layout.clustered)
+    return lookup_rows(session, WeatherReturn, stmt, [layout.station_id, layout.date], keys)
 
-@router.get("/summary")
+
+@router.post("/lookup", response_model=list[WeatherReturn | None])
+async def weather_lookup_router(
+    session: SessionDep,
+    keys: list[WeatherKey] = Body(
+        max_length=LOOKUP_MAX,
+        description="Stations and dates to look up",
+        openapi_examples={
+            "example": {
+                "summary": "Two days",
+                "value": [
+                    {"station_id": "USC00110072", "date": "1985-01-01"},
+                    {"station_id": "USC00111436", "date": "1985-10-20"},
+                ],
+            },
+        },
+    ),
+) -> Response:
+    """API router to look up weather station data of many stations and dates at once
+
+    Every station and date is resolved in one query.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    keys : list[WeatherKey]
+        stations and dates to look up
+
+    Returns
+    -------
+    Response
+        JSON list of WeatherReturn in the order of the keys, null for keys without data
+
+    """
+    body = await run_db(session, station_data_lookup, keys)
+    return Response(body, media_type="application/json")
+
+
+@router.get("/summary", response_model=list[SummaryReturn])
 async def weather_stats_router(
+    request: Request,
     session: SessionDep,
-    station_id: str | None = Query(
+    station_id: list[str] | None = Query(
         default=None,
-        description="Station ID to select",
+        description="Station IDs to select, repeated for several stations",
         openapi_examples={
-            "example": {"summary": "Station 1", "value": "USC00110072"},
-            "example2": {"summary": "Station 2", "value": "USC00111436"},
+            "example": {"summary": "Station 1", "value": ["USC00110072"]},
+            "example2": {"summary": "Station 2", "value": ["USC00111436"]},
             "null": {"summary": "Null", "value": None},
         },
     ),
@@ -96,19 +628,49 @@ async def weather_stats_router(
             "null": {"summary": "null", "value": None},
         },
     ),
-    limit: int = Query(default=20),
-    offset: int = Query(default=0),
-) -> list[SummaryReturn]:
+    start_year: int | None = Query(
+        default=None,
+        description="First year to select, inclusive",
+        openapi_examples={
+            "example": {"summary": "1985", "value": 1985},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    end_year: int | None = Query(
+        default=None,
+        description="Last year to select, inclusive",
+        openapi_examples={
+            "example": {"summary": "1990", "value": 1990},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    cursor: str | None = Query(
+        default=None, description="Cursor of the page, from the X-Next-Cursor header"
+    ),
+    limit: int = Query(default=20, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> Response:
     """API router to return summary statistics from weather stations
 
+    Rows are ordered by station and year. When there are more rows, the X-Next-Cursor header
+    holds the cursor of the next page.
+
     Parameters
     ----------
+    request : Request
+        Request, for the cache
     session : SessionDep
         Database session
-    station_id : str , optional
-        station_id to select
+    station_id : list[str] , optional
+        station_ids to select
     year : int , optional
         year to select
+    start_year : int , optional
+        first year to select
+    end_year : int , optional
+        last year to select
+    cursor : str, optional
+        cursor of the page
     limit : int, optional
         pagination size
     offset : int, optional
@@ -116,24 +678,268 @@ async def weather_stats_router(
 
     Returns
     -------
-    SummaryReturn
-        JSON model
+    Response
+        JSON list of SummaryReturn
 
     """
-    if station_id and year:
-        t = text(
-            f"SELECT * FROM station_summary WHERE station_id = '{station_id}' and year = '{year}' limit {limit} offset {offset};"
-        )
-    elif station_id and not year:
-        t = text(
-            f"SELECT * FROM station_summary WHERE station_id = '{station_id}' limit {limit} offset {offset};"
-        )
-    elif not station_id and year:
-        t = text(
-            f"SELECT * FROM station_summary WHERE year = '{year}' limit {limit} offset {offset};"
-        )
-    else:
-        t = text(f"SELECT * FROM station_summary limit {limit} offset {offset};")
+    filters = given(
+        station_id=station_ids(station_id), year=year, start_year=start_year, end_year=end_year
+    )
+    stmt = summary_template("station_summary", tuple(filters), bool(cursor))
+
+    keys = unique_key(StationSummary.__table__)
+    key = (request.url.path, *filters.items(), cursor, limit, offset)
+    args = (SummaryReturn, keyset_page, stmt, keys, filters, cursor, limit, offset)
+    return await cached_response(request, session, key, render_page, *args)
+
+
+def summary_lookup(session: SessionDep, keys: list[SummaryKey]) -> bytes:
+    """Summaries of stations and years."""
+    table = StationSummary.__table__
+    stmt = summary_lookup_template(table.name, ("station_id", "year"))
+    return lookup_rows(session, SummaryReturn, stmt, [table.c.station_id, table.c.year], keys)
+
+
+@router.post("/summary/lookup", response_model=list[SummaryReturn | None])
+async def weather_summary_lookup_router(
+    session: SessionDep,
+    keys: list[SummaryKey] = Body(
+        max_length=LOOKUP_MAX,
+        description="Stations and years to look up",
+        openapi_examples={
+            "example": {
+                "summary": "Two years",
+                "value": [
+                    {"station_id": "USC00110072", "year": 1985},
+                    {"station_id": "USC00111436", "year": 2000},
+                ],
+            },
+        },
+    ),
+) -> Response:
+    """API router to look up summary statistics of many stations and years at once
+
+    Every station and year is resolved in one query.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    keys : list[SummaryKey]
+        stations and years to look up
+
+    Returns
+    -------
+    Response
+        JSON list of SummaryReturn in the order of the keys, null for keys without a summary
+
+    """
+    body = await run_db(session, summary_lookup, keys)
+    return Response(body, media_type="application/json")
+
+
+def rollup_page(
+    session: SessionDep, table: str, filters: dict[str, Any], limit: int, offset: int
+) -> tuple[list[Row], None]:
+    """Rows of a rollup table, filtered on the given values, from its template.
+
+    Rows are ordered by the rollup key, which is the order of its unique index but for seasons
+    in calendar order, so a station's rollup is read as one index range.
+
+    Parameters
+    ----------
+    session : SessionDep
+        Database session
+    table : str
+        Rollup table
+    filters : dict[str, Any]
+        Column values to select
+    limit : int
+        pagination size
+    offset : int
+        offset for pagination
+
+    Returns
+    -------
+    tuple[list[Row], None]
+        Rows, with their keys, and no cursor: rollups are paged by offset only
+
+    """
+    stmt = summary_template(table, tuple(filters), False)
+    rows = session.execute(stmt, {**filters, "limit": limit, "offset": offset}).all()
+    return rows, None
+
+
+@router.get("/summary/monthly", response_model=list[MonthlyReturn])
+async def weather_monthly_router(
+    request: Request,
+    session: SessionDep,
+    station_id: list[str] | None = Query(
+        default=None,
+        description="Station IDs to select, repeated for several stations",
+        openapi_examples={
+            "example": {"summary": "Station 1", "value": ["USC00110072"]},
+            "null": {"summary": "Null", "value": None},
+        },
+    ),
+    year: int | None = Query(
+        default=None,
+        description="Year to select",
+        openapi_examples={
+            "example": {"summary": "1985", "value": 1985},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    month: int | None = Query(default=None, ge=1, le=12, description="Month to select, 1-12"),
+    limit: int = Query(default=20, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> Response:
+    """API router to return monthly summary statistics from weather stations
+
+    Parameters
+    ----------
+    request : Request
+        Request, for the cache
+    session : SessionDep
+        Database session
+    station_id : list[str] , optional
+        station_ids to select
+    year : int , optional
+        year to select
+    month : int , optional
+        month to select
+    limit : int, optional
+        pagination size
+    offset : int, optional
+        offsent for pagination
+
+    Returns
+    -------
+    Response
+        JSON list of MonthlyReturn
+
+    """
+    filters = given(station_id=station_ids(station_id), year=year, month=month)
+    key = (request.url.path, *filters.items(), limit, offset)
+    args = (MonthlyReturn, rollup_page, "station_monthly", filters, limit, offset)
+    return await cached_response(request, session, key, render_page, *args)
+
+
+@router.get("/summary/seasonal", response_model=list[SeasonalReturn])
+async def weather_seasonal_router(
+    request: Request,
+    session: SessionDep,
+    station_id: list[str] | None = Query(
+        default=None,
+        description="Station IDs to select, repeated for several stations",
+        openapi_examples={
+            "example": {"summary": "Station 1", "value": ["USC00110072"]},
+            "null": {"summary": "Null", "value": None},
+        },
+    ),
+    year: int | None = Query(
+        default=None,
+        description="Year to select. The DJF season of a year starts in December of the year before",
+        openapi_examples={
+            "example": {"summary": "1985", "value": 1985},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    season: Season | None = Query(default=None, description="Season to select"),
+    limit: int = Query(default=20, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> Response:
+    """API router to return seasonal summary statistics from weather stations
 
-    result = session.execute(t)
-    return [SummaryReturn.model_validate(row._asdict()) for row in result]
+    Parameters
+    ----------
+    request : Request
+        Request, for the cache
+    session : SessionDep
+        Database session
+    station_id : list[str] , optional
+        station_ids to select
+    year : int , optional
+        year to select
+    season : Season , optional
+        season to select, one of DJF, MAM, JJA, SON
+    limit : int, optional
+        pagination size
+    offset : int, optional
+        offsent for pagination
+
+    Returns
+    -------
+    Response
+        JSON list of SeasonalReturn
+
+    """
+    filters = given(station_id=station_ids(station_id), year=year, season=season)
+    key = (request.url.path, *filters.items(), limit, offset)
+    args = (SeasonalReturn, rollup_page, "station_seasonal", filters, limit, offset)
+    return await cached_response(request, session, key, render_page, *args)
+
+
+@router.get("/summary/decadal", response_model=list[DecadalReturn])
+async def weather_decadal_router(
+    request: Request,
+    session: SessionDep,
+    station_id: list[str] | None = Query(
+        default=None,
+        description="Station IDs to select, repeated for several stations",
+        openapi_examples={
+            "example": {"summary": "Station 1", "value": ["USC00110072"]},
+            "null": {"summary": "Null", "value": None},
+        },
+    ),
+    decade: int | None = Query(
+        default=None,
+        description="Decade to select, by its first year",
+        openapi_examples={
+            "example": {"summary": "1980s", "value": 1980},
+            "null": {"summary": "null", "value": None},
+        },
+    ),
+    limit: int = Query(default=20, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> Response:
+    """API router to return decadal summary statistics from weather stations
+
+    Parameters
+    ----------
+    request : Request
+        Request, for the cache
+    session : SessionDep
+        Database session
+    station_id : list[str] , optional
+        station_ids to select
+    decade : int , optional
+        decade to select
+    limit : int, optional
+        pagination size
+    offset : int, optional
+        offsent for pagination
+
+    Returns
+    -------
+    Response
+        JSON list of DecadalReturn
+
+    """
+    filters = given(station_id=station_ids(station_id), decade=decade)
+    key = (request.url.path, *filters.items(), limit, offset)
+    args = (DecadalReturn, rollup_page, "station_decadal", filters, limit, offset)
+    return await cached_response(request, session, key, render_page, *args)
+
+
+@router.get("/cache")
+async def weather_cache_router() -> CacheReturn:
+    """API router to return the counters of the response cache
+
+    Returns
+    -------
+    CacheReturn
+        JSON model
+
+    """
+    return CacheReturn.model_validate(response_cache.info())
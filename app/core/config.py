@@ -12,6 +12,13 @@ class Settings(BaseSettings):
 
     INSTANCE_DIR: Path = Path("./db")
     DB: str = "weather.db"
+    # threads running the database calls of the API, and connections kept by its pool. 0 runs
+    # database calls on the event loop.
+    DB_THREADS: int = 8
+    # bytes of rendered responses cached by the API, 0 to disable, and seconds the data
+    # generation of the cache is trusted before it is read again
+    CACHE_BYTES: int = 64 << 20
+    CACHE_TTL: float = 1.0
 
     @computed_field
     @property
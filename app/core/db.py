@@ -1,16 +1,61 @@
 """Database creation function. Creates from all models."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import Table, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import Insert as PostgresInsert
+from sqlalchemy.dialects.sqlite import Insert as SQLiteInsert
 from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
 
 Base = declarative_base()
-engine = create_engine(f"sqlite:///{settings.SQLALCHEMY_DATABASE_URI}")
+# tables of schema v2 only, kept apart so that creating Base's tables builds a schema v1 database
+BaseV2 = declarative_base()
+engine = create_engine(
+    f"sqlite:///{settings.SQLALCHEMY_DATABASE_URI}", pool_size=max(settings.DB_THREADS, 5)
+)
 
 
-def init_db():
-    """Initializes database with all SQLAlchemy models."""
-    import app.models  # noqa
+def init_db(version: int = 1, clustered: bool = False):
+    """Initializes database with all SQLAlchemy models.
 
-    Base.metadata.create_all(engine)
+    Parameters
+    ----------
+    version : int, optional
+        Storage schema of station data, 1 or 2, by default 1. See `app.core.schema`
+    clustered : bool, optional
+        Create station data and the summaries as clustered WITHOUT ROWID tables, by default
+        False
+
+    """
+    from app.core.schema import create_schema
+
+    create_schema(engine, version, clustered)
+
+
+def upsert(table: Table, dialect_name: str) -> SQLiteInsert | PostgresInsert:
+    """Dialect specific insert supporting ON CONFLICT.
+
+    Parameters
+    ----------
+    table : Table
+        Table to insert into
+    dialect_name : str
+        SQLAlchemy dialect name, sqlite or postgresql
+
+    Returns
+    -------
+    SQLiteInsert | PostgresInsert
+        Insert statement
+
+    Raises
+    ------
+    ValueError
+        For other databases
+
+    """
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    raise ValueError(f"Upserts are not supported for {dialect_name} databases")
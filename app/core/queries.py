@@ -0,0 +1,354 @@
+"""Precompiled queries of the API routes.
+
+Every route query comes from a fixed set of templates, one per route, storage layout and
+combination of filters. Values, the page size and the cursor are bound parameters, so the SQL
+text of a template never changes: each template is built once, compiled once into SQLAlchemy's
+compiled cache, and its prepared statement is reused from the statement cache of the SQLite
+connection.
+"""
+
+import json
+import operator
+from collections.abc import Callable
+from functools import cache
+from typing import TypeVar, get_args
+
+from sqlalchemy import (
+    ColumnElement,
+    FromClause,
+    Integer,
+    Select,
+    String,
+    Table,
+    UniqueConstraint,
+    and_,
+    bindparam,
+    case,
+    func,
+    inspect,
+    literal_column,
+    select,
+    tuple_,
+)
+from sqlalchemy.engine import Dialect
+from sqlalchemy.engine.base import Connection
+
+from app.core.db import Base
+from app.core.schema import LAYOUTS, StationLayout, data_generation, station_layout
+from app.core.types import Season
+from app.models import DataGeneration
+
+T = TypeVar("T")
+
+# labels of the key columns added to the rows of a page, to make the cursor of the next page
+KEY_LABEL = "key_{}"
+# bound parameters of the key values of a cursor
+AFTER_PARAM = "after_{}"
+# bound parameter of the values of a lookup
+LOOKUP_PARAM = "lookup"
+# filters bounding their column, inclusive, by the prefix of their name, e.g. start_date
+RANGE_FILTERS = {"start_": operator.ge, "end_": operator.le}
+# filters matching any of a list of values
+LIST_FILTERS = {"station_id"}
+
+
+def page_template(
+    source: FromClause,
+    columns: list[ColumnElement],
+    keys: list[ColumnElement],
+    filters: dict[str, ColumnElement],
+    after: bool,
+) -> Select:
+    """Page of rows in key order, with bound parameters for its filters, cursor and size.
+
+    Parameters
+    ----------
+    source : FromClause
+        Table or join to select from
+    columns : list[ColumnElement]
+        Columns of the rows
+    keys : list[ColumnElement]
+        Columns of the unique key, added to the rows as `key_0`, `key_1`, ...
+    filters : dict[str, ColumnElement]
+        Columns compared with the parameter of their name, see `filtered`
+    after : bool
+        Whether to start after the key bound as `after_0`, `after_1`, ...
+
+    Returns
+    -------
+    Select
+        Query with the parameters of `filters`, `limit` and `offset`
+
+    """
+    labels = [key.label(KEY_LABEL.format(i)) for i, key in enumerate(keys)]
+    stmt = filtered(select(*columns, *labels).select_from(source), filters)
+    if after:
+        values = [bindparam(AFTER_PARAM.format(i), type_=key.type) for i, key in enumerate(keys)]
+        stmt = stmt.where(tuple_(*keys) > tuple_(*values))
+    return (
+        stmt.order_by(*keys)
+        .limit(bindparam("limit", type_=Integer))
+        .offset(bindparam("offset", type_=Integer))
+    )
+
+
+def filtered(stmt: Select, filters: dict[str, ColumnElement]) -> Select:
+    """Query with each column of `filters` compared with the bound parameter of its name.
+
+    Range filters bound their column, list filters are an IN of the values of an expanding
+    parameter, and other filters are equal to their column. On a unique key a list of its
+    first column with a range of its second is a range seek of the index per value.
+    """
+    for name, column in filters.items():
+        bound = next((op for prefix, op in RANGE_FILTERS.items() if name.startswith(prefix)), None)
+        if bound is not None:
+            stmt = stmt.where(bound(column, bindparam(name)))
+        elif name in LIST_FILTERS:
+            stmt = stmt.where(column.in_(bindparam(name, expanding=True)))
+        else:
+            stmt = stmt.where(column == bindparam(name))
+    return stmt
+
+
+def filter_column(name: str) -> str:
+    """Column compared by a filter, its name without the prefix of a range filter."""
+    for prefix in RANGE_FILTERS:
+        name = name.removeprefix(prefix)
+    return name
+
+
+def unique_key(table: Table) -> list[ColumnElement]:
+    """Columns of the unique constraint of a table."""
+    constraint = next(c for c in table.constraints if isinstance(c, UniqueConstraint))
+    return list(constraint.columns)
+
+
+def season_order(season: ColumnElement) -> ColumnElement:
+    """Position of a season in the year, from 0 for DJF, which sorts seasons in calendar order."""
+    return case({name: i for i, name in enumerate(get_args(Season))}, value=season)
+
+
+def order_key(table: Table) -> list[ColumnElement]:
+    """Unique key of a table, in the order its rows are listed.
+
+    Seasons are listed in calendar order rather than by name. The index still orders the
+    columns before them, so only the seasons of each station and year are sorted.
+    """
+    return [season_order(c) if c.name == "season" else c for c in unique_key(table)]
+
+
+@cache
+def station_data_template(
+    version: int, clustered: bool, filters: tuple[str, ...], after: bool
+) -> Select:
+    """Template of the station data route, see `page_template`.
+
+    Rows are station_data columns in the order of the unique (station, date) key of the layout.
+
+    Parameters
+    ----------
+    version : int
+        Storage schema
+    clustered : bool
+        Whether the tables are clustered
+    filters : tuple[str, ...]
+        Filters, of "station_id", "date", "start_date" and "end_date"
+    after : bool
+        Whether to start after a cursor
+
+    Returns
+    -------
+    Select
+        Query
+
+    """
+    layout = LAYOUTS[version, clustered]
+    return page_template(
+        layout.source,
+        layout.columns,
+        layout.key_columns,
+        station_data_filters(layout, filters),
+        after,
+    )
+
+
+@cache
+def export_template(version: int, clustered: bool, filters: tuple[str, ...]) -> Select:
+    """Template of the station data export route: every row of the filters, in key order.
+
+    Parameters
+    ----------
+    version : int
+        Storage schema
+    clustered : bool
+        Whether the tables are clustered
+    filters : tuple[str, ...]
+        Filters, of "station_id", "date", "start_date" and "end_date"
+
+    Returns
+    -------
+    Select
+        Query with the parameters of `filters`
+
+    """
+    layout = LAYOUTS[version, clustered]
+    stmt = select(*layout.columns).select_from(layout.source)
+    return filtered(stmt, station_data_filters(layout, filters)).order_by(*layout.key_columns)
+
+
+def station_data_filters(
+    layout: StationLayout, filters: tuple[str, ...]
+) -> dict[str, ColumnElement]:
+    """Columns of the station data filters of a layout."""
+    columns = {"station_id": layout.station_id, "date": layout.date}
+    return {name: columns[filter_column(name)] for name in filters}
+
+
+@cache
+def summary_template(table_name: str, filters: tuple[str, ...], after: bool) -> Select:
+    """Template of a summary route, see `page_template`.
+
+    Rows are every column of the summary table in the order of its key, see `order_key`.
+    Clustered copies of the summary tables have the same names and columns, so they share the
+    templates.
+
+    Parameters
+    ----------
+    table_name : str
+        Summary table
+    filters : tuple[str, ...]
+        Filters, of columns of the table or ranges of them such as "start_year"
+    after : bool
+        Whether to start after a cursor
+
+    Returns
+    -------
+    Select
+        Query
+
+    """
+    table = Base.metadata.tables[table_name]
+    columns = {name: table.c[filter_column(name)] for name in filters}
+    return page_template(table, list(table.c), order_key(table), columns, after)
+
+
+def lookup_template(
+    source: FromClause, columns: list[ColumnElement], matches: list[ColumnElement]
+) -> Select:
+    """Rows with any of a list of values of some columns, from a table of the values.
+
+    The values are bound as one JSON array, see `lookup_param`, which SQLite's json_each turns
+    into the table joined on the columns. So the SQL text is the same whatever the number of
+    values, and when the columns are a unique key each value is one seek of its index.
+
+    Parameters
+    ----------
+    source : FromClause
+        Table or join to select from
+    columns : list[ColumnElement]
+        Columns of the rows
+    matches : list[ColumnElement]
+        Columns to match
+
+    Returns
+    -------
+    Select
+        Query with the `lookup` parameter, of the rows matching a value in no particular order
+
+    """
+    items = func.json_each(bindparam(LOOKUP_PARAM, type_=String)).table_valued("value")
+    lookup = select(
+        *(
+            func.json_extract(items.c.value, literal_column(f"'$[{i}]'")).label(KEY_LABEL.format(i))
+            for i in range(len(matches))
+        )
+    ).cte("lookup")
+    on = and_(*(match == value for match, value in zip(matches, lookup.c, strict=True)))
+    return select(*columns).select_from(source).join(lookup, on)
+
+
+@cache
+def station_lookup_template(version: int, clustered: bool) -> Select:
+    """Template of the station data lookup route, by station ID and date, see `lookup_template`."""
+    layout = LAYOUTS[version, clustered]
+    return lookup_template(layout.source, layout.columns, [layout.station_id, layout.date])
+
+
+@cache
+def summary_lookup_template(table_name: str, matches: tuple[str, ...]) -> Select:
+    """Template of a summary lookup route, by the given columns, see `lookup_template`."""
+    table = Base.metadata.tables[table_name]
+    return lookup_template(table, list(table.c), [table.c[name] for name in matches])
+
+
+def lookup_param(dialect: Dialect, matches: list[ColumnElement], rows: list[tuple]) -> str:
+    """JSON array of values of a lookup, each in the stored form of its column.
+
+    Parameters
+    ----------
+    dialect : Dialect
+        Dialect of the connection, whose bind processors convert the values
+    matches : list[ColumnElement]
+        Columns matched by the lookup template
+    rows : list[tuple]
+        Values of `matches` to look up
+
+    Returns
+    -------
+    str
+        Value of the `lookup` parameter
+
+    """
+    processors = [match.type.dialect_impl(dialect).bind_processor(dialect) for match in matches]
+    return json.dumps(
+        [
+            [
+                value if process is None else process(value)
+                for process, value in zip(processors, row, strict=True)
+            ]
+            for row in rows
+        ]
+    )
+
+
+def schema_cached(connection: Connection, name: str, detect: Callable[[Connection], T]) -> T:
+    """Value of `detect` for a connection, detected again only after the schema changed.
+
+    On SQLite the value is kept in the info of the pooled connection with the schema cookie,
+    which SQLite increments on every schema change, so a migration is seen by the next request.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    name : str
+        Name of the value in the connection's info
+    detect : Callable[[Connection], T]
+        Detects the value from the schema of the database
+
+    Returns
+    -------
+    T
+        Value of `detect`
+
+    """
+    if connection.dialect.name != "sqlite":
+        return detect(connection)
+    cookie = connection.exec_driver_sql("PRAGMA schema_version").scalar()
+    cached = connection.info.get(name)
+    if cached is None or cached[0] != cookie:
+        cached = connection.info[name] = (cookie, detect(connection))
+    return cached[1]
+
+
+def route_layout(connection: Connection) -> StationLayout:
+    """`station_layout` of a connection, see `schema_cached`."""
+    return schema_cached(connection, "station_layout", station_layout)
+
+
+def route_generation(connection: Connection) -> int:
+    """`data_generation` of a connection, 0 if the database has no generation yet."""
+    table = DataGeneration.__table__.name
+    if not schema_cached(connection, "has_generation", lambda c: inspect(c).has_table(table)):
+        return 0
+    return data_generation(connection)
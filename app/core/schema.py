@@ -0,0 +1,445 @@
+"""Storage schemas of weather station data.
+
+Schema v1 stores every observation in ``station_data`` with its station ID as text, its date as
+a date (ISO text on SQLite) and its measurements as floats. Schema v2 stores the station IDs
+once in ``stations`` and observations in ``station_observations``, keyed on the integer station
+key and the day number since 1970-01-01, with measurements as integer tenths. Rows and the
+unique index are several times smaller.
+
+Either schema can be created clustered, on SQLite only: station data and the summaries are
+then WITHOUT ROWID tables stored in the order of their unique key, so a station's rows are read
+from contiguous pages without a lookup from the unique index into the table. Secondary indexes
+serve lookups on dates and years alone. Ids are not the primary key of clustered tables: new
+summaries are numbered from the largest id, and station data ids are reserved in blocks from
+`id_sequences`, without an index on them.
+
+Code reading or writing station data goes through the `StationLayout` of the database. Its
+columns are those of ``station_data`` on either schema, so filters, aggregates and results are
+the same. All other tables are shared by both schemas.
+"""
+
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import (
+    Column,
+    Date,
+    ForeignKey,
+    FromClause,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    case,
+    cast,
+    extract,
+    func,
+    inspect,
+    literal,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.engine.base import Connection, Engine
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.expression import type_coerce
+
+from app.core.db import Base, upsert
+from app.models import (
+    DataGeneration,
+    Station,
+    StationData,
+    StationDecadal,
+    StationMonthly,
+    StationObservation,
+    StationSeasonal,
+    StationSummary,
+)
+
+# the epoch of day numbers, rendered inline so that expressions on it can be grouped by on
+# PostgreSQL; SQLite's date functions read Julian day numbers
+PG_EPOCH = literal_column("DATE '1970-01-01'", Date)
+JULIAN_EPOCH = literal_column("2440587.5")
+
+
+def day_date(day: ColumnElement, dialect_name: str) -> ColumnElement:
+    """SQL date of a day number for date functions such as EXTRACT.
+
+    On SQLite this is the Julian day number, which its date functions take as a date without
+    the cost of formatting it as text first.
+    """
+    day = type_coerce(day, Integer)
+    if dialect_name == "postgresql":
+        return PG_EPOCH + day
+    return type_coerce(day + JULIAN_EPOCH, Date)
+
+
+def date_day(value: ColumnElement, dialect_name: str) -> ColumnElement:
+    """SQL day number of a date."""
+    if dialect_name == "postgresql":
+        return type_coerce(value - PG_EPOCH, Integer)
+    return cast(func.julianday(value) - JULIAN_EPOCH, Integer)
+
+
+@dataclass(frozen=True, slots=True)
+class StationLayout:
+    """Where a schema version stores station data, as station_data columns.
+
+    `station_id` is the station ID text and `date` compares with and returns dates, whatever
+    the storage. Filters on them seek the unique (station, date) index of either schema.
+    """
+
+    version: int
+    # table of the observations, and its unique key, which clustered tables are stored by
+    table: Table
+    key: tuple[str, ...]
+    # `table`, joined to the stations on schema v2
+    source: FromClause
+    id: ColumnElement
+    station_id: ColumnElement
+    date: ColumnElement
+    max_temp: ColumnElement
+    min_temp: ColumnElement
+    total_precip: ColumnElement
+    clustered: bool = False
+
+    @property
+    def key_columns(self) -> list[ColumnElement]:
+        """Columns of the unique key of `table`, in index order."""
+        return [self.table.c[name] for name in self.key]
+
+    @property
+    def measurements(self) -> list[ColumnElement]:
+        """Measurement columns."""
+        return [self.max_temp, self.min_temp, self.total_precip]
+
+    @property
+    def columns(self) -> list[ColumnElement]:
+        """Every station_data column, labeled with its station_data name."""
+        names = ["id", "station_id", "date", "max_temp", "min_temp", "total_precip"]
+        return [getattr(self, name).label(name) for name in names]
+
+    @property
+    def raw_date(self) -> ColumnElement:
+        """`date` as stored, without conversion: ISO text on SQLite, day numbers on v2."""
+        return type_coerce(self.date, String if self.version == 1 else Integer)
+
+    def year(self, dialect_name: str) -> ColumnElement:
+        """SQL year of `date`."""
+        return extract("year", self.sql_date(dialect_name))
+
+    def month(self, dialect_name: str) -> ColumnElement:
+        """SQL month of `date`."""
+        return extract("month", self.sql_date(dialect_name))
+
+    def sql_date(self, dialect_name: str) -> ColumnElement:
+        """`date` as an SQL date for date functions, see `day_date`."""
+        return self.date if self.version == 1 else day_date(self.date, dialect_name)
+
+
+data_table = StationData.__table__
+observation_table = StationObservation.__table__
+station_table = Station.__table__
+
+# WITHOUT ROWID tables of clustered databases, created instead of the tables of the same name
+CLUSTERED = MetaData()
+# next id of the clustered station data table, reserved in blocks by the loaders
+id_sequences = Table(
+    "id_sequences",
+    CLUSTERED,
+    Column("name", String(50), primary_key=True),
+    Column("next_id", Integer, nullable=False),
+    sqlite_with_rowid=False,
+)
+
+
+def clustered_table(
+    table: Table,
+    key: tuple[str, ...],
+    *lookups: tuple[str, ...],
+    covering: bool = True,
+    id_index: bool = True,
+) -> Table:
+    """WITHOUT ROWID copy of a table, with its unique key as primary key.
+
+    Parameters
+    ----------
+    table : Table
+        Table to copy, with an id column
+    key : tuple[str, ...]
+        Columns of the unique key
+    *lookups : tuple[str, ...]
+        Leading columns of the secondary indexes. Entries of a WITHOUT ROWID index hold the
+        primary key as well
+    covering : bool, optional
+        Add the other columns to the secondary indexes, so lookups are answered from the index
+        alone, by default True
+    id_index : bool, optional
+        Index the id, which new rows are numbered from, by default True. Otherwise ids are
+        reserved from `id_sequences`
+
+    Returns
+    -------
+    Table
+        Table in `CLUSTERED`
+
+    """
+    columns = [
+        Column(
+            c.name,
+            c.type,
+            *(ForeignKey(fk.column) for fk in c.foreign_keys),
+            primary_key=c.name in key,
+            nullable=c.nullable and c.name not in key and c.name != "id",
+        )
+        for c in table.c
+    ]
+    rest = [c.name for c in table.c if c.name not in key]
+    indexes = [
+        Index(
+            f"ix_{table.name}_{'_'.join(lookup)}",
+            *lookup,
+            *(c for c in rest if c not in lookup and covering),
+        )
+        for lookup in lookups
+    ]
+    if id_index:
+        indexes.append(Index(f"ix_{table.name}_id", "id"))
+    return Table(table.name, CLUSTERED, *columns, *indexes, sqlite_with_rowid=False)
+
+
+# clustered tables keyed on name; station data is looked up by primary key from the date
+# indexes, which would otherwise be as large as the tables
+CLUSTERED_TABLES = {
+    t.name: t
+    for t in [
+        clustered_table(
+            data_table, ("station_id", "date"), ("date",), covering=False, id_index=False
+        ),
+        clustered_table(
+            observation_table, ("station_key", "day"), ("day",), covering=False, id_index=False
+        ),
+        clustered_table(StationSummary.__table__, ("station_id", "year"), ("year",)),
+        clustered_table(
+            StationMonthly.__table__,
+            ("station_id", "year", "month"),
+            ("year", "month"),
+            ("month",),
+        ),
+        clustered_table(
+            StationSeasonal.__table__,
+            ("station_id", "year", "season"),
+            ("year", "season"),
+            ("season",),
+        ),
+        clustered_table(StationDecadal.__table__, ("station_id", "decade"), ("decade",)),
+    ]
+}
+
+
+def is_clustered(table: Table) -> bool:
+    """Whether a table is the clustered copy of a table."""
+    return table.metadata is CLUSTERED
+
+
+def new_ids(
+    first: ColumnElement | int, new: ColumnElement, order_by: ColumnElement | list[ColumnElement]
+) -> ColumnElement:
+    """Ids of the rows of an INSERT ... SELECT into a clustered table.
+
+    Rows new to the table, where `new` is true, are numbered from `first` in `order_by` order,
+    as rowids would be. Rows that conflict keep their ids.
+    """
+    return first + func.sum(case((new, 1), else_=0)).over(order_by=order_by) - 1
+
+
+def reserve_ids(connection: Connection, table: Table, count: int) -> int:
+    """Reserve a block of ids of a clustered station data table.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    table : Table
+        Clustered station data table
+    count : int
+        Ids to reserve
+
+    Returns
+    -------
+    int
+        First id of the block
+
+    """
+    stmt = (
+        update(id_sequences)
+        .where(id_sequences.c.name == table.name)
+        .values(next_id=id_sequences.c.next_id + count)
+        .returning(id_sequences.c.next_id - count)
+    )
+    return connection.scalar(stmt)
+
+
+def reset_id_sequences(connection: Connection) -> None:
+    """Set the next id of the clustered station data of a database past its largest id."""
+    names = set(inspect(connection).get_table_names())
+    connection.execute(id_sequences.delete())
+    for name in [data_table.name, observation_table.name]:
+        if name in names:
+            table = CLUSTERED_TABLES[name]
+            connection.execute(
+                id_sequences.insert().from_select(
+                    ["name", "next_id"],
+                    select(literal(table.name), func.coalesce(func.max(table.c.id), 0) + 1),
+                )
+            )
+
+
+def add_missing_columns(bind: Engine | Connection, table: Table) -> None:
+    """Add the columns of a table that a database created before them does not have.
+
+    Columns are added as nullable with ALTER TABLE, which SQLite and PostgreSQL run without
+    rewriting the rows.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return add_missing_columns(connection, table)
+    existing = {c["name"] for c in inspect(bind).get_columns(table.name)}
+    for column in table.c:
+        if column.name not in existing:
+            type_ = column.type.compile(bind.dialect)
+            bind.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {type_}")
+
+
+def bump_generation(connection: Connection) -> None:
+    """Move the data generation of a database on, in the connection's transaction.
+
+    The first generation is the time in microseconds, so a recreated database does not repeat
+    the generations of the database it replaced.
+    """
+    table = DataGeneration.__table__
+    stmt = upsert(table, connection.dialect.name).values(id=1, generation=time.time_ns() // 1000)
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.id], set_={"generation": table.c.generation + 1}
+        )
+    )
+
+
+def data_generation(connection: Connection) -> int:
+    """Data generation of a database, 0 if it was never bumped."""
+    table = DataGeneration.__table__
+    return connection.scalar(select(table.c.generation).where(table.c.id == 1)) or 0
+
+
+def station_layout_of(data: Table, clustered: bool) -> StationLayout:
+    """Layout of the station data in `data`, station_data or station_observations."""
+    if clustered:
+        data = CLUSTERED_TABLES[data.name]
+    if data.name == data_table.name:
+        return StationLayout(
+            version=1,
+            table=data,
+            key=("station_id", "date"),
+            source=data,
+            id=data.c.id,
+            station_id=data.c.station_id,
+            date=data.c.date,
+            max_temp=data.c.max_temp,
+            min_temp=data.c.min_temp,
+            total_precip=data.c.total_precip,
+            clustered=clustered,
+        )
+    return StationLayout(
+        version=2,
+        table=data,
+        key=("station_key", "day"),
+        source=data.join(station_table, data.c.station_key == station_table.c.id),
+        id=data.c.id,
+        station_id=station_table.c.station_id,
+        date=data.c.day,
+        max_temp=data.c.max_temp,
+        min_temp=data.c.min_temp,
+        total_precip=data.c.total_precip,
+        clustered=clustered,
+    )
+
+
+V1 = station_layout_of(data_table, clustered=False)
+V2 = station_layout_of(observation_table, clustered=False)
+# layouts keyed on schema version and whether the tables are clustered
+LAYOUTS = {
+    (1, False): V1,
+    (2, False): V2,
+    (1, True): station_layout_of(data_table, clustered=True),
+    (2, True): station_layout_of(observation_table, clustered=True),
+}
+VERSIONS = [1, 2]
+
+
+def schema_version(bind: Engine | Connection) -> int:
+    """Storage schema of a database: 2 if it has station_observations, otherwise 1."""
+    return 2 if inspect(bind).has_table(observation_table.name) else 1
+
+
+def schema_clustered(bind: Engine | Connection) -> bool:
+    """Whether the tables of a database are clustered, i.e. it has id sequences."""
+    return inspect(bind).has_table(id_sequences.name)
+
+
+def station_layout(bind: Engine | Connection) -> StationLayout:
+    """Layout of the station data of a database."""
+    return LAYOUTS[schema_version(bind), schema_clustered(bind)]
+
+
+def summary_table(table: Table, clustered: bool) -> Table:
+    """Summary table, or its clustered copy."""
+    return CLUSTERED_TABLES[table.name] if clustered else table
+
+
+def create_schema(bind: Engine | Connection, version: int = 1, clustered: bool = False) -> None:
+    """Create the tables of a schema version that do not exist yet.
+
+    Parameters
+    ----------
+    bind : Engine | Connection
+        SQLAlchemy engine or connection
+    version : int, optional
+        1 for station_data, 2 for stations and station_observations, by default 1
+    clustered : bool, optional
+        Create station data and the summaries as clustered WITHOUT ROWID tables, with id
+        sequences and secondary indexes on dates and years, by default False
+
+    Raises
+    ------
+    ValueError
+        For unknown versions, or clustered tables on another database than SQLite
+
+    """
+    if version not in VERSIONS:
+        raise ValueError(f"Unknown schema version {version}, expected one of {VERSIONS}")
+    if clustered and bind.dialect.name != "sqlite":
+        raise ValueError("Clustered tables are only supported on SQLite")
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return create_schema(connection, version, clustered)
+
+    data = LAYOUTS[version, clustered].table
+    # shared tables, then the stations of schema v2 and the station data
+    shared = [t for t in Base.metadata.sorted_tables if t is not data_table]
+    if clustered:
+        shared = [t for t in shared if t.name not in CLUSTERED_TABLES]
+    Base.metadata.create_all(bind, tables=shared)
+    if version == 2:
+        station_table.create(bind, checkfirst=True)
+    if not clustered:
+        data.create(bind, checkfirst=True)
+        return
+    summaries = [
+        t
+        for name, t in CLUSTERED_TABLES.items()
+        if name not in (data_table.name, observation_table.name)
+    ]
+    CLUSTERED.create_all(bind, tables=[id_sequences, data, *summaries])
+    reset_id_sequences(bind)
@@ -1,7 +1,13 @@
 from datetime import date
+from typing import Literal
 
 from pydantic import BaseModel
 
+# meteorological seasons; December counts towards the winter (DJF) of the following year
+Season = Literal["DJF", "MAM", "JJA", "SON"]
+# formats of the station data export: JSON lines, or CSV with a header
+ExportFormat = Literal["ndjson", "csv"]
+
 
 class WeatherReturn(BaseModel):
     """Return output model for weather route."""
@@ -14,12 +20,91 @@ class WeatherReturn(BaseModel):
     total_precip: float | None
 
 
+class WeatherKey(BaseModel):
+    """Input model of a weather lookup: a station and date."""
+
+    station_id: str
+    date: date
+
+
+class SummaryKey(BaseModel):
+    """Input model of a summary lookup: a station and year."""
+
+    station_id: str
+    year: int
+
+
 class SummaryReturn(BaseModel):
-    """Return output model for summary route."""
+    """Return output model for summary route.
+
+    Counts are of the days with a value; standard deviations are of the daily values.
+    """
+
+    id: int
+    station_id: str
+    year: int
+    avg_max_temp: float | None
+    avg_min_temp: float | None
+    cumulative_precip: float | None
+    n_max_temp: int | None
+    min_max_temp: float | None
+    max_max_temp: float | None
+    stddev_max_temp: float | None
+    n_min_temp: int | None
+    min_min_temp: float | None
+    max_min_temp: float | None
+    stddev_min_temp: float | None
+    n_precip: int | None
+    precip_days: int | None
+
+
+class MonthlyReturn(BaseModel):
+    """Return output model for monthly summary route."""
 
     id: int
     station_id: str
     year: int
+    month: int
     avg_max_temp: float | None
     avg_min_temp: float | None
     cumulative_precip: float | None
+
+
+class SeasonalReturn(BaseModel):
+    """Return output model for seasonal summary route."""
+
+    id: int
+    station_id: str
+    year: int
+    season: Season
+    avg_max_temp: float | None
+    avg_min_temp: float | None
+    cumulative_precip: float | None
+
+
+class DecadalReturn(BaseModel):
+    """Return output model for decadal summary route."""
+
+    id: int
+    station_id: str
+    decade: int
+    avg_max_temp: float | None
+    avg_min_temp: float | None
+    cumulative_precip: float | None
+
+
+class CacheReturn(BaseModel):
+    """Return output model for the response cache route.
+
+    Counters are since the API started; the size and generation are of the cached responses.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    not_modified: int
+    invalidations: int
+    entries: int
+    bytes: int
+    max_bytes: int
+    generation: int | None
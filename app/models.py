@@ -1,8 +1,52 @@
 """SQLAlchemy models."""
 
-from sqlalchemy import Column, Date, Float, Integer, String, UniqueConstraint
+from datetime import date, datetime, timedelta
 
-from app.core.db import Base
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    TypeDecorator,
+    UniqueConstraint,
+)
+
+from app.core.db import Base, BaseV2
+
+# day 0 of the day numbers of schema v2
+EPOCH = date(1970, 1, 1)
+
+
+class DayNumber(TypeDecorator):
+    """Date stored as an integer count of days since 1970-01-01.
+
+    Dates (and datetimes, by their date) are converted when bound and day numbers are returned
+    as dates, so the column compares with and returns dates like a `Date` column.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    @property
+    def python_type(self) -> type:
+        """Values are dates."""
+        return date
+
+    def process_bind_param(self, value: date | int | None, dialect) -> int | None:
+        """Day number of a date."""
+        if isinstance(value, datetime):
+            value = value.date()
+        if isinstance(value, date):
+            return (value - EPOCH).days
+        return value
+
+    def process_result_value(self, value: int | None, dialect) -> date | None:
+        """Date of a day number."""
+        return None if value is None else EPOCH + timedelta(days=value)
 
 
 class StationData(Base):
@@ -25,6 +69,9 @@ class StationData(Base):
 class StationSummary(Base):
     """Class for Weather Station summaries.
 
+    Besides averages and the cumulative precipitation, holds the count of days with a value of
+    each measurement, the extremes and sample standard deviation of each temperature, and the
+    count of days with precipitation.
     Includes unique constraint for station / year combination.
     """
 
@@ -35,5 +82,169 @@ class StationSummary(Base):
     avg_max_temp = Column(Float, default=None, nullable=True)
     avg_min_temp = Column(Float, default=None, nullable=True)
     cumulative_precip = Column(Float, default=None, nullable=True)
+    n_max_temp = Column(Integer, default=None, nullable=True)
+    min_max_temp = Column(Float, default=None, nullable=True)
+    max_max_temp = Column(Float, default=None, nullable=True)
+    stddev_max_temp = Column(Float, default=None, nullable=True)
+    n_min_temp = Column(Integer, default=None, nullable=True)
+    min_min_temp = Column(Float, default=None, nullable=True)
+    max_min_temp = Column(Float, default=None, nullable=True)
+    stddev_min_temp = Column(Float, default=None, nullable=True)
+    n_precip = Column(Integer, default=None, nullable=True)
+    precip_days = Column(Integer, default=None, nullable=True)
 
     __table_args__ = (UniqueConstraint("station_id", "year", name="station_year_constraint"),)
+
+
+class StationMonthly(Base):
+    """Class for Weather Station monthly summaries.
+
+    Includes unique constraint for station / year / month combination.
+    """
+
+    __tablename__ = "station_monthly"
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String(50), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    avg_max_temp = Column(Float, default=None, nullable=True)
+    avg_min_temp = Column(Float, default=None, nullable=True)
+    cumulative_precip = Column(Float, default=None, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("station_id", "year", "month", name="station_month_constraint"),
+    )
+
+
+class StationSeasonal(Base):
+    """Class for Weather Station seasonal summaries.
+
+    Seasons are meteorological: DJF, MAM, JJA and SON. December counts towards the winter of
+    the following year, so the DJF season of 1986 spans December 1985 to February 1986.
+    Includes unique constraint for station / year / season combination.
+    """
+
+    __tablename__ = "station_seasonal"
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String(50), nullable=False)
+    year = Column(Integer, nullable=False)
+    season = Column(String(3), nullable=False)
+    avg_max_temp = Column(Float, default=None, nullable=True)
+    avg_min_temp = Column(Float, default=None, nullable=True)
+    cumulative_precip = Column(Float, default=None, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("station_id", "year", "season", name="station_season_constraint"),
+    )
+
+
+class StationDecadal(Base):
+    """Class for Weather Station decadal summaries.
+
+    Decades are named by their first year, e.g. 1980 for 1980 to 1989.
+    Includes unique constraint for station / decade combination.
+    """
+
+    __tablename__ = "station_decadal"
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String(50), nullable=False)
+    decade = Column(Integer, nullable=False)
+    avg_max_temp = Column(Float, default=None, nullable=True)
+    avg_min_temp = Column(Float, default=None, nullable=True)
+    cumulative_precip = Column(Float, default=None, nullable=True)
+
+    __table_args__ = (UniqueConstraint("station_id", "decade", name="station_decade_constraint"),)
+
+
+class StationDataChange(Base):
+    """Class for (station, year) groups of station_data changed since the last summary.
+
+    Written by the loader and cleared by incremental summarizing.
+    """
+
+    __tablename__ = "station_data_changes"
+    station_id = Column(String(50), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+
+
+class StationExportChange(Base):
+    """Class for (station, year) groups of station_data changed since the last export.
+
+    Written by the loader alongside station_data_changes and cleared by exporting, so each
+    consumer of the changes clears only its own log.
+    """
+
+    __tablename__ = "station_export_changes"
+    station_id = Column(String(50), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+
+
+class DataGeneration(Base):
+    """Class for the generation of the data, bumped by every load or summary that writes.
+
+    A single row. The API caches responses per generation.
+    """
+
+    __tablename__ = "data_generation"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    generation = Column(BigInteger, nullable=False)
+
+
+class IngestManifest(Base):
+    """Class for source files already ingested into station_data.
+
+    Keyed on the resolved file path. Size, modification time and content hash identify the
+    version of the file that was loaded.
+    """
+
+    __tablename__ = "ingest_manifest"
+    path = Column(String, primary_key=True)
+    station_id = Column(String(50), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    ingested_at = Column(DateTime, nullable=False)
+
+
+class IngestWatermark(Base):
+    """Class for the latest date ingested per station.
+
+    A station may be loaded from several files, e.g. a plain file and a bundle, so the watermark
+    is kept per station rather than per manifest entry.
+    """
+
+    __tablename__ = "ingest_watermarks"
+    station_id = Column(String(50), primary_key=True)
+    last_date = Column(Date, nullable=False)
+
+
+class Station(BaseV2):
+    """Class for the weather stations of schema v2.
+
+    Station IDs are stored once here and referenced from observations by integer key.
+    """
+
+    __tablename__ = "stations"
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String(50), nullable=False, unique=True)
+
+
+class StationObservation(BaseV2):
+    """Class for Weather Station data of schema v2, in place of station_data.
+
+    Dates are day numbers and measurements integer tenths, as in the source files.
+    Includes unique constraint for station key / day combination.
+    """
+
+    __tablename__ = "station_observations"
+    # the primary key is the rowid on SQLite, a separate index on it would only take space
+    id = Column(Integer, primary_key=True)
+    station_key = Column(Integer, ForeignKey("stations.id"), nullable=False)
+    day = Column(DayNumber, nullable=False)
+    max_temp = Column(Integer, default=None, nullable=True)
+    min_temp = Column(Integer, default=None, nullable=True)
+    total_precip = Column(Integer, default=None, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("station_key", "day", name="station_observation_constraint"),
+    )
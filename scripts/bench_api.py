@@ -0,0 +1,177 @@
+"""Load test the API with many concurrent clients.
+
+For every number of database threads, the API is started with uvicorn on a loaded and
+summarized SQLite database, and concurrent clients request random pages of the station data
+and summary routes. The throughput and latency of those requests are reported, with the
+latency of the health check during the run, which shows whether the event loop was held up by
+the database. With 0 threads, database calls run on the event loop, as before the threads.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine
+
+from scripts.bench_queries import make_requests
+
+HOST = "127.0.0.1"
+
+
+def request_urls(db: Path, n: int, limit: int) -> list[str]:
+    """Paths of random requests of the station data and summary routes."""
+    urls = []
+    for route, station_id, value in make_requests(create_engine(f"sqlite:///{db}"), n):
+        params = {"limit": limit, "station_id": station_id}
+        params |= {"date": value} if route == "weather" else {"year": value}
+        query = "&".join(f"{k}={v}" for k, v in params.items() if v)
+        urls.append(f"/weather/{'' if route == 'weather' else 'summary'}?{query}")
+    return urls
+
+
+async def load(port: int, urls: list[str], clients: int) -> dict:
+    """Request every URL with concurrent clients, while checking health every 10 ms.
+
+    Parameters
+    ----------
+    port : int
+        Port of the API
+    urls : list[str]
+        Paths to request
+    clients : int
+        Concurrent clients
+
+    Returns
+    -------
+    dict
+        Requests per second, and latencies of the requests and health checks in ms
+
+    """
+    queue = iter(urls)
+    latencies, health = [], []
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=clients + 1)
+    async with httpx.AsyncClient(base_url=f"http://{HOST}:{port}", limits=limits) as client:
+
+        async def worker() -> None:
+            for url in queue:
+                start = time.perf_counter()
+                response = await client.get(url)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        async def check_health() -> None:
+            while not done.is_set():
+                start = time.perf_counter()
+                (await client.get("/health")).raise_for_status()
+                health.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        checker = asyncio.create_task(check_health())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        seconds = time.perf_counter() - start
+        done.set()
+        await checker
+    return {
+        "requests/s": len(urls) / seconds,
+        "p50 ms": np.percentile(latencies, 50) * 1e3,
+        "p99 ms": np.percentile(latencies, 99) * 1e3,
+        "health p99 ms": np.percentile(health, 99) * 1e3,
+    }
+
+
+def serve(db: Path, threads: int, port: int) -> subprocess.Popen:
+    """Start the API with uvicorn on a database and wait until it is healthy."""
+    env = os.environ | {
+        "INSTANCE_DIR": str(db.parent),
+        "DB": db.name,
+        "DB_THREADS": str(threads),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(port)]
+        + ["--log-level", "warning", "--no-access-log"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://{HOST}:{port}/health").raise_for_status()
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("The API did not start")
+
+
+def main(
+    db: Path, threads: list[int], clients: int, n_requests: int, limit: int, port: int
+) -> None:
+    """Load test the API at each number of database threads.
+
+    Parameters
+    ----------
+    db : Path
+        Loaded and summarized SQLite database
+    threads : list[int]
+        Numbers of database threads to start the API with
+    clients : int
+        Concurrent clients
+    n_requests : int
+        Requests per run
+    limit : int
+        Page size of the requests
+    port : int
+        Port of the API
+
+    """
+    urls = request_urls(db, n_requests, limit)
+    names = ["requests/s", "p50 ms", "p99 ms", "health p99 ms"]
+    print(f"{clients} clients, {n_requests} requests of up to {limit} rows")
+    print(f"{'threads':>8}" + "".join(f"{name:>15}" for name in names))
+    for n in threads:
+        server = serve(db, n, port)
+        try:
+            # warm the caches and the page cache of the database
+            asyncio.run(load(port, urls[: clients * 2], clients))
+            result = asyncio.run(load(port, urls, clients))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{n:>8}" + "".join(f"{result[name]:>15.1f}" for name in names))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API with concurrent clients")
+    parser.add_argument(
+        "-s",
+        "--sqlite-db",
+        type=Path,
+        default=Path("./db/weather.db"),
+        help="Path of the SQLite database (default: ./db/weather.db)",
+    )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[0, 8],
+        help="Database threads of the API, one run per number (default: 0 8)",
+    )
+    parser.add_argument(
+        "-c", "--clients", type=int, default=100, help="Concurrent clients (default: 100)"
+    )
+    parser.add_argument(
+        "-n", "--requests", type=int, default=5000, help="Requests per run (default: 5000)"
+    )
+    parser.add_argument("-l", "--limit", type=int, default=20, help="Page size (default: 20)")
+    parser.add_argument("-p", "--port", type=int, default=8765, help="Port (default: 8765)")
+
+    args = parser.parse_args()
+    main(args.sqlite_db.resolve(), args.threads, args.clients, args.requests, args.limit, args.port)
@@ -0,0 +1,111 @@
+"""Benchmark the station_data upsert paths in rows per second.
+
+Files are parsed once up front so only the database writes are timed. Every method loads the
+files twice into a fresh database: first into empty tables (inserts), then again over the
+loaded rows (conflicts turned into updates).
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine.base import Connection
+
+from app.core.db import Base
+from scripts.load import get_files, upsert_executemany, upsert_multi_values
+from scripts.parse import StationBatch, read_station_file
+
+
+def legacy(connection: Connection, batch: StationBatch) -> int:
+    """Multi-VALUES statement per 999 rows, as loaded before executemany."""
+    return upsert_multi_values(connection, [(None, *row) for row in batch.rows()], 999)
+
+
+def multi_values(connection: Connection, batch: StationBatch) -> int:
+    """Multi-VALUES statement sized to the runtime parameter limit."""
+    return upsert_multi_values(connection, [(None, *row) for row in batch.rows()])
+
+
+def executemany(connection: Connection, batch: StationBatch) -> int:
+    """Precompiled single row upsert run with executemany."""
+    return upsert_executemany(connection, batch.rows(iso_dates=True))
+
+
+METHODS: dict[str, Callable[[Connection, StationBatch], int]] = {
+    "legacy (999 rows)": legacy,
+    "multi-values (auto)": multi_values,
+    "executemany": executemany,
+}
+
+
+def run(batches: list[StationBatch], method: Callable[[Connection, StationBatch], int]) -> dict:
+    """Time a load into empty tables and a reload of the same batches.
+
+    Parameters
+    ----------
+    batches : list[StationBatch]
+        Parsed files
+    method : Callable[[Connection, StationBatch], int]
+        Upsert function
+
+    Returns
+    -------
+    dict
+        Rows per second of the insert and update passes
+
+    """
+    n_rows = sum(len(b) for b in batches)
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        for phase in ("insert", "update"):
+            start = time.perf_counter()
+            for batch in batches:
+                with engine.begin() as connection:
+                    method(connection, batch)
+            result[phase] = n_rows / (time.perf_counter() - start)
+        engine.dispose()
+    return result
+
+
+def main(data_dir: str, n_files: int) -> None:
+    """Parse files then benchmark each upsert method.
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory to find station text files
+    n_files : int
+        Number of files to load
+
+    """
+    batches = [b for f in get_files(data_dir)[:n_files] if (b := read_station_file(f))]
+    print(f"{len(batches)} files, {sum(len(b) for b in batches)} rows")
+    print(f"{'method':<22}{'insert rows/s':>16}{'update rows/s':>16}")
+    for name, method in METHODS.items():
+        result = run(batches, method)
+        print(f"{name:<22}{result['insert']:>16,.0f}{result['update']:>16,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark station_data upsert paths")
+    parser.add_argument(
+        "-d",
+        "--dir",
+        default="./data",
+        help="Data directory to load from (default: local 'data' dir)",
+    )
+    parser.add_argument(
+        "-n",
+        "--files",
+        type=int,
+        default=20,
+        help="Number of files to load (default: 20)",
+    )
+
+    args = parser.parse_args()
+    main(args.dir, args.files)
@@ -0,0 +1,155 @@
+"""Benchmark the per-request query overhead of the weather routes.
+
+The same random requests of the station data and summary routes are run against a loaded and
+summarized database through each query method, and the mean time per request is reported.
+Only the queries are timed: each request opens a session like the API, runs its query and
+fetches the rows, without HTTP or response models.
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.orm import Session
+
+from app.core.db import engine as base_engine
+from app.core.queries import route_layout, station_data_template, summary_template
+from app.core.schema import station_layout
+from app.models import StationSummary
+
+# a request: route, then the station ID and date or year it filters on, if any
+Request = tuple[str, str | None, date | int | None]
+
+
+def fstrings(session: Session, request: Request, limit: int) -> list:
+    """SQL text with the values formatted in, as the routes were first written."""
+    route, station_id, value = request
+    if route == "weather":
+        table, condition = "station_data", "date = date('{}')"
+    else:
+        table, condition = "station_summary", "year = '{}'"
+    conditions = [f"station_id = '{station_id}'"] if station_id else []
+    if value:
+        conditions.append(condition.format(value))
+    where = f"WHERE {' and '.join(conditions)} " if conditions else ""
+    return session.execute(text(f"SELECT * FROM {table} {where}limit {limit} offset 0;")).all()
+
+
+def statements(session: Session, request: Request, limit: int) -> list:
+    """Statement built for every request from the detected layout, with the values bound."""
+    route, station_id, value = request
+    if route == "weather":
+        layout = station_layout(session.connection())
+        stmt = select(*layout.columns).select_from(layout.source)
+        if station_id:
+            stmt = stmt.where(layout.station_id == station_id)
+        if value:
+            stmt = stmt.where(layout.date == value)
+        keys = layout.key_columns
+    else:
+        summary = StationSummary.__table__
+        stmt = select(summary)
+        if station_id:
+            stmt = stmt.where(summary.c.station_id == station_id)
+        if value:
+            stmt = stmt.where(summary.c.year == value)
+        keys = [summary.c.station_id, summary.c.year]
+    stmt = stmt.add_columns(*(key.label(f"key_{i}") for i, key in enumerate(keys)))
+    return session.execute(stmt.order_by(*keys).limit(limit + 1)).all()
+
+
+def templates(session: Session, request: Request, limit: int) -> list:
+    """Precompiled templates of `app.core.queries`, as the routes run them."""
+    route, station_id, value = request
+    filters = {"station_id": station_id and (station_id,)}
+    if route == "weather":
+        layout = route_layout(session.connection())
+        filters = {k: v for k, v in (filters | {"date": value}).items() if v}
+        stmt = station_data_template(layout.version, layout.clustered, tuple(filters), False)
+    else:
+        filters = {k: v for k, v in (filters | {"year": value}).items() if v}
+        stmt = summary_template("station_summary", tuple(filters), False)
+    return session.execute(stmt, {**filters, "limit": limit + 1, "offset": 0}).all()
+
+
+METHODS: dict[str, Callable[[Session, Request, int], list]] = {
+    "f-strings": fstrings,
+    "statements per request": statements,
+    "precompiled templates": templates,
+}
+
+
+def make_requests(engine: Engine, n: int, seed: int = 0) -> list[Request]:
+    """Random requests of stations, dates and years of the database."""
+    rng = random.Random(seed)
+    with engine.connect() as connection:
+        summary = StationSummary.__table__
+        keys = connection.execute(select(summary.c.station_id, summary.c.year)).all()
+    requests = []
+    for _ in range(n):
+        station_id, year = rng.choice(keys)
+        day = date(year, 1, 1) + timedelta(days=rng.randrange(365))
+        route = rng.choice(["weather", "summary"])
+        value = day if route == "weather" else year
+        # every combination of filters, as the API is called
+        station_id, value = rng.choice(
+            [(station_id, value), (station_id, None), (None, value), (station_id, value)]
+        )
+        requests.append((route, station_id, value))
+    return requests
+
+
+def main(engine: Engine, n_requests: int, limit: int) -> None:
+    """Time every query method on the same requests.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine of a loaded and summarized database
+    n_requests : int
+        Requests per method
+    limit : int
+        Page size
+
+    """
+    requests = make_requests(engine, n_requests)
+    version = station_layout(engine).version
+    print(f"{'method':<24}{'us/request':>12}")
+    for name, method in METHODS.items():
+        if name == "f-strings" and version != 1:
+            continue
+        # warm the caches and the page cache of the database
+        for request in requests[:100]:
+            with Session(engine) as session:
+                method(session, request, limit)
+        start = time.perf_counter()
+        for request in requests:
+            with Session(engine) as session:
+                method(session, request, limit)
+        seconds = time.perf_counter() - start
+        print(f"{name:<24}{seconds / n_requests * 1e6:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the query overhead of the routes")
+    parser.add_argument(
+        "-s",
+        "--sqlite-db",
+        help="Database string (default: the application database)",
+    )
+    parser.add_argument(
+        "-n",
+        "--requests",
+        type=int,
+        default=5000,
+        help="Requests per method (default: 5000)",
+    )
+    parser.add_argument("-l", "--limit", type=int, default=20, help="Page size (default: 20)")
+
+    args = parser.parse_args()
+    engine = create_engine(args.sqlite_db) if args.sqlite_db else base_engine
+    main(engine, args.requests, args.limit)
@@ -0,0 +1,114 @@
+"""Benchmark the serialization of the station data route.
+
+Pages of station data are fetched once at each page size, then serialized to JSON as the route
+did before, with a model validated per row and the list validated and serialized again for the
+return annotation, and as it does now, from the rows through a typed adapter. The mean time
+of each is reported, with the time of the query for scale.
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Callable, Sequence
+
+from pydantic import TypeAdapter
+from sqlalchemy import Row, create_engine
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.orm import Session
+
+from app.api.routes.weather import encode_rows
+from app.core.db import engine as base_engine
+from app.core.queries import route_layout, station_data_template
+from app.core.types import WeatherReturn
+
+# adapter of the return annotation, as FastAPI validates and serializes it
+RETURN_ADAPTER = TypeAdapter(list[WeatherReturn])
+
+
+def models_per_row(rows: Sequence[Row]) -> bytes:
+    """A model validated per row, then the list validated and serialized for the annotation."""
+    fields = set(WeatherReturn.model_fields)
+    models = [
+        WeatherReturn.model_validate({k: v for k, v in row._asdict().items() if k in fields})
+        for row in rows
+    ]
+    content = RETURN_ADAPTER.dump_python(RETURN_ADAPTER.validate_python(models), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def typed_rows(rows: Sequence[Row]) -> bytes:
+    """Rows serialized through the typed adapter of the route."""
+    return encode_rows(WeatherReturn, rows)
+
+
+METHODS: dict[str, Callable[[Sequence[Row]], bytes]] = {
+    "models per row": models_per_row,
+    "typed rows": typed_rows,
+}
+
+
+def fetch(engine: Engine, limit: int) -> tuple[list[Row], float]:
+    """First page of station data of a size, and the seconds its query took."""
+    with Session(engine) as session:
+        layout = route_layout(session.connection())
+        stmt = station_data_template(layout.version, layout.clustered, (), False)
+        start = time.perf_counter()
+        rows = session.execute(stmt, {"limit": limit, "offset": 0}).all()
+        return rows, time.perf_counter() - start
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    """Mean seconds of a call, over at least `repeat` calls and 0.5 s."""
+    calls, start = 0, time.perf_counter()
+    while calls < repeat or time.perf_counter() - start < 0.5:
+        func()
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+
+def main(engine: Engine, limits: list[int], repeat: int) -> None:
+    """Time every serialization method at each page size.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine of a loaded database
+    limits : list[int]
+        Page sizes
+    repeat : int
+        Minimum calls per method and page size
+
+    """
+    print(f"{'limit':>8}{'query ms':>12}" + "".join(f"{name + ' ms':>20}" for name in METHODS))
+    for limit in limits:
+        rows, _ = fetch(engine, limit)
+        query = timed(lambda limit=limit: fetch(engine, limit), repeat)
+        bodies = {name: method(rows) for name, method in METHODS.items()}
+        if len(set(bodies.values())) != 1:
+            raise RuntimeError("Serialization methods disagree")
+        times = [timed(lambda m=method, rows=rows: m(rows), repeat) for method in METHODS.values()]
+        print(f"{len(rows):>8}{query * 1e3:>12.2f}" + "".join(f"{t * 1e3:>20.2f}" for t in times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the serialization of the routes")
+    parser.add_argument(
+        "-s",
+        "--sqlite-db",
+        help="Database string (default: the application database)",
+    )
+    parser.add_argument(
+        "-l",
+        "--limits",
+        type=int,
+        nargs="+",
+        default=[20, 1000, 50000],
+        help="Page sizes (default: 20 1000 50000)",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5, help="Minimum calls per timing (default: 5)"
+    )
+
+    args = parser.parse_args()
+    engine = create_engine(args.sqlite_db) if args.sqlite_db else base_engine
+    main(engine, args.limits, args.repeat)
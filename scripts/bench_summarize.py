@@ -0,0 +1,108 @@
+"""Benchmark the summarize engines as the volume of station data grows.
+
+For every data size the first N station files are loaded into a fresh database, then the
+summaries are rebuilt from empty tables with the SQL GROUP BY engine and with the NumPy engine
+at each worker count. Only the summarize step is timed.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.engine.base import Engine
+
+from app.core.db import Base
+from app.models import StationData, StationDecadal, StationMonthly, StationSeasonal, StationSummary
+from scripts.load import get_files, iter_batches, write_batch
+from scripts.summarize import summarize_stations
+
+SUMMARY_TABLES = [StationSummary, StationMonthly, StationSeasonal, StationDecadal]
+
+
+def run(engine: Engine, method: str, workers: int) -> float:
+    """Time a full summarize into empty summary tables.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine of the loaded database
+    method : str
+        Summarize engine, "sql" or "numpy"
+    workers : int
+        Worker processes of the numpy engine
+
+    Returns
+    -------
+    float
+        Seconds taken
+
+    """
+    with engine.begin() as connection:
+        for model in SUMMARY_TABLES:
+            connection.execute(delete(model))
+    start = time.perf_counter()
+    summarize_stations(engine, method=method, workers=workers)
+    return time.perf_counter() - start
+
+
+def main(data_dir: str, sizes: list[int], workers: list[int]) -> None:
+    """Load growing numbers of files and benchmark each summarize engine.
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory to find station text files
+    sizes : list[int]
+        Numbers of files to load
+    workers : list[int]
+        Worker counts to run the numpy engine with
+
+    """
+    files = get_files(data_dir)
+    engines = [("sql", 1), *(("numpy", w) for w in workers)]
+    names = [f"{m} x{w}" if m == "numpy" else m for m, w in engines]
+    print(f"{'files':>6}{'rows':>12}" + "".join(f"{n + ' s':>14}" for n in names))
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            with engine.begin() as connection:
+                for _, batch in iter_batches(files[:size]):
+                    if batch:
+                        write_batch(connection, batch)
+                n_rows = connection.scalar(select(func.count()).select_from(StationData))
+            seconds = [run(engine, m, w) for m, w in engines]
+            print(f"{size:>6}{n_rows:>12,}" + "".join(f"{s:>14.2f}" for s in seconds))
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the summarize engines")
+    parser.add_argument(
+        "-d",
+        "--dir",
+        default="./data",
+        help="Data directory to load from (default: local 'data' dir)",
+    )
+    parser.add_argument(
+        "-n",
+        "--files",
+        type=int,
+        nargs="+",
+        default=[10, 40, 160],
+        help="Numbers of files to load, one benchmark per number (default: 10 40 160)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, os.cpu_count() or 1}),
+        help="Worker counts of the numpy engine (default: 1 and the CPU count)",
+    )
+
+    args = parser.parse_args()
+    main(args.dir, args.files, args.workers)
@@ -1,5 +1,6 @@
 """Create initial database from models."""
 
+import argparse
 import logging
 
 from app.core.db import init_db
@@ -8,12 +9,37 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def main() -> None:
-    """Create initial database."""
+def main(version: int = 1, clustered: bool = False) -> None:
+    """Create initial database.
+
+    Parameters
+    ----------
+    version : int, optional
+        Storage schema of station data, by default 1
+    clustered : bool, optional
+        Cluster station data and the summaries on their keys, by default False
+
+    """
     logger.info("Creating initial data")
-    init_db()
+    init_db(version, clustered)
     logger.info("Initial data created")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Create the application database")
+    parser.add_argument(
+        "--schema",
+        type=int,
+        choices=[1, 2],
+        default=1,
+        help="Storage schema of station data; 2 is the compact integer schema (default: 1)",
+    )
+    parser.add_argument(
+        "--clustered",
+        action="store_true",
+        help="Store station data and the summaries as WITHOUT ROWID tables clustered on their "
+        "keys, with indexes on dates and years (SQLite only)",
+    )
+
+    args = parser.parse_args()
+    main(args.schema, args.clustered)
@@ -0,0 +1,427 @@
+"""Export station tables to a columnar dataset for bulk analytical reads.
+
+``station_data`` is written hive partitioned as ``station_data/station_id=<id>/year=<year>/``
+and ``station_summary`` as ``station_summary/station_id=<id>/``, either as Parquet or as
+uncompressed Arrow IPC files. Exports are incremental: a fingerprint of every partition is kept
+in ``_export_state.json`` next to the dataset and only partitions whose fingerprint changed are
+rewritten. Partitions whose rows were deleted from the database are removed. After the first
+export, only the station_data partitions of the groups the loader logged in
+``station_export_changes`` since are hashed again.
+
+Requires ``pyarrow`` (``pip install app[export]``).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from itertools import groupby
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+from sqlalchemy import Integer, create_engine, delete, select
+from sqlalchemy.engine.base import Connection, Engine
+
+from app.core.db import engine as base_engine
+from app.core.schema import station_layout
+from app.models import StationExportChange, StationSummary
+
+FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+STATE_FILE = "_export_state.json"
+
+STATION_DATA_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("station_id", pa.string()),
+        ("year", pa.int32()),
+        ("date", pa.date32()),
+        ("max_temp", pa.float64()),
+        ("min_temp", pa.float64()),
+        ("total_precip", pa.float64()),
+    ]
+)
+STATION_SUMMARY_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("station_id", pa.string()),
+        ("year", pa.int32()),
+        ("avg_max_temp", pa.float64()),
+        ("avg_min_temp", pa.float64()),
+        ("cumulative_precip", pa.float64()),
+        ("n_max_temp", pa.int32()),
+        ("min_max_temp", pa.float64()),
+        ("max_max_temp", pa.float64()),
+        ("stddev_max_temp", pa.float64()),
+        ("n_min_temp", pa.int32()),
+        ("min_min_temp", pa.float64()),
+        ("max_min_temp", pa.float64()),
+        ("stddev_min_temp", pa.float64()),
+        ("n_precip", pa.int32()),
+        ("precip_days", pa.int32()),
+    ]
+)
+PARTITIONING = {
+    "station_data": ds.partitioning(
+        pa.schema([("station_id", pa.string()), ("year", pa.int32())]), flavor="hive"
+    ),
+    "station_summary": ds.partitioning(pa.schema([("station_id", pa.string())]), flavor="hive"),
+}
+
+
+def partition_path(table: str, key: tuple) -> str:
+    """Directory of a partition relative to the dataset root."""
+    names = PARTITIONING[table].schema.names
+    return "/".join([table, *(f"{n}={v}" for n, v in zip(names, key, strict=True))])
+
+
+def station_years(keys: Iterable[tuple]) -> Iterator[tuple[str, list[int]]]:
+    """Years of each station of sorted (station_id, year) keys."""
+    for station_id, station_keys in groupby(keys, key=lambda k: k[0]):
+        yield station_id, [int(k[1]) for k in station_keys]
+
+
+def station_data_fingerprints(
+    connection: Connection, keys: list[tuple] | None = None
+) -> dict[str, str]:
+    """Hash the rows of (station_id, year) partitions of station_data.
+
+    Rows are read in the order of the unique (station, date) key, so each partition is a run
+    of rows hashed as it is read, and any added, removed or changed row changes its hash.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    keys : list[tuple] | None, optional
+        (station_id, year) of the partitions to hash, sorted, by default every partition.
+        Partitions without rows are left out
+
+    Returns
+    -------
+    dict[str, str]
+        SHA-256 of the rows keyed on partition path
+
+    """
+    layout = station_layout(connection)
+    stmt = select(layout.id, layout.station_id, layout.date, *layout.measurements).select_from(
+        layout.source
+    )
+    if keys is None:
+        stmts = [stmt.order_by(*layout.key_columns)]
+    else:
+        year = layout.year(connection.dialect.name).cast(Integer)
+        # seek on the (station, date) index per station, then keep the given years
+        stmts = [
+            stmt.where(layout.station_id == station_id, year.in_(years)).order_by(layout.date)
+            for station_id, years in station_years(keys)
+        ]
+    fingerprints = {}
+    for stmt in stmts:
+        rows = connection.execution_options(yield_per=10000).execute(stmt)
+        for (station_id, year), partition_rows in groupby(
+            rows, key=lambda r: (r.station_id, r.date.year)
+        ):
+            digest = hashlib.sha256()
+            for row in partition_rows:
+                digest.update(repr(tuple(row)).encode())
+            fingerprints[partition_path("station_data", (station_id, year))] = digest.hexdigest()
+    return fingerprints
+
+
+def station_summary_fingerprints(connection: Connection) -> dict[str, str]:
+    """Hash the summary rows of every station.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+
+    Returns
+    -------
+    dict[str, str]
+        SHA-256 of the rows keyed on partition path
+
+    """
+    rows = connection.execute(
+        select(StationSummary.__table__).order_by(StationSummary.station_id, StationSummary.year)
+    )
+    return {
+        partition_path("station_summary", (station_id,)): hashlib.sha256(
+            repr([tuple(r) for r in station_rows]).encode()
+        ).hexdigest()
+        for station_id, station_rows in groupby(rows, key=lambda r: r.station_id)
+    }
+
+
+def station_data_tables(connection: Connection, keys: Iterable[tuple]) -> Iterator[pa.Table]:
+    """Read changed station_data partitions, one station at a time.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    keys : Iterable[tuple]
+        (station_id, year) of the partitions to read, sorted
+
+    Yields
+    ------
+    pa.Table
+        Rows of the changed years of a station
+
+    """
+    layout = station_layout(connection)
+    year = layout.year(connection.dialect.name).cast(Integer)
+    columns = STATION_DATA_SCHEMA.names
+    for station_id, years in station_years(keys):
+        stmt = (
+            select(
+                layout.id,
+                layout.station_id,
+                year.label("year"),
+                layout.date,
+                *layout.measurements,
+            )
+            .select_from(layout.source)
+            # seek on the (station, date) index, then keep the changed years
+            .where(layout.station_id == station_id, year.in_(years))
+            .order_by(layout.date)
+        )
+        rows = connection.execute(stmt).all()
+        yield pa.Table.from_pydict(
+            dict(zip(columns, zip(*rows, strict=True), strict=True)), schema=STATION_DATA_SCHEMA
+        )
+
+
+def station_summary_table(connection: Connection, station_ids: list[str]) -> pa.Table:
+    """Read the summary rows of the given stations.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    station_ids : list[str]
+        Stations to read
+
+    Returns
+    -------
+    pa.Table
+        Summary rows
+
+    """
+    stmt = (
+        select(StationSummary.__table__)
+        .where(StationSummary.station_id.in_(station_ids))
+        .order_by(StationSummary.station_id, StationSummary.year)
+    )
+    rows = connection.execute(stmt).all()
+    columns = [c.name for c in StationSummary.__table__.columns]
+    return pa.Table.from_pydict(
+        dict(zip(columns, zip(*rows, strict=True), strict=True)), schema=STATION_SUMMARY_SCHEMA
+    )
+
+
+def write_partitions(out_dir: Path, table: str, data: pa.Table, format: str) -> None:
+    """Write rows to their partitions, replacing the files of every partition written."""
+    ds.write_dataset(
+        data,
+        out_dir / table,
+        format=FORMATS[format],
+        partitioning=PARTITIONING[table],
+        basename_template="part-{i}." + format,
+        existing_data_behavior="delete_matching",
+    )
+
+
+def remove_partitions(out_dir: Path, paths: Iterable[str]) -> None:
+    """Remove partition directories, and station directories left empty."""
+    for path in paths:
+        partition = out_dir / path
+        shutil.rmtree(partition, ignore_errors=True)
+        parent = partition.parent
+        if parent.name.startswith("station_id=") and not any(parent.iterdir()):
+            parent.rmdir()
+
+
+def read_state(out_dir: Path) -> dict:
+    """Read the fingerprints of the last export, empty if there was none."""
+    try:
+        return json.loads((out_dir / STATE_FILE).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def write_state(out_dir: Path, state: dict) -> None:
+    """Write the export fingerprints atomically."""
+    tmp = out_dir / f"{STATE_FILE}.tmp"
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, out_dir / STATE_FILE)
+
+
+def export(
+    engine: Engine, out_dir: Path | str, format: str = "parquet", full: bool = False
+) -> dict:
+    """Export station_data and station_summary partitions changed since the last export.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine
+    out_dir : Path | str
+        Dataset root directory
+    format : str, optional
+        "parquet" or "arrow" (uncompressed Arrow IPC), by default "parquet"
+    full : bool, optional
+        Rewrite every partition regardless of the last export, by default False
+
+    Returns
+    -------
+    dict
+        Count of partitions written and removed per table
+
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = read_state(out_dir)
+    if full or state.get("format") != format:
+        # a format switch leaves no file to keep
+        for table in PARTITIONING:
+            shutil.rmtree(out_dir / table, ignore_errors=True)
+        state = {}
+
+    counts = {}
+    # one transaction so the fingerprints describe the rows exported, and the change log is
+    # cleared of the changes they saw
+    with engine.begin() as connection:
+        changes = StationExportChange.__table__
+        changes.create(connection, checkfirst=True)
+        if connection.dialect.name == "postgresql":
+            # hold off loaders logging new changes until the log is cleared with this transaction
+            connection.exec_driver_sql(f"LOCK TABLE {changes.name} IN SHARE ROW EXCLUSIVE MODE")
+        if "station_data" in state:
+            # only partitions of the groups loaded since the last export can have changed
+            keys = sorted(connection.execute(select(changes.c.station_id, changes.c.year)))
+            logged = {partition_path("station_data", key) for key in keys}
+            station_data = {
+                path: fingerprint
+                for path, fingerprint in state["station_data"].items()
+                if path not in logged
+            } | station_data_fingerprints(connection, keys)
+        else:
+            station_data = station_data_fingerprints(connection)
+        fingerprints = {
+            "station_data": station_data,
+            "station_summary": station_summary_fingerprints(connection),
+        }
+        for table, current in fingerprints.items():
+            previous = state.get(table, {})
+            changed = sorted(p for p, f in current.items() if previous.get(p) != f)
+            removed = sorted(previous.keys() - current.keys())
+            if changed:
+                keys = [tuple(part.split("=", 1)[1] for part in p.split("/")[1:]) for p in changed]
+                if table == "station_data":
+                    keys = [(station_id, int(year)) for station_id, year in keys]
+                    for data in station_data_tables(connection, keys):
+                        write_partitions(out_dir, table, data, format)
+                else:
+                    station_ids = [station_id for (station_id,) in keys]
+                    write_partitions(
+                        out_dir, table, station_summary_table(connection, station_ids), format
+                    )
+            remove_partitions(out_dir, removed)
+            counts[table] = {"written": len(changed), "removed": len(removed)}
+
+        # before the log is cleared, so a failed commit only hashes the logged partitions again
+        write_state(out_dir, {"format": format, **fingerprints})
+        connection.execute(delete(changes))
+    return counts
+
+
+def open_dataset(out_dir: Path | str, table: str = "station_data") -> ds.Dataset:
+    """Open an exported table as a memory-mapped dataset.
+
+    Files are memory mapped rather than read, so Arrow IPC exports are scanned without copying
+    and Parquet pages are decoded straight from the mapping. Filters on station_id and year only
+    touch the matching partition directories::
+
+        dataset = open_dataset("export")
+        table = dataset.to_table(filter=(ds.field("year") == 2000))
+
+    Parameters
+    ----------
+    out_dir : Path | str
+        Dataset root directory
+    table : str, optional
+        "station_data" or "station_summary", by default "station_data"
+
+    Returns
+    -------
+    ds.Dataset
+        Dataset with the partition keys as columns
+
+    """
+    out_dir = Path(out_dir)
+    format = read_state(out_dir).get("format", "parquet")
+    return ds.dataset(
+        out_dir / table,
+        format=FORMATS[format],
+        partitioning=PARTITIONING[table],
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def main(db: str | None, out_dir: str, format: str = "parquet", full: bool = False) -> None:
+    """Export station tables to a partitioned dataset.
+
+    Parameters
+    ----------
+    db : str | None
+        Database string, None for the application database
+    out_dir : str
+        Dataset root directory
+    format : str, optional
+        "parquet" or "arrow", by default "parquet"
+    full : bool, optional
+        Rewrite every partition, by default False
+
+    """
+    engine = create_engine(db) if db else base_engine
+    print(f"Starting export at {datetime.now(UTC)}")
+    counts = export(engine, out_dir, format, full)
+    print(f"Finished export at {datetime.now(UTC)}")
+    for table, count in counts.items():
+        print(f"{table}: {count['written']} partitions written, {count['removed']} removed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export station tables to Parquet or Arrow")
+    parser.add_argument(
+        "-s",
+        "--sqlite-db",
+        help="Database string (default: the application database)",
+    )
+    parser.add_argument(
+        "-o",
+        "--out-dir",
+        default="./export",
+        help="Dataset root directory (default: ./export)",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=list(FORMATS),
+        default="parquet",
+        help="File format (default: parquet)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rewrite every partition instead of only those changed since the last export",
+    )
+
+    args = parser.parse_args()
+    main(args.sqlite_db, args.out_dir, args.format, args.full)
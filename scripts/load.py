@@ -1,23 +1,143 @@
 """Script to load weather station data from text files to table."""
 
 import argparse
-from collections.abc import Iterable
+import sqlite3
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass
 from datetime import UTC, datetime
-from os import walk
+from functools import cache
+from itertools import islice
+from os import SEEK_END, scandir, stat_result, walk
 from pathlib import Path
+from time import monotonic, sleep, time_ns
 from typing import TypeVar
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import (
+    Column,
+    Date,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    bindparam,
+    case,
+    create_engine,
+    extract,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    true,
+)
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.dialects.sqlite import insert as sqlite_upsert
-from sqlalchemy.engine.base import Engine
+from sqlalchemy.engine.base import Connection, Engine
 from sqlalchemy.orm import Session
 
 # from app.core.db import engine
-from app.models import StationData
+from app.core.db import upsert
+from app.core.schema import (
+    LAYOUTS,
+    V1,
+    StationLayout,
+    bump_generation,
+    day_date,
+    is_clustered,
+    new_ids,
+    reserve_ids,
+    station_layout,
+)
+from app.models import (
+    DataGeneration,
+    Station,
+    StationData,
+    StationDataChange,
+    StationExportChange,
+)
+from scripts.manifest import plan_file, read_manifest, record_file, record_watermark
+from scripts.parse import (
+    StationBatch,
+    is_bundle,
+    is_compressed,
+    read_station_bundle,
+    read_station_file,
+    station_id_from_path,
+)
+from scripts.summarize import summarize
+from scripts.telemetry import Telemetry, stage
 
 T = TypeVar("T")
 
+# column order of the rows produced by StationBatch.rows, and StationBatch.keyed_rows for
+# schema v2
+STATION_COLUMNS = ["station_id", "date", "max_temp", "min_temp", "total_precip"]
+KEYED_COLUMNS = ["station_key", "day", "max_temp", "min_temp", "total_precip"]
+MEASUREMENTS = ["max_temp", "min_temp", "total_precip"]
+
+# connection settings for a bulk load; durability is traded for speed until the load finishes
+BULK_PRAGMAS = {
+    "journal_mode": "WAL",
+    "cache_size": -262144,  # KiB, 256 MiB
+    "temp_store": "MEMORY",
+}
+BULK_COMMIT_ROWS = 1_000_000
+
+# logs of the (station_id, year) groups changed by loads, one per consumer, which clears its own:
+# incremental summaries, then exports
+CHANGE_LOGS = [StationDataChange.__table__, StationExportChange.__table__]
+
+# per-connection temporary table each batch is bulk loaded into before merging;
+# temporary tables are not written to the WAL, on PostgreSQL as on SQLite
+stage_table = Table(
+    "station_data_stage",
+    MetaData(),
+    Column("station_id", String(50), nullable=False),
+    Column("date", Date, nullable=False),
+    Column("max_temp", Float),
+    Column("min_temp", Float),
+    Column("total_precip", Float),
+    prefixes=["TEMPORARY"],
+)
+keyed_stage_table = Table(
+    "station_observations_stage",
+    MetaData(),
+    Column("station_key", Integer, nullable=False),
+    Column("day", Integer, nullable=False),
+    Column("max_temp", Integer),
+    Column("min_temp", Integer),
+    Column("total_precip", Integer),
+    prefixes=["TEMPORARY"],
+)
+# staging table of each schema version, with columns in row order
+STAGE_TABLES = {1: stage_table, 2: keyed_stage_table}
+
+
+@dataclass(slots=True)
+class MergeCounts:
+    """Rows inserted, updated and left unchanged by a merge."""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other: "MergeCounts") -> "MergeCounts":
+        return MergeCounts(
+            self.inserted + other.inserted,
+            self.updated + other.updated,
+            self.unchanged + other.unchanged,
+        )
+
+    def __str__(self) -> str:
+        return f"{self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged"
+
 
 def chunk_generator[T](data_list: list[T], chunk_size: int) -> Iterable[list[T]]:
     """Yield chunks from a list of n size.
@@ -42,6 +162,8 @@ def chunk_generator[T](data_list: list[T], chunk_size: int) -> Iterable[list[T]]
 def get_files(dir: str) -> list[Path]:
     """Get list of files from a directory.
 
+    Files are sorted by name so that row ids are assigned in a stable order.
+
     Parameters
     ----------
     dir : str
@@ -53,10 +175,10 @@ def get_files(dir: str) -> list[Path]:
         List of paths
 
     """
-    return [Path(dir) / f for f in next(walk(dir), (None, None, []))[2]]  # [] if no file
+    return sorted(Path(dir) / f for f in next(walk(dir), (None, None, []))[2])  # [] if no file
 
 
-def read_data(file_path: Path | str, headers: list[str]) -> list[dict]:
+def read_data(file_path: Path | str, headers: list[str]) -> list[dict] | None:
     """Read data from csv with specified headers.
 
     Parameters
@@ -68,13 +190,13 @@ def read_data(file_path: Path | str, headers: list[str]) -> list[dict]:
 
     Returns
     -------
-    list[dict]
-        List of dictionaries of data
+    list[dict] | None
+        List of dictionaries of data. None if the file could not be read
 
     """
     try:
         df = pd.read_csv(file_path, sep=r"\s+", names=headers, header=None, parse_dates=["date"])
-        df.insert(0, "station_id", file_path.name.split(".")[0])
+        df.insert(0, "station_id", station_id_from_path(file_path))
         df = df.replace(-9999, pd.NA)
         return df.to_dict(orient="records")
     except Exception as e:  # noqa
@@ -82,20 +204,462 @@ def read_data(file_path: Path | str, headers: list[str]) -> list[dict]:
         pass
 
 
-def load_data(engine: Engine, records: list[dict], chunk_size: int = 999) -> int:
+def records_batches(records: list[dict]) -> list[StationBatch]:
+    """Station columns of records as returned by `read_data`, one batch per station.
+
+    Missing measurements are masked, and measurements that are all whole numbers are integers,
+    as in a parsed file.
+
+    Parameters
+    ----------
+    records : list[dict]
+        Records keyed on station_data column name
+
+    Returns
+    -------
+    list[StationBatch]
+        Parsed station columns, in the order stations first appear
+
+    """
+    frame = pd.DataFrame.from_records(records, columns=["station_id", "date", *MEASUREMENTS])
+    batches = []
+    for station_id, rows in frame.groupby("station_id", sort=False):
+        measurements = {}
+        for name in MEASUREMENTS:
+            values = rows[name].to_numpy(dtype=float, na_value=np.nan)
+            missing = np.isnan(values)
+            values = np.where(missing, 0, values)
+            if np.array_equal(values, np.trunc(values)):
+                values = values.astype(np.int64)
+            measurements[name] = np.ma.MaskedArray(values, mask=missing)
+        dates = pd.to_datetime(rows["date"]).to_numpy().astype("datetime64[D]")
+        batches.append(StationBatch(station_id=station_id, date=dates, **measurements))
+    return batches
+
+
+def read_batches(file_path: Path, offset: int = 0) -> list[StationBatch | None]:
+    """Parse a station file, or every station file of a tar bundle.
+
+    Parameters
+    ----------
+    file_path : Path
+        Station file or tar bundle
+    offset : int, optional
+        Byte offset of the first row to read of a station file, by default 0
+
+    Returns
+    -------
+    list[StationBatch | None]
+        Parsed columns per station, None for a file that could not be read
+
+    """
+    if is_bundle(file_path):
+        return list(read_station_bundle(file_path))
+    return [read_station_file(file_path, offset)]
+
+
+def iter_batches(
+    file_list: list[Path], workers: int = 1, offsets: Mapping[Path, int] | None = None
+) -> Iterator[tuple[Path, StationBatch | None]]:
+    """Parse files and yield their batches in file order.
+
+    With more than one worker, files are parsed concurrently in a process pool while the caller
+    writes previously parsed files. Only a bounded window of files is in flight at once so memory
+    stays flat for large directories. Results are yielded in the order of `file_list` so that
+    the database ends up identical to a serial load. A tar bundle yields a batch per station
+    file; parsed serially, only one station of the bundle is held in memory at a time.
+
+    Parameters
+    ----------
+    file_list : list[Path]
+        Files to parse
+    workers : int, optional
+        Number of parser processes, by default 1 (parse in this process)
+    offsets : Mapping[Path, int] | None, optional
+        Byte offset to start reading each file from, by default the start of every file
+
+    Yields
+    ------
+    Iterator[tuple[Path, StationBatch | None]]
+        File path and its parsed columns, None if the file could not be read
+
+    """
+    offsets = offsets or {}
+    if workers <= 1:
+        for f in file_list:
+            if is_bundle(f):
+                for batch in read_station_bundle(f):
+                    yield f, batch
+            else:
+                yield f, read_station_file(f, offsets.get(f, 0))
+        return
+
+    files = iter(file_list)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        submit = lambda f: (f, pool.submit(read_batches, f, offsets.get(f, 0)))
+        # keep each worker busy with one file queued behind the one it is parsing
+        pending = deque(submit(f) for f in islice(files, 2 * workers))
+        while pending:
+            f, future = pending.popleft()
+            for nxt in islice(files, 1):
+                pending.append(submit(nxt))
+            for batch in future.result():
+                yield f, batch
+
+
+@cache
+def upsert_sql(version: int = 1, clustered: bool = False) -> str:
+    """Single row upsert into station data, compiled once to driver SQL.
+
+    Upserts based on station_id and date unique constraint. If present, update the statistics
+    categories. Parameters are positional in `STATION_COLUMNS` order, or `KEYED_COLUMNS` order
+    on schema v2, after the id of the row when station data is clustered.
+
+    Parameters
+    ----------
+    version : int, optional
+        Storage schema, by default 1
+    clustered : bool, optional
+        Whether station data is clustered, by default False
+
+    Returns
+    -------
+    str
+        SQL with qmark parameters
+
+    """
+    layout = LAYOUTS[version, clustered]
+    columns = [c.name for c in STAGE_TABLES[version].c]
+    if clustered:
+        columns = ["id", *columns]
+    stmt = sqlite_upsert(layout.table).values({c: bindparam(c) for c in columns})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[layout.table.c[k] for k in layout.key],
+        set_={m: stmt.excluded[m] for m in MEASUREMENTS},
+    )
+    return str(stmt.compile(dialect=sqlite.dialect()))
+
+
+def max_variable_number(connection: Connection) -> int:
+    """Maximum number of bound parameters per statement of the running SQLite library.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection to a SQLite database
+
+    Returns
+    -------
+    int
+        SQLITE_MAX_VARIABLE_NUMBER; 999 before SQLite 3.32, 32766 or more since
+
+    """
+    return connection.connection.driver_connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+
+
+def upsert_executemany(
+    connection: Connection,
+    rows: list[tuple],
+    chunk_size: int | None = None,
+    version: int = 1,
+    clustered: bool = False,
+) -> int:
+    """Upsert rows by running the precompiled upsert with the driver's executemany.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    rows : list[tuple]
+        Rows in `STATION_COLUMNS` order, dates as YYYY-MM-DD strings, or in `KEYED_COLUMNS`
+        order on schema v2
+    chunk_size : int | None, optional
+        Rows per executemany call, by default all rows in one call
+    version : int, optional
+        Storage schema, by default 1
+    clustered : bool, optional
+        Whether station data is clustered, by default False. Every row is then given an id
+        from a block reserved for the chunk; the ids of rows that already exist go unused
+
+    Returns
+    -------
+    int
+        numbers of rows touched
+
+    """
+    row_count = 0
+    for chunk in chunk_generator(rows, chunk_size or len(rows) or 1):
+        if clustered:
+            first = reserve_ids(connection, LAYOUTS[version, clustered].table, len(chunk))
+            chunk = [(i, *row) for i, row in enumerate(chunk, first)]
+        row_count += connection.exec_driver_sql(upsert_sql(version, clustered), chunk).rowcount
+    return row_count
+
+
+def upsert_multi_values(
+    connection: Connection, records: list[dict] | list[tuple], chunk_size: int | None = None
+) -> int:
+    """Upsert records with one multi-VALUES statement per chunk.
+
+    This compiles a new statement for every chunk; `upsert_executemany` is much faster and is
+    used for parsed batches. Kept for records from `read_data`.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    records : list[dict] | list[tuple]
+        Records keyed on column name, or tuples of every station_data column including id
+    chunk_size : int | None, optional
+        Rows per statement, by default as many as the SQLite parameter limit allows
+
+    Returns
+    -------
+    int
+        numbers of rows touched
+
+    """
+    chunk_size = chunk_size or max_variable_number(connection) // len(StationData.__table__.c)
+    row_count = 0
+    for chunk in chunk_generator(records, chunk_size):
+        # upsert: constraint of unique station_id and date
+        # if conflict, statistics values will be updated
+        # will not create duplicates
+        stmt = sqlite_upsert(StationData).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StationData.station_id, StationData.date],
+            set_={
+                "max_temp": stmt.excluded.max_temp,
+                "min_temp": stmt.excluded.min_temp,
+                "total_precip": stmt.excluded.total_precip,
+            },
+        )
+        row_count += connection.execute(stmt).rowcount
+    return row_count
+
+
+@cache
+def stage_insert_sql(version: int = 1) -> str:
+    """Insert of one row into the staging table of a schema, compiled once to driver SQL."""
+    return str(insert(STAGE_TABLES[version]).compile(dialect=sqlite.dialect()))
+
+
+def station_key(connection: Connection, station_id: str) -> int:
+    """Key of a station in the stations table of schema v2, adding the station if new.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    station_id : str
+        Station ID
+
+    Returns
+    -------
+    int
+        Station key
+
+    """
+    stations = Station.__table__
+    stmt = upsert(stations, connection.dialect.name).values(station_id=station_id)
+    connection.execute(stmt.on_conflict_do_nothing())
+    return connection.scalar(select(stations.c.id).where(stations.c.station_id == station_id))
+
+
+def batch_rows(connection: Connection, batch: StationBatch, layout: StationLayout) -> list[tuple]:
+    """Rows of a parsed batch in the column order of the layout's upsert and staging table."""
+    if layout.version == 1:
+        return batch.rows(iso_dates=True)
+    return batch.keyed_rows(station_key(connection, batch.station_id))
+
+
+def copy_rows(connection: Connection, table: Table, rows: list[tuple]) -> None:
+    """Stream rows into a PostgreSQL table with COPY ... FROM STDIN.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection to a PostgreSQL database using psycopg
+    table : Table
+        Table to copy into
+    rows : list[tuple]
+        Rows with a value for every column of the table, in column order
+
+    """
+    columns = ", ".join(c.name for c in table.c)
+    with connection.connection.cursor() as cursor:
+        with cursor.copy(f"COPY {table.name} ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def record_changes(connection: Connection, records: StationBatch | list[dict]) -> None:
+    """Log the (station_id, year) groups of upserted rows for incremental summaries and exports.
+
+    The data generation is bumped with the log, so API responses cached before are not served.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    records : StationBatch | list[dict]
+        Parsed station columns, or list of records as returned by `read_data`
+
+    """
+    if isinstance(records, StationBatch):
+        years = np.unique(records.date.astype("datetime64[Y]")).astype(np.int64) + 1970
+        groups = {(records.station_id, year) for year in years.tolist()}
+    else:
+        groups = {(r["station_id"], r["date"].year) for r in records}
+    if groups:
+        params = [{"station_id": station_id, "year": year} for station_id, year in sorted(groups)]
+        for changes in CHANGE_LOGS:
+            stmt = upsert(changes, connection.dialect.name)
+            connection.execute(stmt.on_conflict_do_nothing(), params)
+        bump_generation(connection)
+
+
+def merge_rows(
+    connection: Connection,
+    rows: list[tuple],
+    telemetry: Telemetry | None = None,
+    layout: StationLayout = V1,
+) -> MergeCounts:
+    """Merge rows into station_data through a staging table, writing only changed rows.
+
+    Rows are bulk loaded into a temporary staging table, with executemany on SQLite and COPY on
+    PostgreSQL, which keeps only the last row of a repeated key. The staged rows are compared
+    with station_data to count new, changed and unchanged rows. A single INSERT ... SELECT then
+    upserts them, updating on conflict only where a measurement differs, so unchanged rows are
+    not rewritten. Groups of new and changed rows are logged in station_data_changes and
+    station_export_changes, and the data generation is bumped if any row changed.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    rows : list[tuple]
+        Rows in `STATION_COLUMNS` order, dates as YYYY-MM-DD strings, or in `KEYED_COLUMNS`
+        order on schema v2
+    telemetry : Telemetry | None, optional
+        Collects the time spent staging, comparing, logging changes and writing, by default
+        None
+    layout : StationLayout, optional
+        Station data layout of the database, by default schema v1
+
+    Returns
+    -------
+    MergeCounts
+        Rows inserted, updated and unchanged
+
+    """
+    dialect_name = connection.dialect.name
+    staging = STAGE_TABLES[layout.version]
+    with stage(telemetry, "stage"):
+        staging.create(connection, checkfirst=True)
+        if dialect_name == "postgresql":
+            # truncate rather than delete so the physical order is the copy order again
+            connection.exec_driver_sql(f"TRUNCATE {staging.name}")
+            copy_rows(connection, staging, rows)
+            stage_order = literal_column(f"{staging.name}.ctid")
+        else:
+            connection.execute(staging.delete())
+            if rows:
+                connection.exec_driver_sql(stage_insert_sql(layout.version), rows)
+            stage_order = literal_column(f"{staging.name}.rowid")
+        # a file may repeat a key; keep its last row, as upserting every row in turn would. Rows
+        # start with the key, so repeats are found without sorting the staging table
+        if len({row[:2] for row in rows}) < len(rows):
+            ranked = (
+                select(
+                    stage_order.label("position"),
+                    func.row_number()
+                    .over(
+                        partition_by=[staging.c[k] for k in layout.key], order_by=stage_order.desc()
+                    )
+                    .label("rank"),
+                )
+                .select_from(staging)
+                .subquery()
+            )
+            duplicates = select(ranked.c.position).where(ranked.c.rank > 1)
+            connection.execute(staging.delete().where(stage_order.in_(duplicates)))
+
+    target = layout.table
+    differs = lambda a, b: or_(*(a[m].is_distinct_from(b[m]) for m in MEASUREMENTS))
+    staged = staging.outerjoin(target, and_(*(target.c[k] == staging.c[k] for k in layout.key)))
+    with stage(telemetry, "compare"):
+        inserted, updated, total = connection.execute(
+            select(
+                func.coalesce(func.sum(case((target.c.id.is_(None), 1), else_=0)), 0),
+                func.coalesce(
+                    func.sum(
+                        case(
+                            (target.c.id.is_not(None) & differs(staging.c, target.c), 1),
+                            else_=0,
+                        )
+                    ),
+                    0,
+                ),
+                func.count(),
+            ).select_from(staged)
+        ).one()
+
+    # log the groups of new or changed rows for incremental summaries
+    if layout.version == 1:
+        groups = select(staging.c.station_id, extract("year", staging.c.date)).select_from(staged)
+    else:
+        stations = Station.__table__
+        groups = select(
+            stations.c.station_id, extract("year", day_date(staging.c.day, dialect_name))
+        ).select_from(staged.join(stations, stations.c.id == staging.c.station_key))
+    groups = groups.where(target.c.id.is_(None) | differs(staging.c, target.c)).distinct()
+    with stage(telemetry, "log_changes"):
+        if inserted or updated:
+            for changes in CHANGE_LOGS:
+                log_stmt = upsert(changes, dialect_name).from_select(["station_id", "year"], groups)
+                connection.execute(log_stmt.on_conflict_do_nothing())
+            bump_generation(connection)
+
+    # staging order keeps new ids in file order; WHERE true lets SQLite parse ON CONFLICT
+    rows_stmt = select(staging).where(true()).order_by(stage_order)
+    if is_clustered(target):
+        first = reserve_ids(connection, target, inserted)
+        ids = new_ids(first, target.c.id.is_(None), stage_order)
+        rows_stmt = rows_stmt.add_columns(ids.label("id")).select_from(staged)
+    stmt = upsert(target, dialect_name).from_select(
+        [c.name for c in rows_stmt.selected_columns], rows_stmt
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[target.c[k] for k in layout.key],
+        set_={m: stmt.excluded[m] for m in MEASUREMENTS},
+        where=differs(target.c, stmt.excluded),
+    )
+    with stage(telemetry, "write"):
+        connection.execute(stmt)
+    return MergeCounts(inserted, updated, total - inserted - updated)
+
+
+def load_data(
+    engine: Engine, records: StationBatch | list[dict], chunk_size: int | None = None
+) -> int:
     """Load data from records to table.
 
     Upserts based on station_id and date unique constraint. If present, update the statistics categories
     Upsert will disallow duplicates.
+    The (station_id, year) groups of the records are logged in station_data_changes and
+    station_export_changes.
 
     Parameters
     ----------
     engine : Engine
         SQLAlchemy engine
-    records : list[dict]
-        List of records to load
-    chunk_size : int, optional
-        Chunk size to upload, by default 999 for SQLite limit
+    records : StationBatch | list[dict]
+        Parsed station columns, or list of records as returned by `read_data`. Records for a
+        schema v2 or clustered database are converted to parsed columns, see `records_batches`
+    chunk_size : int | None, optional
+        Rows per executemany call for batches, or per statement for records. By default sized
+        automatically
 
     Returns
     -------
@@ -104,33 +668,295 @@ def load_data(engine: Engine, records: list[dict], chunk_size: int = 999) -> int
         Note that this may not be inserted or updated due to using upsert
 
     """
-    # start counter
-    row_count = 0
-    # iterate through chunks
     with Session(engine) as session:
-        for chunk in chunk_generator(records, chunk_size):
-            # upsert: constraint of unique station_id and date
-            # if conflict, statistics values will be updated
-            # will not create duplicates
-            stmt = sqlite_upsert(StationData).values(chunk)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=[StationData.station_id, StationData.date],
-                set_={
-                    "max_temp": stmt.excluded.max_temp,
-                    "min_temp": stmt.excluded.min_temp,
-                    "total_precip": stmt.excluded.total_precip,
-                },
+        connection = session.connection()
+        layout = station_layout(connection)
+        if isinstance(records, StationBatch) or layout.version != 1 or layout.clustered:
+            # rows of schema v2 and clustered tables are made from parsed columns
+            batches = [records] if isinstance(records, StationBatch) else records_batches(records)
+            rows = [row for batch in batches for row in batch_rows(connection, batch, layout)]
+            row_count = upsert_executemany(
+                connection, rows, chunk_size, layout.version, layout.clustered
             )
-            result = session.execute(stmt)
-            row_count += result.rowcount
+        else:
+            row_count = upsert_multi_values(connection, records, chunk_size)
+        record_changes(connection, records)
         session.commit()
     return row_count
 
 
+def merge_data(engine: Engine, batch: StationBatch) -> MergeCounts:
+    """Merge a parsed batch into station_data, only writing rows that changed.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine
+    batch : StationBatch
+        Parsed station columns
+
+    Returns
+    -------
+    MergeCounts
+        Rows inserted, updated and unchanged
+
+    """
+    with Session(engine) as session:
+        connection = session.connection()
+        layout = station_layout(connection)
+        counts = merge_rows(connection, batch_rows(connection, batch, layout), layout=layout)
+        session.commit()
+    return counts
+
+
+def write_batch(
+    connection: Connection,
+    batch: StationBatch,
+    merge: bool = False,
+    chunk_size: int | None = None,
+    telemetry: Telemetry | None = None,
+) -> MergeCounts | int:
+    """Write a parsed batch and log its changed groups, in the connection's transaction.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    batch : StationBatch
+        Parsed station columns
+    merge : bool, optional
+        Merge through the staging table instead of upserting every row, by default False
+    chunk_size : int | None, optional
+        Rows per executemany call of an upsert, by default all rows in one call
+    telemetry : Telemetry | None, optional
+        Collects the time spent per stage, by default None
+
+    Returns
+    -------
+    MergeCounts | int
+        Rows inserted, updated and unchanged when merging, otherwise rows touched by the upsert
+
+    """
+    layout = station_layout(connection)
+    with stage(telemetry, "convert"):
+        rows = batch_rows(connection, batch, layout)
+    if merge:
+        return merge_rows(connection, rows, telemetry, layout)
+    with stage(telemetry, "write"):
+        touched = upsert_executemany(connection, rows, chunk_size, layout.version, layout.clustered)
+    with stage(telemetry, "log_changes"):
+        record_changes(connection, batch)
+    return touched
+
+
+@contextmanager
+def bulk_load(connection: Connection, synchronous: str = "OFF") -> Iterator[Connection]:
+    """Prepare a SQLite connection for a bulk load and restore it afterwards.
+
+    Switches to WAL with the given synchronous level, a large page cache and in-memory temp
+    storage, and drops the secondary indexes of station_data. On exit the indexes are rebuilt
+    and statistics gathered with ANALYZE and PRAGMA optimize for the API's query planner. The
+    unique (station_id, date) index is kept because the upsert relies on it.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection to a SQLite database, outside of a transaction
+    synchronous : str, optional
+        SQLite synchronous level during the load, OFF or NORMAL, by default OFF
+
+    Yields
+    ------
+    Iterator[Connection]
+        The prepared connection
+
+    """
+    for pragma, value in (BULK_PRAGMAS | {"synchronous": synchronous}).items():
+        connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+    indexes = list(station_layout(connection).table.indexes)
+    for index in indexes:
+        index.drop(connection, checkfirst=True)
+    connection.commit()
+
+    try:
+        yield connection
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        for index in indexes:
+            index.create(connection, checkfirst=True)
+        connection.exec_driver_sql("ANALYZE")
+        connection.exec_driver_sql("PRAGMA optimize")
+        connection.commit()
+        connection.exec_driver_sql("PRAGMA synchronous = FULL")
+
+
+def scan_files(data_dir: str) -> dict[Path, stat_result]:
+    """Stat the files of a directory in a single scandir pass.
+
+    Hidden files are left out, so writers can write to a dot file and rename it when complete.
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory to scan
+
+    Returns
+    -------
+    dict[Path, stat_result]
+        File stats keyed on path, sorted by name
+
+    """
+    with scandir(data_dir) as entries:
+        files = {
+            Path(e.path): e.stat() for e in entries if e.is_file() and not e.name.startswith(".")
+        }
+    return dict(sorted(files.items()))
+
+
+def is_complete(file_path: Path, stat: stat_result, now_ns: int, settle: float) -> bool:
+    """Whether a file looks completely written.
+
+    A file is complete once it has not been modified for `settle` seconds and, unless it is
+    compressed or a bundle, ends with a full line. A file still being written is picked up on a
+    later poll.
+
+    Parameters
+    ----------
+    file_path : Path
+        Station file
+    stat : stat_result
+        Stat of the file from the scan
+    now_ns : int
+        Wall clock time of the scan in nanoseconds
+    settle : float
+        Seconds a file must be left unmodified
+
+    Returns
+    -------
+    bool
+        True if the file can be loaded
+
+    """
+    if stat.st_size == 0 or now_ns - stat.st_mtime_ns < settle * 1e9:
+        return False
+    if is_compressed(file_path) or is_bundle(file_path):
+        return True
+    with open(file_path, "rb") as f:
+        f.seek(-1, SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def watch_dir(
+    engine: Engine,
+    data_dir: str,
+    interval: float = 5.0,
+    settle: float = 2.0,
+    workers: int = 1,
+    merge: bool = False,
+    chunk_size: int | None = None,
+    polls: int | None = None,
+) -> None:
+    """Poll a directory and load new or changed files in micro-batches.
+
+    Every `interval` seconds the directory is scanned, and the complete files that are new or
+    changed since they were last loaded are loaded as one batch. As with an incremental load,
+    only rows appended to a file are read. The rows, the ingestion manifest and the refreshed
+    summaries of the changed (station_id, year) groups are committed in one transaction, so
+    readers see a batch's data and its summaries together.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine
+    data_dir : str
+        Directory to watch
+    interval : float, optional
+        Seconds between polls, by default 5.0
+    settle : float, optional
+        Seconds a file must be left unmodified before it is loaded, by default 2.0
+    workers : int, optional
+        Number of processes parsing the files of a batch, by default 1
+    merge : bool, optional
+        Merge through the staging table, by default False
+    chunk_size : int | None, optional
+        Rows per executemany call of an upsert, by default all rows of a file
+    polls : int | None, optional
+        Stop after this many polls, by default watch until interrupted
+
+    """
+    manifest = read_manifest(engine)
+    # files that failed to parse are retried once they change
+    failed: dict[Path, tuple[int, int]] = {}
+    poll = 0
+    while polls is None or poll < polls:
+        started = monotonic()
+        now_ns = time_ns()
+        plans = {}
+        for f, stat in scan_files(data_dir).items():
+            version = (stat.st_size, stat.st_mtime_ns)
+            entry = manifest.get(str(f.resolve()))
+            if entry is not None and (entry.size, entry.mtime_ns) == version:
+                continue
+            if failed.get(f) == version or not is_complete(f, stat, now_ns, settle):
+                continue
+            if (plan := plan_file(f, entry)) is not None:
+                plans[f] = plan
+
+        if plans:
+            to_load = [f for f, plan in plans.items() if plan.offset < plan.size]
+            offsets = {f: plans[f].offset for f in to_load}
+            counts, row_count, loaded = MergeCounts(), 0, 0
+            with engine.connect() as connection:
+                for f, batch in iter_batches(to_load, workers, offsets):
+                    plan = plans[f]
+                    if batch is None:
+                        failed[f] = (plan.size, plan.mtime_ns)
+                        continue
+                    result = write_batch(connection, batch, merge, chunk_size)
+                    if merge:
+                        counts += result
+                    else:
+                        row_count += result
+                    loaded += 1
+                    record_file(connection, plan)
+                    if len(batch):
+                        record_watermark(connection, batch.station_id, batch.date.max().item())
+                for plan in plans.values():
+                    # touched without changing the content
+                    if plan.offset == plan.size:
+                        record_file(connection, plan)
+                summaries = summarize(connection, incremental=True)
+                connection.commit()
+            result = counts if merge else f"{row_count} rows"
+            print(
+                f"[{datetime.now(UTC)}] Loaded {loaded} station files: {result}, "
+                f"refreshed {summaries} summaries"
+            )
+            manifest = read_manifest(engine)
+
+        poll += 1
+        if polls is None or poll < polls:
+            sleep(max(0.0, interval - (monotonic() - started)))
+
+
 def main(
     data_dir: str,
     db: str,
-    chunk_size: int = 999,
+    chunk_size: int | None = None,
+    workers: int = 1,
+    incremental: bool = False,
+    merge: bool = False,
+    bulk: bool = False,
+    commit_rows: int | None = None,
+    synchronous: str = "OFF",
+    watch: bool = False,
+    interval: float = 5.0,
+    settle: float = 2.0,
+    report: str | None = None,
+    log_json: bool = False,
 ) -> None:
     """Pipeline to load data from station CSV to table.
 
@@ -139,22 +965,139 @@ def main(
     data_dir : str
         Directory to find station text files
     db : str
-        SQLite database connection string
-    chunk_size : int, optional
-        Chunk size to upload, by default 999 for SQLite limit
+        SQLite or PostgreSQL database connection string
+    chunk_size : int | None, optional
+        Rows per executemany call, by default all rows of a file in one call
+    workers : int, optional
+        Number of processes parsing files while this process writes, by default 1
+    incremental : bool, optional
+        Skip files unchanged since the last incremental load and only load rows appended to
+        files that grew, by default False
+    merge : bool, optional
+        Merge each file through a staging table so only changed rows are written, and report
+        inserted, updated and unchanged rows, by default False
+    bulk : bool, optional
+        Bulk load with SQLite tuned for speed, secondary indexes rebuilt after the load and
+        statistics gathered at the end, by default False
+    commit_rows : int | None, optional
+        Commit once at least this many rows are written, across files. By default every file
+        is committed, or every 1,000,000 rows for a bulk load
+    synchronous : str, optional
+        SQLite synchronous level of a bulk load, OFF or NORMAL, by default OFF
+    watch : bool, optional
+        Keep polling the directory and load new or changed files in micro-batches, refreshing
+        their summaries in the same transaction, by default False
+    interval : float, optional
+        Seconds between polls when watching, by default 5.0
+    settle : float, optional
+        Seconds a file must be left unmodified before it is loaded when watching, by default 2.0
+    report : str | None, optional
+        Path to write a JSON run report to, with the time spent per stage in total and per file,
+        rows per second and peak memory, by default no report
+    log_json : bool, optional
+        Print a JSON log line per file and for the run to stderr, by default False
 
     """
+    engine = create_engine(db)
+    for model in (StationDataChange, StationExportChange, DataGeneration):
+        model.__table__.create(engine, checkfirst=True)
+    if engine.dialect.name == "postgresql":
+        if bulk:
+            raise ValueError("Bulk loads are only supported for SQLite")
+        # batches are always copied into a staging table and merged
+        merge = True
+
+    if watch:
+        if bulk:
+            raise ValueError("Bulk loads cannot be watched")
+        print(f"Watching {data_dir} every {interval}s since {datetime.now(UTC)}")
+        try:
+            watch_dir(engine, data_dir, interval, settle, workers, merge, chunk_size)
+        except KeyboardInterrupt:
+            print(f"Stopped watching {datetime.now(UTC)}")
+        return
+
     print(f"Starting ingestion {datetime.now(UTC)}")
+    telemetry = Telemetry("load", log=log_json)
     file_list = get_files(dir=data_dir)
-    headers = ["date", "max_temp", "min_temp", "total_precip"]
     row_count = 0
-    engine = create_engine(db)
-    for f in file_list:
-        records = read_data(f, headers=headers)
-        result = load_data(engine, records, chunk_size)
-        row_count += result
+    merge_counts = MergeCounts()
+
+    plans = {}
+    if incremental:
+        with telemetry.stage("plan", per_file=False):
+            manifest = read_manifest(engine)
+            for f in file_list:
+                plan = plan_file(f, manifest.get(str(f.resolve())))
+                if plan is not None and plan.offset == plan.size:
+                    record_file(engine, plan)
+                elif plan is not None:
+                    plans[f] = plan
+        print(f"Skipping {len(file_list) - len(plans)} unchanged files")
+        file_list = list(plans)
+
+    if commit_rows is None:
+        commit_rows = BULK_COMMIT_ROWS if bulk else 0
+    with telemetry.stage("compile", per_file=False):
+        # compiled once and cached for every batch
+        layout = station_layout(engine)
+        if merge:
+            stage_insert_sql(layout.version)
+        else:
+            upsert_sql(layout.version, layout.clustered)
+
+    offsets = {f: plan.offset for f, plan in plans.items()}
+    with engine.connect() as connection, ExitStack() as stack:
+        if bulk:
+            with telemetry.stage("prepare", per_file=False):
+                stack.enter_context(bulk_load(connection, synchronous))
+        pending = 0
+        position = {f: i for i, f in enumerate(file_list, start=1)}
+        # parse time is the time spent waiting for a batch, i.e. reading, decompressing and
+        # parsing in this process, or waiting on the parser processes
+        batches = telemetry.timed(iter_batches(file_list, workers, offsets), "parse")
+        for f, batch in batches:
+            progress = f"[{position[f]}/{len(file_list)}]"
+            if batch is None:
+                print(f"{progress} Skipped {f.name}")
+                telemetry.file_done(f.name, 0, skipped=True)
+                continue
+            result = write_batch(connection, batch, merge, chunk_size, telemetry)
+            if merge:
+                merge_counts += result
+            else:
+                row_count += result
+                result = f"{result} rows"
+            if incremental:
+                with telemetry.stage("manifest"):
+                    record_file(connection, plans[f])
+                    if len(batch):
+                        record_watermark(connection, batch.station_id, batch.date.max().item())
+            pending += len(batch)
+            if pending >= commit_rows:
+                with telemetry.stage("commit"):
+                    connection.commit()
+                pending = 0
+            name = f"{f.name}:{batch.station_id}" if is_bundle(f) else f.name
+            telemetry.file_done(name, len(batch), station_id=batch.station_id)
+            print(f"{progress} Loaded {name}: {result}")
+        with telemetry.stage("commit", per_file=False):
+            connection.commit()
+        # rebuild indexes and gather statistics after a bulk load
+        with telemetry.stage("finalize", per_file=False):
+            stack.close()
     print(f"Finished ingestion {datetime.now(UTC)}.")
-    print(f"Touched {row_count} rows in upsert. All rows may not be inserts")
+    if merge:
+        print(f"Merged rows: {merge_counts}")
+        counts = {"merged": asdict(merge_counts)}
+    else:
+        print(f"Touched {row_count} rows in upsert. All rows may not be inserts")
+        counts = {"touched": row_count}
+    if report:
+        telemetry.write_report(report, **counts)
+        print(f"Wrote run report to {report}")
+    else:
+        telemetry.report(**counts)
 
 
 if __name__ == "__main__":
@@ -170,14 +1113,96 @@ if __name__ == "__main__":
     parser.add_argument(
         "-s",
         "--sqlite-db",
-        help="SQLite database string",
+        help="SQLite database string, or a postgresql+psycopg:// database string",
     )
     parser.add_argument(
         "-c",
         "--chunk-size",
-        default=999,
-        help="Chunk size for loading (default: 999 for sqlite)",
+        type=int,
+        default=None,
+        help="Rows per executemany call when loading (default: all rows of a file)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes parsing files in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Skip files unchanged since the last incremental load and load only appended rows",
+    )
+    parser.add_argument(
+        "-m",
+        "--merge",
+        action="store_true",
+        help="Merge through a staging table, only writing rows whose values changed",
+    )
+    parser.add_argument(
+        "-b",
+        "--bulk",
+        action="store_true",
+        help="Bulk load: tune SQLite for speed, rebuild indexes and ANALYZE after loading",
+    )
+    parser.add_argument(
+        "--commit-rows",
+        type=int,
+        default=None,
+        help="Commit every N rows across files (default: every file, 1,000,000 with --bulk)",
+    )
+    parser.add_argument(
+        "--synchronous",
+        choices=["OFF", "NORMAL"],
+        default="OFF",
+        help="SQLite synchronous level during a bulk load (default: OFF)",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep polling the directory, loading new or changed files in micro-batches",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="Seconds between polls of the directory when watching (default: 5)",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="Seconds a file must be left unmodified before it is loaded (default: 2)",
+    )
+
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Write a JSON run report with per-stage timings to this path",
+    )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Print a JSON log line per file and for the run to stderr",
     )
 
     args = parser.parse_args()
-    main(args.dir, args.sqlite_db, args.chunk_size)
+    main(
+        args.dir,
+        args.sqlite_db,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        incremental=args.incremental,
+        merge=args.merge,
+        bulk=args.bulk,
+        commit_rows=args.commit_rows,
+        synchronous=args.synchronous,
+        watch=args.watch,
+        interval=args.interval,
+        settle=args.settle,
+        report=args.report,
+        log_json=args.log_json,
+    )
@@ -0,0 +1,159 @@
+"""Ingestion manifest to skip station files that have not changed since the last load."""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.engine.base import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.models import IngestManifest, IngestWatermark
+from scripts.parse import is_bundle, is_compressed, station_id_from_path
+
+BLOCK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True, slots=True)
+class FilePlan:
+    """Version of a source file and the byte offset to start loading it from.
+
+    An offset of 0 loads the whole file; a positive offset loads only the rows appended since
+    the last load.
+    """
+
+    path: Path
+    size: int
+    mtime_ns: int
+    content_hash: str
+    offset: int = 0
+
+
+def read_manifest(engine: Engine) -> dict[str, IngestManifest]:
+    """Read manifest entries, creating the manifest and watermark tables if needed.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine
+
+    Returns
+    -------
+    dict[str, IngestManifest]
+        Entries keyed on path
+
+    """
+    IngestManifest.__table__.create(engine, checkfirst=True)
+    IngestWatermark.__table__.create(engine, checkfirst=True)
+    with Session(engine, expire_on_commit=False) as session:
+        return {m.path: m for m in session.scalars(select(IngestManifest))}
+
+
+def plan_file(file_path: Path, entry: IngestManifest | None) -> FilePlan | None:
+    """Decide whether and from where a file has to be loaded.
+
+    Files whose size and modification time match the manifest are skipped without reading them.
+    Otherwise the file is hashed; if the previously loaded content is an unchanged prefix of
+    an uncompressed station file only the appended tail is loaded. Compressed files and bundles
+    are reloaded whole when they change.
+
+    Parameters
+    ----------
+    file_path : Path
+        Station file
+    entry : IngestManifest | None
+        Manifest entry from the last load, None if never loaded
+
+    Returns
+    -------
+    FilePlan | None
+        Plan to load the file, None if it is unchanged
+
+    """
+    stat = file_path.stat()
+    if entry is not None and (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+        return None
+
+    digest = hashlib.sha256()
+    prefix_hash = prefix_end = None
+    with open(file_path, "rb") as f:
+        position = 0
+        while block := f.read(BLOCK_SIZE):
+            head = entry.size - position if entry is not None else 0
+            if 0 < head <= len(block):
+                # split the block at the previously loaded size to hash that prefix as well
+                digest.update(block[:head])
+                prefix_hash = digest.hexdigest()
+                prefix_end = block[head - 1 : head]
+                digest.update(block[head:])
+            else:
+                digest.update(block)
+            position += len(block)
+    content_hash = digest.hexdigest()
+
+    plan = FilePlan(file_path, stat.st_size, stat.st_mtime_ns, content_hash)
+    if entry is None:
+        return plan
+    if content_hash == entry.content_hash:
+        # touched but not modified; still return a plan so the new mtime is recorded
+        return FilePlan(file_path, stat.st_size, stat.st_mtime_ns, content_hash, stat.st_size)
+    if (
+        prefix_hash == entry.content_hash
+        and prefix_end == b"\n"
+        and not (is_compressed(file_path) or is_bundle(file_path))
+    ):
+        return FilePlan(file_path, stat.st_size, stat.st_mtime_ns, content_hash, entry.size)
+    return plan
+
+
+def record_file(bind: Engine | Connection, plan: FilePlan) -> None:
+    """Record a loaded file in the manifest.
+
+    Given a connection inside a transaction, the entry is written as part of that transaction
+    and committed with it.
+
+    Parameters
+    ----------
+    bind : Engine | Connection
+        SQLAlchemy engine, or connection the file was loaded with
+    plan : FilePlan
+        Plan the file was loaded with
+
+    """
+    key = str(plan.path.resolve())
+    with Session(bind) as session:
+        entry = session.get(IngestManifest, key)
+        if entry is None:
+            entry = IngestManifest(path=key, station_id=station_id_from_path(plan.path))
+            session.add(entry)
+        entry.size = plan.size
+        entry.mtime_ns = plan.mtime_ns
+        entry.content_hash = plan.content_hash
+        entry.ingested_at = datetime.now(UTC)
+        session.commit()
+
+
+def record_watermark(bind: Engine | Connection, station_id: str, last_date: date) -> None:
+    """Advance the latest ingested date of a station.
+
+    The watermark only moves forward, so loading an older file of the station, or the older
+    stations of a bundle, keeps the latest date seen from any file.
+
+    Parameters
+    ----------
+    bind : Engine | Connection
+        SQLAlchemy engine, or connection the rows were loaded with
+    station_id : str
+        Station ID
+    last_date : date
+        Latest date loaded for the station
+
+    """
+    with Session(bind) as session:
+        watermark = session.get(IngestWatermark, station_id)
+        if watermark is None:
+            session.add(IngestWatermark(station_id=station_id, last_date=last_date))
+        elif last_date > watermark.last_date:
+            watermark.last_date = last_date
+        session.commit()
@@ -0,0 +1,126 @@
+"""Script to migrate a database's station data to the compact schema v2.
+
+``station_data`` is carried over to ``stations`` and ``station_observations`` (see
+`app.core.schema`) in one transaction. Observation ids are kept, so API results and exports are
+unchanged, and the summaries, change log and ingestion manifest are shared by both schemas.
+"""
+
+import argparse
+from datetime import UTC, datetime
+
+from sqlalchemy import Integer, create_engine, func, select
+from sqlalchemy.engine.base import Connection, Engine
+
+from app.core.db import engine as base_engine
+from app.core.schema import (
+    LAYOUTS,
+    bump_generation,
+    create_schema,
+    date_day,
+    reset_id_sequences,
+    station_layout,
+)
+from app.models import Station
+
+
+def database_size(connection: Connection) -> int:
+    """Size of the database in bytes."""
+    if connection.dialect.name == "postgresql":
+        return connection.scalar(select(func.pg_database_size(func.current_database())))
+    page_count = connection.exec_driver_sql("PRAGMA page_count").scalar()
+    return page_count * connection.exec_driver_sql("PRAGMA page_size").scalar()
+
+
+def migrate(engine: Engine) -> int:
+    """Migrate a schema v1 database to schema v2.
+
+    Station IDs are copied to stations, and station_data rows to station_observations with
+    their ids, day numbers and integer measurements, before station_data is dropped. A
+    clustered database stays clustered. SQLite databases are vacuumed afterwards to return the
+    freed pages.
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine
+
+    Returns
+    -------
+    int
+        Count of rows migrated
+
+    Raises
+    ------
+    ValueError
+        If the database already uses schema v2
+
+    """
+    stations = Station.__table__
+    with engine.begin() as connection:
+        layout = station_layout(connection)
+        if layout.version == 2:
+            raise ValueError("The database already uses schema v2")
+        data = layout.table
+        observations = LAYOUTS[2, layout.clustered].table
+        dialect_name = connection.dialect.name
+        create_schema(connection, 2, layout.clustered)
+        connection.execute(
+            stations.insert().from_select(
+                ["station_id"], select(data.c.station_id).distinct().order_by(data.c.station_id)
+            )
+        )
+        stmt = observations.insert().from_select(
+            [c.name for c in observations.c],
+            select(
+                data.c.id,
+                stations.c.id,
+                date_day(data.c.date, dialect_name),
+                # measurements are whole tenths stored as floats
+                *(
+                    func.round(data.c[m]).cast(Integer)
+                    for m in ["max_temp", "min_temp", "total_precip"]
+                ),
+            )
+            .join_from(data, stations, data.c.station_id == stations.c.station_id)
+            .order_by(data.c.id),
+        )
+        rowcount = connection.execute(stmt, execution_options={"preserve_rowcount": True}).rowcount
+        if dialect_name == "postgresql":
+            # ids were copied, so move the id sequence past them
+            connection.exec_driver_sql(
+                "SELECT setval(pg_get_serial_sequence('station_observations', 'id'), "
+                "COALESCE(MAX(id), 0) + 1, false) FROM station_observations"
+            )
+        data.drop(connection)
+        if layout.clustered:
+            reset_id_sequences(connection)
+        # cursors of the API hold the storage key, which has changed
+        bump_generation(connection)
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("VACUUM")
+            connection.exec_driver_sql("ANALYZE")
+    return rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrate a database's station data to the compact schema v2"
+    )
+    parser.add_argument(
+        "-s",
+        "--sqlite-db",
+        help="Database string (default: the application database)",
+    )
+
+    args = parser.parse_args()
+    engine = create_engine(args.sqlite_db) if args.sqlite_db else base_engine
+    with engine.connect() as connection:
+        size = database_size(connection)
+    print(f"Starting migration at {datetime.now(UTC)}")
+    rowcount = migrate(engine)
+    print(f"Finished migration at {datetime.now(UTC)}")
+    with engine.connect() as connection:
+        new_size = database_size(connection)
+    print(f"Migrated {rowcount} rows. Database size {size:,} -> {new_size:,} bytes.")
@@ -0,0 +1,409 @@
+"""Vectorized parser for weather station text files.
+
+Station files hold four whitespace separated integer columns per line::
+
+    YYYYMMDD  max_temp  min_temp  total_precip
+
+with -9999 marking a missing measurement. The parser decodes a file straight into typed
+column arrays without building per-row Python objects. Files may be compressed, or bundled
+in a tar archive; they are decompressed and parsed as a stream in bounded blocks.
+"""
+
+import bz2
+import gzip
+import lzma
+import tarfile
+import warnings
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+MISSING = -9999
+N_COLUMNS = 4
+# bytes of (decompressed) text parsed at a time
+BLOCK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True, slots=True)
+class StationBatch:
+    """Parsed observations of a single station as column arrays.
+
+    Measurements are masked where the source held the missing value sentinel.
+    """
+
+    station_id: str
+    date: np.ndarray
+    max_temp: np.ma.MaskedArray
+    min_temp: np.ma.MaskedArray
+    total_precip: np.ma.MaskedArray
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def column(self, name: str) -> list:
+        """Return a measurement column as a list with None for missing values.
+
+        Parameters
+        ----------
+        name : str
+            Measurement column name
+
+        Returns
+        -------
+        list
+            Column values as python ints, None where missing
+
+        """
+        values = getattr(self, name)
+        column = values.data.tolist()
+        for i in np.flatnonzero(np.ma.getmaskarray(values)).tolist():
+            column[i] = None
+        return column
+
+    def rows(self, iso_dates: bool = False) -> list[tuple]:
+        """Return rows of (station_id, date, max_temp, min_temp, total_precip).
+
+        Parameters
+        ----------
+        iso_dates : bool, optional
+            Return dates as YYYY-MM-DD strings, the way SQLite stores them, instead of date
+            objects, by default False
+
+        Returns
+        -------
+        list[tuple]
+            Rows ready to be bound as SQL parameters
+
+        """
+        return list(
+            zip(
+                [self.station_id] * len(self),
+                np.datetime_as_string(self.date).tolist() if iso_dates else self.date.tolist(),
+                self.column("max_temp"),
+                self.column("min_temp"),
+                self.column("total_precip"),
+                strict=True,
+            )
+        )
+
+    def keyed_rows(self, station_key: int) -> list[tuple]:
+        """Return rows of (station_key, day, max_temp, min_temp, total_precip) for schema v2.
+
+        Parameters
+        ----------
+        station_key : int
+            Key of the station in the stations table
+
+        Returns
+        -------
+        list[tuple]
+            Rows with dates as day numbers since 1970-01-01, ready to be bound as SQL
+            parameters
+
+        """
+        return list(
+            zip(
+                [station_key] * len(self),
+                self.date.astype(np.int64).tolist(),
+                self.column("max_temp"),
+                self.column("min_temp"),
+                self.column("total_precip"),
+                strict=True,
+            )
+        )
+
+
+def station_id_from_path(file_path: Path | str) -> str:
+    """Station ID is the file name up to its first suffix."""
+    return Path(file_path).name.split(".")[0]
+
+
+def decode_dates(values: np.ndarray) -> np.ndarray:
+    """Convert integer YYYYMMDD values to datetime64[D].
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Integer dates
+
+    Returns
+    -------
+    np.ndarray
+        Dates as datetime64[D]
+
+    Raises
+    ------
+    ValueError
+        If any value is not a valid calendar date
+
+    """
+    years, month_days = np.divmod(values, 10000)
+    months, days = np.divmod(month_days, 100)
+    dates = (
+        (years - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+        + (months - 1).astype("timedelta64[M]")
+    ).astype("datetime64[D]") + (days - 1).astype("timedelta64[D]")
+
+    # out of range months or days roll over into the next month; catch them by round-tripping
+    month_start = dates.astype("datetime64[M]")
+    encoded = (
+        (month_start.astype("datetime64[Y]").astype(np.int64) + 1970) * 10000
+        + (month_start.astype(np.int64) % 12 + 1) * 100
+        + (dates - month_start).astype(np.int64)
+        + 1
+    )
+    if not np.array_equal(encoded, values):
+        raise ValueError("invalid date in station file")
+    return dates
+
+
+def parse_values(data: bytes) -> np.ndarray:
+    """Parse complete rows of station file content into an integer table.
+
+    Parameters
+    ----------
+    data : bytes
+        Whole lines of a station file
+
+    Returns
+    -------
+    np.ndarray
+        Values with one row per line and N_COLUMNS columns
+
+    Raises
+    ------
+    ValueError
+        If the content is not made up of complete rows of four integers
+
+    """
+    with warnings.catch_warnings():
+        # numpy warns, rather than raises, when it stops at a token it cannot parse
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            values = np.fromstring(data, dtype=np.int64, sep=" ")
+        except DeprecationWarning as e:
+            raise ValueError(f"unparseable station file: {e}") from None
+    # a count of the values of the whole block would pass a short line made up by a long one,
+    # shifting every row between them, so each row of values must be alone on its line
+    chars = np.frombuffer(data, dtype=np.uint8)
+    # whitespace and control characters, which never make up a value, are at most a space
+    space = np.concatenate(([True], chars <= ord(" ")))
+    starts = np.flatnonzero(space[:-1] & ~space[1:])
+    if starts.size != values.size or values.size % N_COLUMNS:
+        raise ValueError(f"expected {N_COLUMNS} columns per row")
+    # lines of the first and last value of every row
+    newlines = np.flatnonzero(chars == ord("\n"))
+    first = np.searchsorted(newlines, starts[::N_COLUMNS])
+    last = np.searchsorted(newlines, starts[N_COLUMNS - 1 :: N_COLUMNS])
+    shared = np.concatenate(([False], first[1:] == last[:-1]))
+    bad = np.flatnonzero((first != last) | shared)
+    if bad.size:
+        line = data.split(b"\n")[first[bad[0]]]
+        raise ValueError(f"expected {N_COLUMNS} columns per row, got {line!r}")
+    return values.reshape(-1, N_COLUMNS)
+
+
+def station_batch(table: np.ndarray, station_id: str) -> StationBatch:
+    """Decode an integer table into station columns."""
+    return StationBatch(
+        station_id=station_id,
+        date=decode_dates(table[:, 0]),
+        max_temp=np.ma.masked_equal(table[:, 1], MISSING),
+        min_temp=np.ma.masked_equal(table[:, 2], MISSING),
+        total_precip=np.ma.masked_equal(table[:, 3], MISSING),
+    )
+
+
+def parse_station_data(data: bytes, station_id: str) -> StationBatch:
+    """Parse the content of a station file.
+
+    Parameters
+    ----------
+    data : bytes
+        File content
+    station_id : str
+        Station ID of the file
+
+    Returns
+    -------
+    StationBatch
+        Parsed columns
+
+    Raises
+    ------
+    ValueError
+        If the content is not made up of complete rows of four integers
+
+    """
+    return station_batch(parse_values(data), station_id)
+
+
+def parse_station_stream(
+    stream: BinaryIO, station_id: str, block_size: int = BLOCK_SIZE
+) -> StationBatch:
+    """Parse a station file from a stream, holding at most one block of its text at a time.
+
+    Each block is cut after its last full line and parsed; the partial line is carried over to
+    the next block.
+
+    Parameters
+    ----------
+    stream : BinaryIO
+        Readable file content, e.g. a decompressing reader
+    station_id : str
+        Station ID of the file
+    block_size : int, optional
+        Bytes read from the stream at a time, by default BLOCK_SIZE
+
+    Returns
+    -------
+    StationBatch
+        Parsed columns
+
+    Raises
+    ------
+    ValueError
+        If the content is not made up of complete rows of four integers
+
+    """
+    tables = []
+    rest = b""
+    while block := stream.read(block_size):
+        data = rest + block
+        end = data.rfind(b"\n") + 1
+        if end:
+            tables.append(parse_values(data[:end]))
+        rest = data[end:]
+    if rest.strip():
+        tables.append(parse_values(rest))
+    table = np.concatenate(tables) if tables else np.empty((0, N_COLUMNS), dtype=np.int64)
+    return station_batch(table, station_id)
+
+
+def open_zstd(raw: BinaryIO) -> BinaryIO:
+    """Decompressing reader of a zstd stream, requires the optional zstandard package."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("reading .zst files requires zstandard (pip install app[zstd])") from None
+    return zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+
+
+open_gzip = lambda raw: gzip.GzipFile(fileobj=raw)
+
+# decompressing readers by file suffix; none of them close the stream they wrap
+DECOMPRESSORS: dict[str, Callable[[BinaryIO], BinaryIO]] = {
+    ".gz": open_gzip,
+    ".tgz": open_gzip,
+    ".bz2": bz2.BZ2File,
+    ".tbz2": bz2.BZ2File,
+    ".xz": lzma.LZMAFile,
+    ".txz": lzma.LZMAFile,
+    ".zst": open_zstd,
+    ".tzst": open_zstd,
+}
+
+
+def is_compressed(file_path: Path | str) -> bool:
+    """Whether a file is compressed, judged by its suffix."""
+    return Path(file_path).suffix in DECOMPRESSORS
+
+
+def is_bundle(file_path: Path | str) -> bool:
+    """Whether a file is a tar bundle of station files, judged by its suffixes."""
+    suffixes = Path(file_path).suffixes
+    return ".tar" in suffixes or suffixes[-1:] in ([".tgz"], [".tbz2"], [".txz"], [".tzst"])
+
+
+def decompress(raw: BinaryIO, name: str) -> BinaryIO:
+    """Wrap a stream in a decompressing reader chosen by the suffix of its name.
+
+    Parameters
+    ----------
+    raw : BinaryIO
+        Stream of the file content
+    name : str
+        File name
+
+    Returns
+    -------
+    BinaryIO
+        Decompressed content, or `raw` itself for uncompressed files
+
+    """
+    decompressor = DECOMPRESSORS.get(Path(name).suffix)
+    return decompressor(raw) if decompressor else raw
+
+
+def read_station_file(file_path: Path | str, offset: int = 0) -> StationBatch | None:
+    """Read a station file into column arrays.
+
+    Compressed files (.gz, .bz2, .xz, .zst) are decompressed as they are parsed, one block at
+    a time.
+
+    Parameters
+    ----------
+    file_path : Path | str
+        Station text file, optionally compressed
+    offset : int, optional
+        Byte offset of the first row to read, by default 0. Must be the start of a line of the
+        uncompressed content
+
+    Returns
+    -------
+    StationBatch | None
+        Parsed columns. None if the file could not be read
+
+    """
+    try:
+        with open(file_path, "rb") as raw, decompress(raw, str(file_path)) as stream:
+            if offset:
+                stream.seek(offset)
+            return parse_station_stream(stream, station_id_from_path(file_path))
+    except Exception as e:  # noqa
+        print(f"Error {e} reading from {file_path}. Continuing ingestion.")
+        return None
+
+
+def read_station_bundle(file_path: Path | str) -> Iterator[StationBatch | None]:
+    """Read the station files of a tar bundle, one at a time.
+
+    The bundle is read as a stream, so members are parsed as the archive is decompressed and
+    nothing is extracted. Members may be compressed themselves; hidden files and directories
+    are skipped.
+
+    Parameters
+    ----------
+    file_path : Path | str
+        Tar bundle, optionally compressed (.tar.gz, .tgz, .tar.bz2, .tar.xz, .tar.zst)
+
+    Yields
+    ------
+    Iterator[StationBatch | None]
+        Parsed columns of each station file. Members that could not be read are reported and
+        skipped; None is yielded last if the bundle itself could not be read
+
+    """
+    try:
+        with (
+            open(file_path, "rb") as raw,
+            decompress(raw, str(file_path)) as stream,
+            tarfile.open(fileobj=stream, mode="r|") as tar,
+        ):
+            for member in tar:
+                name = Path(member.name).name
+                if not member.isfile() or name.startswith("."):
+                    continue
+                try:
+                    with decompress(tar.extractfile(member), name) as member_stream:
+                        yield parse_station_stream(member_stream, station_id_from_path(name))
+                except ValueError as e:
+                    print(
+                        f"Error {e} reading {member.name} from {file_path}. Continuing ingestion."
+                    )
+    except Exception as e:  # noqa
+        print(f"Error {e} reading from {file_path}. Continuing ingestion.")
+        yield None
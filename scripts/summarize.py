@@ -1,27 +1,363 @@
 """Script to summarize weather station data and load to table."""
 
-from datetime import UTC, datetime
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, date, datetime
 
-from sqlalchemy import Integer, func, select
-from sqlalchemy.dialects.sqlite import insert as sqlite_upsert
-from sqlalchemy.engine.base import Engine
+import numpy as np
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    and_,
+    bindparam,
+    case,
+    cast,
+    create_engine,
+    delete,
+    func,
+    select,
+    true,
+)
+from sqlalchemy.engine.base import Connection, Engine
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.core.db import engine as base_engine
-from app.models import StationData, StationSummary
+from app.core.db import upsert
+from app.core.schema import (
+    add_missing_columns,
+    bump_generation,
+    is_clustered,
+    new_ids,
+    schema_clustered,
+    station_layout,
+    summary_table,
+)
+from app.models import (
+    DataGeneration,
+    StationDataChange,
+    StationDecadal,
+    StationMonthly,
+    StationSeasonal,
+    StationSummary,
+)
+from scripts.telemetry import Telemetry, stage
 
+TEMPERATURES = ["max_temp", "min_temp"]
 
-def summarize_stations(engine: Engine) -> int:
-    """Summarize weather station data annually.
 
-    Calculate the maximum temperature, minimum temperature, and cumulative precipitation for each year in record
-    Load to station_summary
-    Nulls are by default skipped
+def round_decimal(value: ColumnElement, dialect_name: str) -> ColumnElement:
+    """Value rounded to one decimal.
+
+    PostgreSQL only rounds numerics to a number of decimals, so the value is cast first.
+    """
+    if dialect_name == "postgresql":
+        value = value.cast(Numeric)
+    return func.round(value, 1)
+
+
+def round_ratio(total: ColumnElement, count: ColumnElement, dialect_name: str) -> ColumnElement:
+    """Average from sums and counts of values, rounded to one decimal."""
+    return round_decimal(func.sum(total) / func.nullif(func.sum(count), 0), dialect_name)
+
+
+# per station and month, the counts, sums, sums of squared deviations from the month mean (m2)
+# and extremes of the measurements, from which every summary is aggregated
+month_stage = Table(
+    "station_month_stage",
+    MetaData(),
+    Column("station_id", String(50), primary_key=True),
+    Column("year", Integer, primary_key=True, autoincrement=False),
+    Column("month", Integer, primary_key=True, autoincrement=False),
+    *(
+        column
+        for m in TEMPERATURES
+        for column in [
+            Column(f"n_{m}", Integer),
+            Column(f"sum_{m}", Float),
+            Column(f"m2_{m}", Float),
+            Column(f"min_{m}", Float),
+            Column(f"max_{m}", Float),
+        ]
+    ),
+    Column("n_precip", Integer),
+    Column("sum_precip", Float),
+    Column("precip_days", Integer),
+    prefixes=["TEMPORARY"],
+)
+
+
+def decade_range(station_id: str, decade: int) -> dict:
+    """Range of station data to stage for a decade of a station.
+
+    The decade is padded with the December before and the January and February after it, so
+    that every winter touching the decade is whole.
 
     Parameters
     ----------
-    engine : Engine
-        SQLAlchemy engine
+    station_id : str
+        Station ID
+    decade : int
+        First year of the decade
+
+    Returns
+    -------
+    dict
+        station_id, decade, and the start and exclusive end date of the range
+
+    """
+    return {
+        "station_id": station_id,
+        "decade": decade,
+        "start": date(decade - 1, 12, 1),
+        "end": date(decade + 10, 3, 1),
+    }
+
+
+def stage_months(connection: Connection, decades: list[dict] | None) -> None:
+    """Aggregate station data per station and month into the month staging table.
+
+    This is the only pass over station data a summary makes. When incremental, only the given
+    (station_id, decade) ranges are aggregated.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    decades : list[dict] | None
+        Ranges to aggregate as returned by `decade_range`, None for all station data
+
+    """
+    dialect_name = connection.dialect.name
+    layout = station_layout(connection)
+    month_stage.create(connection, checkfirst=True)
+    connection.execute(month_stage.delete())
+
+    # extract renders as strftime on SQLite and EXTRACT on PostgreSQL
+    rows = select(
+        layout.station_id.label("station_id"),
+        layout.year(dialect_name).label("year"),
+        layout.month(dialect_name).label("month"),
+        *(cast(getattr(layout, m), Float).label(m) for m in TEMPERATURES),
+        layout.total_precip.label("total_precip"),
+    ).select_from(layout.source)
+    if decades is not None:
+        # one range seek on the (station, date) index per decade; the padded ranges of
+        # neighbouring decades overlap by a winter, which is staged once
+        rows = rows.where(
+            layout.station_id == bindparam("station_id"),
+            layout.date >= bindparam("start"),
+            layout.date < bindparam("end"),
+        )
+    rows = rows.subquery("rows")
+    # each row with the means of its month, from which m2 is summed in a second pass over the
+    # month as in `aggregate_months`; a sum of squares less the squared sum would cancel
+    key = [rows.c.station_id, rows.c.year, rows.c.month]
+    rows = select(
+        rows,
+        *(func.avg(rows.c[m]).over(partition_by=key).label(f"mean_{m}") for m in TEMPERATURES),
+    ).subquery("month_rows")
+
+    stats = []
+    for m in TEMPERATURES:
+        value, deviation = rows.c[m], rows.c[m] - rows.c[f"mean_{m}"]
+        m2 = func.sum(deviation * deviation)
+        stats += [func.count(value), func.sum(value), m2, func.min(value), func.max(value)]
+    precip = rows.c.total_precip
+    stmt = select(
+        rows.c.station_id,
+        rows.c.year,
+        rows.c.month,
+        *stats,
+        func.count(precip),
+        func.sum(precip),
+        func.count(case((precip > 0, 1))),
+    ).group_by(rows.c.station_id, rows.c.year, rows.c.month)
+    if decades is None:
+        connection.execute(month_stage.insert().from_select(month_stage.c.keys(), stmt))
+        return
+
+    insert_stmt = upsert(month_stage, dialect_name).from_select(month_stage.c.keys(), stmt)
+    connection.execute(insert_stmt.on_conflict_do_nothing(), decades)
+
+
+def station_ranges(connection: Connection, decades: list[dict] | None) -> list[dict]:
+    """Ranges of station data to aggregate: whole stations, or the given decades."""
+    if decades is not None:
+        return decades
+    layout = station_layout(connection)
+    station_ids = connection.scalars(
+        select(layout.station_id).select_from(layout.source).distinct().order_by(layout.station_id)
+    )
+    return [{"station_id": station_id, "decade": None} for station_id in station_ids]
+
+
+def aggregate_months(
+    station_id: str, dates: list, max_temp: list, min_temp: list, total_precip: list
+) -> list[tuple]:
+    """Monthly statistics of a station's measurements, skipping nulls as SQL does.
+
+    The sum of squared deviations of each month is taken from the month mean in a second pass,
+    which is stable whatever the magnitude of the values.
+
+    Parameters
+    ----------
+    station_id : str
+        Station ID
+    dates : list
+        Observation dates in ascending order, as dates, YYYY-MM-DD strings or day numbers
+    max_temp, min_temp, total_precip : list
+        Measurements, None where missing
+
+    Returns
+    -------
+    list[tuple]
+        Rows of the month staging table
+
+    """
+    months = np.array(dates, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    starts = np.flatnonzero(np.diff(months, prepend=months[0] - 1))
+    lengths = np.diff(starts, append=len(months))
+    # statistics of only nulls are null
+    nullable = lambda counts, values: [
+        v if n else None for n, v in zip(counts, values, strict=True)
+    ]
+    columns = []
+    for values in (max_temp, min_temp):
+        values = np.array(values, dtype=np.float64)
+        present = ~np.isnan(values)
+        counts = np.add.reduceat(present, starts)
+        totals = np.add.reduceat(np.where(present, values, 0.0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.repeat(totals / counts, lengths)
+        m2 = np.add.reduceat(np.where(present, values - means, 0.0) ** 2, starts)
+        stats = [totals, m2, np.fmin.reduceat(values, starts), np.fmax.reduceat(values, starts)]
+        counts = counts.tolist()
+        columns += [counts, *(nullable(counts, column.tolist()) for column in stats)]
+    values = np.array(total_precip, dtype=np.float64)
+    present = ~np.isnan(values)
+    counts = np.add.reduceat(present, starts).tolist()
+    totals = np.add.reduceat(np.where(present, values, 0.0), starts).tolist()
+    days = np.add.reduceat(values > 0, starts).tolist()
+    columns += [counts, nullable(counts, totals), days]
+    return [
+        (station_id, m // 12 + 1970, m % 12 + 1, *values)
+        for m, *values in zip(months[starts].tolist(), *columns, strict=True)
+    ]
+
+
+def read_months(bind: Connection | str, ranges: list[dict]) -> list[tuple]:
+    """Read station data ranges and aggregate them per month with NumPy.
+
+    Parameters
+    ----------
+    bind : Connection | str
+        SQLAlchemy connection, or database URL to connect to from a worker process
+    ranges : list[dict]
+        Ranges as returned by `decade_range`, or station_id and a decade of None to read the
+        whole station
+
+    Returns
+    -------
+    list[tuple]
+        Rows of the month staging table
+
+    """
+    if isinstance(bind, str):
+        engine = create_engine(bind)
+        try:
+            with engine.connect() as connection:
+                return read_months(connection, ranges)
+        finally:
+            engine.dispose()
+
+    layout = station_layout(bind)
+    stmt = (
+        # dates are read as stored, text or day numbers, which NumPy converts in bulk
+        select(layout.raw_date, *layout.measurements)
+        .select_from(layout.source)
+        .where(layout.station_id == bindparam("station_id"))
+        .order_by(layout.date)
+    )
+    padded = stmt.where(layout.date >= bindparam("start"), layout.date < bindparam("end"))
+    rows = []
+    for r in ranges:
+        # one range seek on the (station_id, date) index per station or decade
+        result = bind.execute(padded if r["decade"] is not None else stmt, r).all()
+        if result:
+            columns = (list(c) for c in zip(*result, strict=True))
+            rows += aggregate_months(r["station_id"], *columns)
+    return rows
+
+
+def stage_months_numpy(
+    connection: Connection, decades: list[dict] | None, workers: int = 1
+) -> None:
+    """Aggregate station_data per station and month in this process or a process pool.
+
+    An alternative to the GROUP BY of `stage_months` that fills the same staging table. Stations
+    are read with range seeks on the (station_id, date) index and aggregated with NumPy. With
+    more than one worker, partitions of the stations are read and aggregated in worker processes
+    over their own connections, so they only see committed rows.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    decades : list[dict] | None
+        Ranges to aggregate as returned by `decade_range`, None for all station data
+    workers : int, optional
+        Number of worker processes, by default 1 (aggregate in this process)
+
+    """
+    month_stage.create(connection, checkfirst=True)
+    connection.execute(month_stage.delete())
+    ranges = station_ranges(connection, decades)
+    if workers <= 1:
+        rows = read_months(connection, ranges)
+    else:
+        url = connection.engine.url.render_as_string(hide_password=False)
+        # a few partitions per worker so that large stations even out
+        n_partitions = min(len(ranges), 4 * workers) or 1
+        partitions = [ranges[i::n_partitions] for i in range(n_partitions)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = [
+                row
+                for part in pool.map(read_months, [url] * n_partitions, partitions)
+                for row in part
+            ]
+    if rows:
+        # the padded ranges of neighbouring decades overlap by a winter, which is staged once
+        insert_stmt = upsert(month_stage, connection.dialect.name).on_conflict_do_nothing()
+        connection.execute(
+            insert_stmt, [dict(zip(month_stage.c.keys(), r, strict=True)) for r in rows]
+        )
+
+
+def upsert_rollup(
+    connection: Connection,
+    table: Table,
+    keys: dict[str, ColumnElement],
+    decades: list[dict] | None = None,
+) -> int:
+    """Upsert summaries aggregated from the staged months.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    table : Table
+        Summary table, or its clustered copy
+    keys : dict[str, ColumnElement]
+        Key columns of the summary after station_id, and their expressions over the staged
+        months
+    decades : list[dict] | None, optional
+        station_id and decade to restrict the summaries to, by default every staged month
 
     Returns
     -------
@@ -29,40 +365,304 @@ def summarize_stations(engine: Engine) -> int:
         Count of rows touched
 
     """
-    # Group by year and station to get average max temp, average min temp, and cumulative precipitation
-    stmt = select(
-        StationData.station_id,
-        func.strftime("%Y", StationData.date).cast(Integer).label("year"),
-        func.round(func.avg(StationData.max_temp), 1).label("avg_max_temp"),
-        func.round(func.avg(StationData.min_temp), 1).label("avg_min_temp"),
-        func.sum(StationData.total_precip).label("cumulative_precip"),
-    ).group_by(StationData.station_id, "year")
-
-    # Upsert to new table with select
-    upsert_stmt = sqlite_upsert(StationSummary).from_select(
-        ["station_id", "year", "avg_max_temp", "avg_min_temp", "cumulative_precip"], stmt
+    dialect_name = connection.dialect.name
+    months = month_stage.c
+    groups = [months.station_id, *keys.values()]
+    # the staged months of each summary, with the spread of each month's mean temperature
+    # around the mean of the summary, n * (month mean - summary mean)^2
+    spreads = []
+    for m in TEMPERATURES:
+        n, total = months[f"n_{m}"], months[f"sum_{m}"]
+        mean = func.sum(total).over(partition_by=groups) / func.nullif(
+            func.sum(n).over(partition_by=groups), 0
+        )
+        spreads.append((n * func.power(total / func.nullif(n, 0) - mean, 2)).label(f"spread_{m}"))
+    staged = select(
+        months.station_id,
+        *(value.label(key) for key, value in keys.items()),
+        *(c for c in months if c.name not in ("station_id", "year", "month")),
+        *spreads,
     )
+    if decades is not None:
+        staged = staged.where(
+            months.station_id == bindparam("station_id"),
+            months.year >= bindparam("decade"),
+            months.year < bindparam("decade") + 10,
+        )
+    staged = staged.subquery()
+
+    s = staged.c
+    stats = {
+        "avg_max_temp": round_ratio(s.sum_max_temp, s.n_max_temp, dialect_name),
+        "avg_min_temp": round_ratio(s.sum_min_temp, s.n_min_temp, dialect_name),
+        "cumulative_precip": func.sum(s.sum_precip),
+    }
+    for m in TEMPERATURES:
+        n = func.sum(s[f"n_{m}"])
+        # squared deviations from the summary mean, combined from the months pairwise-stably
+        # (Chan et al.) as the months' own m2 plus the spread of their means
+        m2 = func.sum(s[f"m2_{m}"]) + func.sum(s[f"spread_{m}"])
+        stats |= {
+            f"n_{m}": n,
+            f"min_{m}": func.min(s[f"min_{m}"]),
+            f"max_{m}": func.max(s[f"max_{m}"]),
+            f"stddev_{m}": round_decimal(func.sqrt(m2 / func.nullif(n - 1, 0)), dialect_name),
+        }
+    stats |= {"n_precip": func.sum(s.n_precip), "precip_days": func.sum(s.precip_days)}
+    # the statistics the summary table holds
+    stats = {name: value for name, value in stats.items() if name in table.c}
+    summary_keys = [s.station_id, *(s[k] for k in keys)]
+    stmt = (
+        select(*summary_keys, *(value.label(name) for name, value in stats.items()))
+        .group_by(*summary_keys)
+        # insert in key order so summary ids do not depend on how the database groups
+        .order_by(*summary_keys)
+    )
+
+    key = ["station_id", *keys]
+    if is_clustered(table):
+        # number the summaries new to the table in key order
+        rollups = stmt.subquery()
+        first = select(func.coalesce(func.max(table.c.id), 0) + 1).scalar_subquery()
+        ids = new_ids(first, table.c.id.is_(None), [rollups.c[k] for k in key])
+        stmt = (
+            select(rollups, ids.label("id"))
+            .select_from(rollups.outerjoin(table, and_(*(table.c[k] == rollups.c[k] for k in key))))
+            # lets SQLite parse ON CONFLICT after the join
+            .where(true())
+        )
+
+    # Upsert to the summary table with select
+    columns = [c.name for c in stmt.selected_columns]
+    upsert_stmt = upsert(table, dialect_name).from_select(columns, stmt)
 
-    # Do not duplicate if year and station exist; on conflict update the summaries
+    # Do not duplicate if the key exists; on conflict update the summaries
     upsert_stmt = upsert_stmt.on_conflict_do_update(
-        index_elements=[StationSummary.station_id, StationSummary.year],
-        set_={
-            "avg_max_temp": upsert_stmt.excluded.avg_max_temp,
-            "avg_min_temp": upsert_stmt.excluded.avg_min_temp,
-            "cumulative_precip": upsert_stmt.excluded.cumulative_precip,
-        },
+        index_elements=[table.c[c] for c in key],
+        set_={c: upsert_stmt.excluded[c] for c in stats},
     )
 
+    # INSERT rowcounts are only kept after the cursor closes when asked for
+    options = {"preserve_rowcount": True}
+    if decades is None:
+        return connection.execute(upsert_stmt, execution_options=options).rowcount
+    return connection.execute(upsert_stmt, decades, execution_options=options).rowcount
+
+
+def summarize(
+    connection: Connection,
+    incremental: bool = False,
+    telemetry: Telemetry | None = None,
+    method: str = "sql",
+    workers: int = 1,
+) -> int:
+    """Upsert annual, monthly, seasonal and decadal summaries and clear the change log.
+
+    The data generation is bumped with the summaries.
+
+    Runs in the connection's transaction. Station data is aggregated per month once, and every
+    summary is rolled up from those months.
+
+    Parameters
+    ----------
+    connection : Connection
+        SQLAlchemy connection
+    incremental : bool, optional
+        Only recompute the summaries of the decades with (station_id, year) groups logged in
+        station_data_changes, by default False (recompute every summary)
+    telemetry : Telemetry | None, optional
+        Collects the time spent reading the change log, aggregating, rolling up and clearing
+        the log, by default None
+    method : str, optional
+        Aggregate station_data per month with a SQL GROUP BY ("sql") or with NumPy ("numpy"),
+        by default "sql". Both stage the same sums and counts, from which the summaries are
+        averaged and rounded in SQL
+    workers : int, optional
+        Worker processes of the "numpy" method, by default 1
+
+    Returns
+    -------
+    int
+        Count of annual summary rows touched
+
+    """
+    dialect_name = connection.dialect.name
+    changes = StationDataChange.__table__
+    if dialect_name == "postgresql":
+        # hold off loaders logging new changes until the log is cleared with this transaction
+        connection.exec_driver_sql(f"LOCK TABLE {changes.name} IN SHARE ROW EXCLUSIVE MODE")
+
+    decades = None
+    if incremental:
+        with stage(telemetry, "read_changes"):
+            groups = connection.execute(select(changes.c.station_id, changes.c.year)).all()
+        if not groups:
+            return 0
+        # the decadal summary of a changed year needs its whole decade
+        decades = [
+            decade_range(station_id, decade)
+            for station_id, decade in sorted({(s, y - y % 10) for s, y in groups})
+        ]
+
+    with stage(telemetry, "aggregate"):
+        if method == "numpy":
+            stage_months_numpy(connection, decades, workers)
+        else:
+            stage_months(connection, decades)
+
+    months = month_stage.c
+    season = case(
+        (months.month.in_([12, 1, 2]), "DJF"),
+        (months.month.in_([3, 4, 5]), "MAM"),
+        (months.month.in_([6, 7, 8]), "JJA"),
+        else_="SON",
+    )
+    clustered = schema_clustered(connection)
+    with stage(telemetry, "rollup"):
+        rowcount = upsert_rollup(
+            connection,
+            summary_table(StationSummary.__table__, clustered),
+            {"year": months.year},
+            decades,
+        )
+        upsert_rollup(
+            connection,
+            summary_table(StationMonthly.__table__, clustered),
+            {"year": months.year, "month": months.month},
+            decades,
+        )
+        # every staged season is whole, so seasons are not restricted to the changed decades
+        upsert_rollup(
+            connection,
+            summary_table(StationSeasonal.__table__, clustered),
+            {
+                "year": case((months.month == 12, months.year + 1), else_=months.year),
+                "season": season,
+            },
+        )
+        upsert_rollup(
+            connection,
+            summary_table(StationDecadal.__table__, clustered),
+            {"decade": months.year - months.year % 10},
+            decades,
+        )
+
+        bump_generation(connection)
+
+    with stage(telemetry, "clear_changes"):
+        if incremental:
+            connection.execute(
+                delete(changes).where(
+                    changes.c.station_id == bindparam("station_id"),
+                    changes.c.year == bindparam("year"),
+                ),
+                [{"station_id": s, "year": y} for s, y in groups],
+            )
+        else:
+            # every logged group is now summarized
+            connection.execute(delete(changes))
+    return rowcount
+
+
+def summarize_stations(
+    engine: Engine,
+    incremental: bool = False,
+    telemetry: Telemetry | None = None,
+    method: str = "sql",
+    workers: int = 1,
+) -> int:
+    """Summarize weather station data annually.
+
+    Calculate the maximum temperature, minimum temperature, and cumulative precipitation for each year in record
+    Load to station_summary, and roll up the same per month, season and decade
+    Nulls are by default skipped
+    Runs on SQLite and PostgreSQL
+
+    Parameters
+    ----------
+    engine : Engine
+        SQLAlchemy engine
+    incremental : bool, optional
+        Only recompute the (station_id, year) groups changed by loads since the last summary,
+        by default False
+    telemetry : Telemetry | None, optional
+        Collects the time spent per stage, by default None
+    method : str, optional
+        Aggregation method, "sql" or "numpy", by default "sql"
+    workers : int, optional
+        Worker processes of the "numpy" method, by default 1
+
+    Returns
+    -------
+    int
+        Count of rows touched
+
+    """
+    for model in (
+        StationDataChange,
+        StationMonthly,
+        StationSeasonal,
+        StationDecadal,
+        DataGeneration,
+    ):
+        model.__table__.create(engine, checkfirst=True)
+    # statistics added to the annual summary since the database was created
+    add_missing_columns(engine, StationSummary.__table__)
     # execute
     with Session(engine) as session:
-        result = session.execute(upsert_stmt)
-        session.commit()
+        rowcount = summarize(session.connection(), incremental, telemetry, method, workers)
+        with stage(telemetry, "commit"):
+            session.commit()
 
-    return result.rowcount
+    return rowcount
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="A script to summarize weather station data")
+    parser.add_argument(
+        "-s",
+        "--sqlite-db",
+        help="Database string (default: the application database)",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Only summarize stations and years changed since the last summary",
+    )
+    parser.add_argument(
+        "--engine",
+        dest="method",
+        choices=["sql", "numpy"],
+        default="sql",
+        help="Aggregate with a SQL GROUP BY or with NumPy in worker processes (default: sql)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes of the numpy engine (default: 1)",
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Write a JSON run report with per-stage timings to this path",
+    )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Print a JSON log line for the run to stderr",
+    )
+
+    args = parser.parse_args()
+    engine = create_engine(args.sqlite_db) if args.sqlite_db else base_engine
+    telemetry = Telemetry("summarize", log=args.log_json)
     print(f"Starting summarizing at {datetime.now(UTC)}")
-    rowcount = summarize_stations(base_engine)
+    rowcount = summarize_stations(engine, args.incremental, telemetry, args.method, args.workers)
     print(f"Finished summarizing at {datetime.now(UTC)}")
     print(f"Touched {rowcount} rows.")
+    if args.report:
+        telemetry.write_report(args.report, rows=rowcount)
+        print(f"Wrote run report to {args.report}")
+    else:
+        telemetry.report(rows=rowcount)
@@ -0,0 +1,148 @@
+"""Stage timings, throughput and memory of pipeline runs, reported as JSON."""
+
+import json
+import resource
+import sys
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from time import perf_counter
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def peak_rss_mib(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size in MiB, of this process or of its terminated children.
+
+    ru_maxrss is reported in bytes on macOS and in KiB elsewhere.
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+@dataclass(slots=True)
+class Telemetry:
+    """Timings of the stages of a run, in total and per file.
+
+    Stage time is attributed to the file in progress until `file_done` is called. Stages of the
+    whole run, such as planning or a final commit, are timed with `per_file=False` and only
+    count towards the totals.
+    """
+
+    run: str
+    log: bool = False
+    started: datetime = field(default_factory=lambda: datetime.now(UTC))
+    stages: dict[str, float] = field(default_factory=dict)
+    files: list[dict] = field(default_factory=list)
+    current: dict[str, float] = field(default_factory=dict)
+    start: float = field(default_factory=perf_counter)
+
+    @contextmanager
+    def stage(self, name: str, per_file: bool = True) -> Iterator[None]:
+        """Time a stage of the run, attributed to the file in progress if `per_file`."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            if per_file:
+                self.current[name] = self.current.get(name, 0.0) + elapsed
+
+    def timed(self, iterable: Iterable[T], name: str) -> Iterator[T]:
+        """Yield from an iterable, timing each step as a stage."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def file_done(self, name: str, rows: int, **fields) -> dict:
+        """Close the stages of a file.
+
+        Parameters
+        ----------
+        name : str
+            File name
+        rows : int
+            Rows read from the file
+        **fields
+            Additional fields of the file record
+
+        Returns
+        -------
+        dict
+            File record with its stage seconds, rows per second and the peak memory so far
+
+        """
+        seconds = sum(self.current.values())
+        record = {
+            "file": name,
+            "rows": rows,
+            "seconds": round(seconds, 6),
+            "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+            "stages": {k: round(v, 6) for k, v in self.current.items()},
+            "peak_rss_mib": peak_rss_mib(),
+            **fields,
+        }
+        self.current = {}
+        self.files.append(record)
+        self.emit("file", **record)
+        return record
+
+    def emit(self, event: str, **fields) -> None:
+        """Print a JSON log line to stderr if logging is enabled."""
+        if self.log:
+            line = {"ts": datetime.now(UTC).isoformat(), "run": self.run, "event": event, **fields}
+            print(json.dumps(line, default=str), file=sys.stderr, flush=True)
+
+    def report(self, **fields) -> dict:
+        """Summarize the run.
+
+        Parameters
+        ----------
+        **fields
+            Additional fields of the report, e.g. row counts. `rows` overrides the rows of the
+            files, for runs that do not read files
+
+        Returns
+        -------
+        dict
+            Run report with total stage seconds, throughput and peak memory
+
+        """
+        seconds = perf_counter() - self.start
+        rows = fields.pop("rows", sum(f["rows"] for f in self.files))
+        report = {
+            "run": self.run,
+            "started_at": self.started.isoformat(),
+            "finished_at": datetime.now(UTC).isoformat(),
+            "seconds": round(seconds, 6),
+            "rows": rows,
+            "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+            "stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "peak_rss_mib": peak_rss_mib(),
+            # parser processes, once they have exited
+            "peak_rss_children_mib": peak_rss_mib(resource.RUSAGE_CHILDREN),
+            **fields,
+            "files": self.files,
+        }
+        self.emit("report", **{k: v for k, v in report.items() if k != "files"})
+        return report
+
+    def write_report(self, path: Path | str, **fields) -> dict:
+        """Write the run report to a JSON file and return it."""
+        report = self.report(**fields)
+        Path(path).write_text(json.dumps(report, indent=2, default=str))
+        return report
+
+
+def stage(telemetry: Telemetry | None, name: str) -> AbstractContextManager:
+    """Time a stage if telemetry is collected."""
+    return telemetry.stage(name) if telemetry is not None else nullcontext()
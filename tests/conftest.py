@@ -1,4 +1,8 @@
 import os
+import shutil
+import socket
+import subprocess
+import tempfile
 from collections.abc import Generator
 from datetime import datetime
 from pathlib import Path
@@ -11,11 +15,15 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from pyprojroot import here
 from sqlalchemy import create_engine
+from sqlalchemy.engine.base import Engine
 from sqlalchemy.orm import sessionmaker
 
+from app.api.cache import CacheStats, response_cache
 from app.api.deps import get_db
 from app.api.main import api_router
-from app.core.db import Base
+from app.core.db import Base, BaseV2
+from app.core.schema import CLUSTERED, create_schema
+from app.models import StationData
 
 
 def remove_files(dir):
@@ -43,9 +51,35 @@ SessionTesting = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def app() -> Generator[FastAPI, Any, None]:
     """Create a fresh database on each test case."""
     Base.metadata.create_all(engine)  # Create the tables.
+    # an empty response cache, which reads the data generation on every request
+    response_cache.clear()
+    response_cache.generation = None
+    response_cache.ttl = 0
+    response_cache.stats = CacheStats()
     _app = start_application()
     yield _app
     Base.metadata.drop_all(engine)
+    BaseV2.metadata.drop_all(engine)
+    CLUSTERED.drop_all(engine)
+
+
+@pytest.fixture(scope="function")
+def schema_v2(app: FastAPI) -> None:
+    """Switch the fresh test database to the compact station data schema v2."""
+    StationData.__table__.drop(engine)
+    create_schema(engine, 2)
+
+
+@pytest.fixture(scope="function")
+def schema_clustered(app: FastAPI, request: pytest.FixtureRequest) -> int:
+    """Switch the fresh test database to clustered tables.
+
+    Of schema v1, or of the schema version the fixture is indirectly parametrized with.
+    """
+    version = getattr(request, "param", 1)
+    Base.metadata.drop_all(engine)
+    create_schema(engine, version, clustered=True)
+    return version
 
 
 @pytest.fixture(scope="function")
@@ -78,6 +112,51 @@ def client(app: FastAPI, db_session: SessionTesting) -> Generator[TestClient, An
         yield client
 
 
+@pytest.fixture(scope="session")
+def postgres_url() -> Generator[str, Any, None]:
+    """PostgreSQL database URL for dialect tests.
+
+    Uses TEST_POSTGRES_URL if set, otherwise starts a throwaway server with initdb and pg_ctl
+    found on PATH. Tests are skipped when neither is available.
+    """
+    if url := os.environ.get("TEST_POSTGRES_URL"):
+        yield url
+        return
+    initdb, pg_ctl = shutil.which("initdb"), shutil.which("pg_ctl")
+    if not (initdb and pg_ctl) or os.geteuid() == 0:
+        pytest.skip("PostgreSQL is not available (set TEST_POSTGRES_URL or put initdb on PATH)")
+
+    with tempfile.TemporaryDirectory() as tmp, socket.socket() as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+        data = Path(tmp) / "data"
+        subprocess.run(
+            [initdb, "-D", data, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+            check=True,
+            capture_output=True,
+        )
+        options = f"-k {tmp} -p {port} -c listen_addresses=''"
+        subprocess.run(
+            [pg_ctl, "-D", data, "-o", options, "-l", Path(tmp) / "log", "-w", "start"],
+            check=True,
+            capture_output=True,
+        )
+        try:
+            yield f"postgresql+psycopg://postgres@/postgres?host={tmp}&port={port}"
+        finally:
+            subprocess.run([pg_ctl, "-D", data, "-m", "immediate", "stop"], capture_output=True)
+
+
+@pytest.fixture(scope="function")
+def postgres_engine(postgres_url: str) -> Generator[Engine, Any, None]:
+    """Create fresh tables in the PostgreSQL database for each test case."""
+    pg_engine = create_engine(postgres_url)
+    Base.metadata.create_all(pg_engine)
+    yield pg_engine
+    Base.metadata.drop_all(pg_engine)
+    pg_engine.dispose()
+
+
 @pytest.fixture
 def create_files() -> None:
     """Fixture to create test data files for scripts"""
@@ -161,6 +240,16 @@ def expected_summary_data() -> None:
                 -1.0,
             ],
             "cumulative_precip": [4, 6.0],
+            "n_max_temp": [3, 3],
+            "min_max_temp": [0.0, 0.0],
+            "max_max_temp": [0.0, 2.0],
+            "stddev_max_temp": [0.0, 1.0],
+            "n_min_temp": [3, 2],
+            "min_min_temp": [-3.0, -2.0],
+            "max_min_temp": [-1.0, 0.0],
+            "stddev_min_temp": [1.0, 1.4],
+            "n_precip": [2, 3],
+            "precip_days": [2, 3],
         }
     )
 
@@ -295,6 +384,16 @@ def summary__all():
             "avg_max_temp": 0.0,
             "avg_min_temp": -2,
             "cumulative_precip": 4.0,
+            "n_max_temp": 3,
+            "min_max_temp": 0.0,
+            "max_max_temp": 0.0,
+            "stddev_max_temp": 0.0,
+            "n_min_temp": 3,
+            "min_min_temp": -3.0,
+            "max_min_temp": -1.0,
+            "stddev_min_temp": 1.0,
+            "n_precip": 2,
+            "precip_days": 2,
         },
         {
             "id": 2,
@@ -303,6 +402,16 @@ def summary__all():
             "avg_max_temp": 1.0,
             "avg_min_temp": -1.0,
             "cumulative_precip": 6.0,
+            "n_max_temp": 3,
+            "min_max_temp": 0.0,
+            "max_max_temp": 2.0,
+            "stddev_max_temp": 1.0,
+            "n_min_temp": 2,
+            "min_min_temp": -2.0,
+            "max_min_temp": 0.0,
+            "stddev_min_temp": 1.4,
+            "n_precip": 3,
+            "precip_days": 3,
         },
     ]
 
@@ -317,6 +426,16 @@ def summary__station():
             "avg_max_temp": 0.0,
             "avg_min_temp": -2.0,
             "cumulative_precip": 4.0,
+            "n_max_temp": 3,
+            "min_max_temp": 0.0,
+            "max_max_temp": 0.0,
+            "stddev_max_temp": 0.0,
+            "n_min_temp": 3,
+            "min_min_temp": -3.0,
+            "max_min_temp": -1.0,
+            "stddev_min_temp": 1.0,
+            "n_precip": 2,
+            "precip_days": 2,
         }
     ]
 
@@ -331,6 +450,16 @@ def summary__year():
             "avg_max_temp": 0.0,
             "avg_min_temp": -2.0,
             "cumulative_precip": 4.0,
+            "n_max_temp": 3,
+            "min_max_temp": 0.0,
+            "max_max_temp": 0.0,
+            "stddev_max_temp": 0.0,
+            "n_min_temp": 3,
+            "min_min_temp": -3.0,
+            "max_min_temp": -1.0,
+            "stddev_min_temp": 1.0,
+            "n_precip": 2,
+            "precip_days": 2,
         },
         {
             "id": 2,
@@ -339,5 +468,15 @@ def summary__year():
             "avg_max_temp": 1.0,
             "avg_min_temp": -1.0,
             "cumulative_precip": 6.0,
+            "n_max_temp": 3,
+            "min_max_temp": 0.0,
+            "max_max_temp": 2.0,
+            "stddev_max_temp": 1.0,
+            "n_min_temp": 2,
+            "min_min_temp": -2.0,
+            "max_min_temp": 0.0,
+            "stddev_min_temp": 1.4,
+            "n_precip": 3,
+            "precip_days": 3,
         },
     ]
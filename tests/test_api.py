@@ -1,10 +1,19 @@
+import csv
+import json
+import threading
 from collections.abc import Generator
 from typing import Any
 
+import pandas as pd
 import pytest
 from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
 from pyprojroot import here
+from sqlalchemy import event
 
+from app.api.cache import CachedResponse, ResponseCache, response_cache
+from app.api.routes import weather
+from app.core.types import SeasonalReturn, SummaryReturn, WeatherReturn
 from scripts.load import main as load_main
 from scripts.summarize import summarize_stations
 from tests.conftest import SQLALCHEMY_DATABASE_URL, engine, remove_files
@@ -191,3 +200,662 @@ def test_summary__pagination(
         assert response.json()[0]["id"] == first_id
     finally:
         remove_files(dir)
+
+
+def crawl(client: TestClient, url: str, **params) -> list[list]:
+    """Pages of a route, following the X-Next-Cursor header until the last page."""
+    pages = []
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        if "X-Next-Cursor" not in response.headers:
+            return pages
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_weather__ranges(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files: None,
+    weather__all: dict,
+    version: int,
+) -> None:
+    """Test filtering on several stations and a range of dates, on the pages and export."""
+    if version == 2:
+        request.getfixturevalue("schema_v2")
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+
+        for params, expected in [
+            (
+                {"station_id": ["USC00331541", "USC00123456"], "start_date": "1985-01-02"},
+                [row for row in weather__all if row["date"] >= "1985-01-02"],
+            ),
+            (
+                {"station_id": ["USC00331541", "USC00331541"], "end_date": "1985-01-02"},
+                [
+                    row
+                    for row in weather__all
+                    if row["station_id"] == "USC00331541" and row["date"] <= "1985-01-02"
+                ],
+            ),
+            (
+                {"start_date": "1985-01-02", "end_date": "1985-01-02"},
+                [row for row in weather__all if row["date"] == "1985-01-02"],
+            ),
+            ({"station_id": ["USC00000000"], "start_date": "1985-01-01"}, []),
+            ({"station_id": ""}, weather__all),
+            (
+                {"station_id": ["", "USC00331541"]},
+                [row for row in weather__all if row["station_id"] == "USC00331541"],
+            ),
+        ]:
+            response = client.get("http://localhost:8000/weather/", params=params)
+            assert response.status_code == 200
+            assert response.json() == expected
+
+            response = client.get("http://localhost:8000/weather/export", params=params)
+            assert [json.loads(line) for line in response.text.splitlines()] == expected
+    finally:
+        remove_files(dir)
+
+
+def test_summary__ranges(
+    client: Generator[TestClient, Any, None], create_files: None, summary__year: dict
+) -> None:
+    """Test filtering summaries on several stations and a range of years."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        for params, expected in [
+            ({"station_id": ["USC00331541", "USC00123456"], "start_year": 1985}, summary__year),
+            ({"start_year": 1980, "end_year": 1985}, summary__year),
+            ({"station_id": ["USC00123456"], "end_year": 1990}, summary__year[:1]),
+            ({"start_year": 1986}, []),
+            ({"end_year": 1984}, []),
+            ({"station_id": ""}, summary__year),
+        ]:
+            response = client.get("http://localhost:8000/weather/summary", params=params)
+            assert response.status_code == 200
+            assert response.json() == expected
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_weather__lookup(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files: None,
+    weather__all: dict,
+    version: int,
+) -> None:
+    """Test a lookup returns the row of every station and date in one query, in order."""
+    if version == 2:
+        request.getfixturevalue("schema_v2")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append(statement)
+
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+
+        rows = {(row["station_id"], row["date"]): row for row in weather__all}
+        keys = [
+            ("USC00331541", "1985-01-03"),
+            ("USC00123456", "1985-01-01"),
+            ("USC00123456", "1986-01-01"),
+            ("USC00000000", "1985-01-01"),
+            ("USC00331541", "1985-01-03"),
+        ]
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post(
+                "http://localhost:8000/weather/lookup",
+                json=[{"station_id": station_id, "date": date} for station_id, date in keys],
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        assert response.json() == [rows.get(key) for key in keys]
+        assert len(statements) == 1
+
+        response = client.post("http://localhost:8000/weather/lookup", json=[])
+        assert response.status_code == 200
+        assert response.json() == []
+    finally:
+        remove_files(dir)
+
+
+def test_summary__lookup(
+    client: Generator[TestClient, Any, None], create_files: None, summary__year: dict
+) -> None:
+    """Test a lookup returns the summary of every station and year, in order."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        rows = {(row["station_id"], row["year"]): row for row in summary__year}
+        keys = [("USC00331541", 1985), ("USC00331541", 1990), ("USC00123456", 1985)]
+        response = client.post(
+            "http://localhost:8000/weather/summary/lookup",
+            json=[{"station_id": station_id, "year": year} for station_id, year in keys],
+        )
+        assert response.status_code == 200
+        assert response.json() == [rows.get(key) for key in keys]
+
+        response = client.post(
+            "http://localhost:8000/weather/summary/lookup", json=[{"station_id": "USC00331541"}]
+        )
+        assert response.status_code == 422
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_weather__cursor(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files__many: None,
+    version: int,
+) -> None:
+    """Test a crawl of the weather endpoint by cursor returns every row once, in key order."""
+    if version == 2:
+        request.getfixturevalue("schema_v2")
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+
+        pages = crawl(client, "http://localhost:8000/weather/", limit=5)
+        assert [len(page) for page in pages] == [5] * 8 + [2]
+        rows = [row for page in pages for row in page]
+        assert [row["id"] for row in rows] == list(range(1, 43))
+        assert rows == sorted(rows, key=lambda row: (row["station_id"], row["date"]))
+
+        # a page that ends on the last row has no next page
+        pages = crawl(client, "http://localhost:8000/weather/", station_id="USC0012", limit=2)
+        assert [[row["date"] for row in page] for page in pages] == [["1985-01-01", "1985-01-02"]]
+    finally:
+        remove_files(dir)
+
+
+def test_summary__cursor(
+    client: Generator[TestClient, Any, None], create_files__many: None
+) -> None:
+    """Test a crawl of the summary endpoint by cursor, filtered and offset from the cursor."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        pages = crawl(client, "http://localhost:8000/weather/summary", year=1985, limit=10)
+        assert [[row["id"] for row in page] for page in pages] == [
+            list(range(1, 11)),
+            list(range(11, 21)),
+            [21],
+        ]
+
+        response = client.get("http://localhost:8000/weather/summary", params={"limit": 10})
+        cursor = response.headers["X-Next-Cursor"]
+        response = client.get(
+            "http://localhost:8000/weather/summary",
+            params={"limit": 2, "offset": 3, "cursor": cursor},
+        )
+        assert [row["id"] for row in response.json()] == [14, 15]
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize(
+    "params", [{"limit": 0}, {"limit": -1}, {"offset": -1}, {"limit": 0, "offset": -1}]
+)
+@pytest.mark.parametrize(
+    "route",
+    ["/weather/", "/weather/summary", "/weather/summary/monthly", "/weather/summary/decadal"],
+)
+def test_pagination_invalid(
+    client: Generator[TestClient, Any, None], create_files: None, route: str, params: dict
+) -> None:
+    """Test a page size under 1 or a negative offset is rejected, with loaded data."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        response = client.get(f"http://localhost:8000{route}", params=params)
+        assert response.status_code == 422
+        response = client.get(f"http://localhost:8000{route}", params={"limit": 1})
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("cursor", ["%%%", "WzFd", "WyJVU0MwMDEyMzQ1NiIsIm5vdCBhIHllYXIiXQ"])
+def test_summary__cursor_invalid(client: Generator[TestClient, Any, None], cursor: str) -> None:
+    """Test a cursor that is not base64, of the wrong length or of the wrong types is rejected."""
+    response = client.get("http://localhost:8000/weather/summary", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "route,key",
+    [
+        pytest.param("monthly", {"year": 1985, "month": 1}, id="monthly"),
+        pytest.param("seasonal", {"year": 1985, "season": "DJF"}, id="seasonal"),
+        pytest.param("decadal", {"decade": 1980}, id="decadal"),
+    ],
+)
+def test_summary__rollup(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    summary__all: list,
+    route: str,
+    key: dict,
+) -> None:
+    """Test rollup routes.
+
+    The fixture files hold January 1985 only, so every rollup matches the annual summary.
+    """
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        rollup = ["id", "station_id", "avg_max_temp", "avg_min_temp", "cumulative_precip"]
+        expected = [{k: row[k] for k in rollup} | key for row in summary__all]
+        response = client.get(f"http://localhost:8000/weather/summary/{route}")
+        assert response.status_code == 200
+        assert response.json() == expected
+
+        response = client.get(
+            f"http://localhost:8000/weather/summary/{route}",
+            params={"station_id": "USC00331541", **key},
+        )
+        assert response.status_code == 200
+        assert response.json() == expected[1:]
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("clustered", [False, True])
+def test_summary__seasonal_order(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files: None,
+    clustered: bool,
+) -> None:
+    """Test seasons are listed in calendar order, not by name, on every page."""
+    if clustered:
+        request.getfixturevalue("schema_clustered")
+    try:
+        dir = str(here() / "tests/data")
+        pd.DataFrame(
+            data={1: [19850415, 19850715, 19851015, 19851215], 2: [1] * 4, 3: [0] * 4, 4: [0] * 4}
+        ).to_csv(here() / "tests/data/USC00331541.txt", sep="\t", header=False, index=False)
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        url = "http://localhost:8000/weather/summary/seasonal"
+        response = client.get(url, params={"station_id": "USC00331541"})
+        assert [(row["year"], row["season"]) for row in response.json()] == [
+            (1985, "MAM"),
+            (1985, "JJA"),
+            (1985, "SON"),
+            (1986, "DJF"),
+        ]
+
+        rows = client.get(url).json()
+        keys = [(row["station_id"], row["year"], row["season"]) for row in rows]
+        assert keys == [
+            ("USC00123456", 1985, "DJF"),
+            ("USC00331541", 1985, "MAM"),
+            ("USC00331541", 1985, "JJA"),
+            ("USC00331541", 1985, "SON"),
+            ("USC00331541", 1986, "DJF"),
+        ]
+        pages = [client.get(url, params={"limit": 2, "offset": i}).json() for i in (0, 2, 4)]
+        assert sum(pages, []) == rows
+    finally:
+        remove_files(dir)
+
+
+def test_summary__seasonal_invalid(client: Generator[TestClient, Any, None]) -> None:
+    """Test an unknown season is rejected."""
+    response = client.get("http://localhost:8000/weather/summary/seasonal?season=WIN")
+    assert response.status_code == 422
+
+
+def test_weather__schema_v2(
+    client: Generator[TestClient, Any, None],
+    schema_v2: None,
+    create_files: None,
+    weather__all: dict,
+    weather__station_date: dict,
+) -> None:
+    """Test the weather route returns the same on the compact storage schema."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+
+        response = client.get("http://localhost:8000/weather/")
+        assert response.status_code == 200
+        assert response.json() == weather__all
+
+        response = client.get(
+            "http://localhost:8000/weather/?station_id=USC00123456&date=1985-01-01"
+        )
+        assert response.status_code == 200
+        assert response.json() == weather__station_date
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("gzip", [False, True])
+@pytest.mark.parametrize("version", [1, 2])
+def test_weather__export(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files: None,
+    monkeypatch: pytest.MonkeyPatch,
+    weather__all: dict,
+    weather__station_date: dict,
+    version: int,
+    gzip: bool,
+) -> None:
+    """Test exports stream every row of the filters as JSON lines or CSV, in chunks."""
+    if version == 2:
+        request.getfixturevalue("schema_v2")
+    # several chunks of the few test rows
+    monkeypatch.setattr(weather, "EXPORT_ROWS", 2)
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+
+        url = "http://localhost:8000/weather/export"
+        response = client.get(url, params={"gzip": gzip})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers.get("content-encoding") == ("gzip" if gzip else None)
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert rows == weather__all
+
+        response = client.get(url, params={"format": "csv", "gzip": gzip})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert list(csv.reader(response.text.splitlines())) == [
+            list(rows[0]),
+            *([str(v) if v is not None else "" for v in row.values()] for row in rows),
+        ]
+
+        response = client.get(url, params={"station_id": "USC00123456", "date": "1985-01-01"})
+        assert [json.loads(line) for line in response.text.splitlines()] == weather__station_date
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_encode_rows(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files: None,
+    version: int,
+) -> None:
+    """Test routes serialize rows as their response models, without validating each row."""
+    if version == 2:
+        request.getfixturevalue("schema_v2")
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        for route, model in [
+            ("/weather/", WeatherReturn),
+            ("/weather/summary", SummaryReturn),
+            ("/weather/summary/seasonal", SeasonalReturn),
+        ]:
+            response = client.get(f"http://localhost:8000{route}")
+            assert response.status_code == 200
+            assert response.json()
+            adapter = TypeAdapter(list[model])
+            assert response.content == adapter.dump_json(adapter.validate_json(response.content))
+    finally:
+        remove_files(dir)
+
+
+def test_query_templates(client: Generator[TestClient, Any, None], create_files: None) -> None:
+    """Test routes run one SQL text per combination of filters, with the values bound."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # besides the data generation, read for the response cache
+        if statement.lstrip().upper().startswith("SELECT") and "data_generation" not in statement:
+            statements.append(statement)
+
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            for station_id in ["USC00123456", "USC00331541", "' OR '1'='1"]:
+                for route in ["/weather/", "/weather/summary", "/weather/summary/decadal"]:
+                    response = client.get(
+                        f"http://localhost:8000{route}", params={"station_id": station_id}
+                    )
+                    assert response.status_code == 200
+                    assert all(row["station_id"] == station_id for row in response.json())
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert len(set(statements)) == 3
+        assert not any("USC" in statement for statement in statements)
+    finally:
+        remove_files(dir)
+
+
+def test_db_threads(client: Generator[TestClient, Any, None], create_files: None) -> None:
+    """Test routes run their queries in the database threads, off the event loop."""
+    threads = set()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        threads.add(threading.current_thread().name)
+
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            for route in ["/weather/", "/weather/summary", "/weather/summary/monthly"]:
+                response = client.get(f"http://localhost:8000{route}")
+                assert response.status_code == 200
+                assert response.json()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert threads
+        assert all(name.startswith("db") for name in threads)
+    finally:
+        remove_files(dir)
+
+
+def test_response_cache(client: Generator[TestClient, Any, None], create_files: None) -> None:
+    """Test responses are cached until a load bumps the data generation, with ETags."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        url = "http://localhost:8000/weather/?station_id=USC00331541&date=1985-01-02"
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first.headers["X-Cache"] == "MISS"
+        # the same query parameters, normalized, are the same entry
+        second = client.get(url.replace("1985-01-02", "1985-01-02T00:00:00"))
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.content == first.content
+        assert second.headers["ETag"] == first.headers["ETag"]
+
+        response = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        # a load of changed data makes a new generation, so the old ETag no longer matches
+        pd.DataFrame(data={1: [19850102], 2: [50], 3: [10], 4: [0]}).to_csv(
+            here() / "tests/data/USC00331541.txt", sep="\t", header=False, index=False
+        )
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        response = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.headers["ETag"] != first.headers["ETag"]
+        assert response.json()[0]["max_temp"] == 50
+
+        stats = client.get("http://localhost:8000/weather/cache").json()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["not_modified"] == 1
+        assert stats["invalidations"] == 1
+        assert stats["entries"] == 1
+    finally:
+        remove_files(dir)
+
+
+def test_response_cache__generation_order(
+    client: Generator[TestClient, Any, None], create_files: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the cache keeps the newest generation it saw, whatever order they are read in."""
+    cache = ResponseCache(max_bytes=100, ttl=60)
+    cache.set_generation(2)
+    cache.put(("/weather/",), CachedResponse(b"[]", {}))
+    cache.set_generation(1)
+    assert cache.generation == 2
+    assert len(cache.entries) == 1
+    assert cache.stats.invalidations == 0
+    cache.set_generation(3)
+    assert cache.generation == 3
+    assert not cache.entries
+    assert cache.stats.invalidations == 1
+
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+
+        url = "http://localhost:8000/weather/?station_id=USC00331541"
+        first = client.get(url)
+        # the cache has seen a newer generation than the database the response is rendered from
+        newer = response_cache.generation + 1
+        monkeypatch.setattr(response_cache, "ttl", 60)
+        response_cache.set_generation(newer)
+        response = client.get(url)
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.headers["ETag"] == first.headers["ETag"]
+        assert response_cache.generation == newer
+        assert not response_cache.entries
+    finally:
+        remove_files(dir)
+
+
+def test_response_cache__eviction(
+    client: Generator[TestClient, Any, None], create_files: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the least recently used responses are evicted to fit the size of the cache."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+
+        urls = [
+            f"http://localhost:8000/weather/?station_id={station_id}"
+            for station_id in ["USC00123456", "USC00331541"]
+        ]
+        size = len(client.get(urls[0]).content)
+        monkeypatch.setattr(response_cache, "max_bytes", size + 1)
+        client.get(urls[1])
+        assert client.get(urls[0]).headers["X-Cache"] == "MISS"
+
+        stats = client.get("http://localhost:8000/weather/cache").json()
+        assert stats["evictions"] == 2
+        assert stats["entries"] == 1
+        assert stats["bytes"] <= size + 1
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("schema_clustered", [1, 2], indirect=True)
+def test_query_plans__clustered(
+    client: Generator[TestClient, Any, None], schema_clustered: int, create_files: None
+) -> None:
+    """Test no filtered route scans a table of a clustered database.
+
+    Every query a route runs is explained with SQLite's EXPLAIN QUERY PLAN, which reports a
+    full table or index scan as SCAN and a lookup as SEARCH.
+    """
+    urls = [
+        "/weather/?station_id=USC00123456",
+        "/weather/?date=1985-01-01",
+        "/weather/?station_id=USC00123456&date=1985-01-01",
+        "/weather/summary?station_id=USC00123456",
+        "/weather/summary?year=1985",
+        "/weather/summary?station_id=USC00123456&year=1985",
+        "/weather/summary/monthly?station_id=USC00123456",
+        "/weather/summary/monthly?year=1985",
+        "/weather/summary/monthly?month=1",
+        "/weather/summary/monthly?year=1985&month=1",
+        "/weather/summary/seasonal?station_id=USC00123456",
+        "/weather/summary/seasonal?year=1985",
+        "/weather/summary/seasonal?season=DJF",
+        "/weather/summary/seasonal?year=1985&season=DJF",
+        "/weather/summary/decadal?station_id=USC00123456",
+        "/weather/summary/decadal?decade=1980",
+        "/weather/?start_date=1985-01-01&end_date=1985-01-02",
+        "/weather/?station_id=USC00123456&station_id=USC00331541&start_date=1985-01-02",
+        "/weather/summary?start_year=1985&end_year=1990",
+        "/weather/summary?station_id=USC00123456&station_id=USC00331541&end_year=1990",
+    ]
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            queries.append((statement, parameters))
+
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+        # unfiltered pages after a cursor seek past its key
+        for route, query in [
+            ("/weather/", "station_id=USC00123456"),
+            ("/weather/summary", "year=1985"),
+        ]:
+            response = client.get(f"http://localhost:8000{route}?{query}&limit=1")
+            urls.append(f"{route}?cursor={response.headers['X-Next-Cursor']}")
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            for url in urls:
+                response = client.get(f"http://localhost:8000{url}")
+                assert response.status_code == 200
+                assert response.json()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert len(queries) >= len(urls)
+        with engine.connect() as connection:
+            for statement, parameters in queries:
+                plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                scans = [row.detail for row in plan if row.detail.startswith("SCAN")]
+                assert not scans, statement
+    finally:
+        remove_files(dir)
@@ -1,13 +1,31 @@
+import bz2
+import gzip
+import io
+import json
+import lzma
+import tarfile
 from collections.abc import Generator
+from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 import pandas as pd
+import pytest
 from fastapi.testclient import TestClient
 from pandas.testing import assert_frame_equal
 from pyprojroot import here
+from sqlalchemy import delete, insert, inspect, select
+from sqlalchemy.engine.base import Engine
 
+from app.core.db import upsert
+from app.core.schema import station_layout
+from app.models import StationData, StationDataChange, StationExportChange
+from scripts.load import get_files, load_data, read_data, watch_dir
 from scripts.load import main as load_main
-from scripts.summarize import summarize_stations
+from scripts.migrate import migrate
+from scripts.parse import parse_station_data, parse_station_stream
+from scripts.summarize import aggregate_months, month_stage, stage_months, summarize_stations
+from scripts.telemetry import Telemetry
 from tests.conftest import SQLALCHEMY_DATABASE_URL, engine, remove_files
 
 
@@ -32,10 +50,20 @@ def test_load_data(
         remove_files(dir)
 
 
+@pytest.mark.parametrize(
+    "method,workers",
+    [
+        pytest.param("sql", 1, id="sql"),
+        pytest.param("numpy", 1, id="numpy"),
+        pytest.param("numpy", 2, id="numpy workers"),
+    ],
+)
 def test_summarize_data(
     client: Generator[TestClient, Any, None],
     create_files: None,
     expected_summary_data: pd.DataFrame,
+    method: str,
+    workers: int,
 ):
     """Test case includes 3 dates for 2 files including missing data resulting in 2 stations and 2 years.
 
@@ -47,7 +75,7 @@ def test_summarize_data(
         load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
 
         # run summary
-        rowcount = summarize_stations(engine=engine)
+        rowcount = summarize_stations(engine=engine, method=method, workers=workers)
         assert rowcount == 2
 
         # read sql and compare as dataframes for convenience of assert_dataframe_equal
@@ -56,3 +84,641 @@ def test_summarize_data(
             assert_frame_equal(df_station_summary, expected_summary_data)
     finally:
         remove_files(dir)
+
+
+def test_stage_months__m2(client: Generator[TestClient, Any, None]):
+    """The SQL and NumPy methods stage the same m2, without the cancellation of a sum of squares.
+
+    Around 1e8 the squares exceed the precision of a double, so a sum of squares less the
+    squared sum loses the spread of these values.
+    """
+    values = [1e8 + 0.1, 1e8 + 0.2, 1e8 + 0.3]
+    dates = [datetime(1985, 1, day).date() for day in (1, 2, 3)]
+    with engine.begin() as connection:
+        connection.execute(
+            insert(StationData),
+            [
+                {"station_id": "USC00331541", "date": d, "max_temp": v, "min_temp": -v}
+                for d, v in zip(dates, values, strict=True)
+            ],
+        )
+        stage_months(connection, None)
+        staged = connection.execute(select(month_stage)).one()
+    expected = aggregate_months("USC00331541", dates, values, [-v for v in values], [None] * 3)
+    assert staged.m2_max_temp == pytest.approx(0.02, rel=1e-6)
+    assert staged.m2_min_temp == pytest.approx(0.02, rel=1e-6)
+    assert staged._asdict() == pytest.approx(dict(zip(staged._fields, expected[0], strict=True)))
+
+
+def test_load_data__workers(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+):
+    """Parsing in a process pool loads the same rows, ids included, as a serial load."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, workers=2)
+
+        with engine.connect() as connection:
+            df_station_data = pd.read_sql("station_data", con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data)
+    finally:
+        remove_files(dir)
+
+
+def test_parse_station_data():
+    """Missing value sentinels are masked and dates decoded."""
+    batch = parse_station_data(b"19850101\t1\t0\t-9999\n19850102\t-9999\t-2\t4\n", "USC00331541")
+
+    assert batch.date.tolist() == [datetime(1985, 1, 1).date(), datetime(1985, 1, 2).date()]
+    assert batch.column("max_temp") == [1, None]
+    assert batch.column("total_precip") == [None, 4]
+    assert batch.rows()[0] == ("USC00331541", datetime(1985, 1, 1).date(), 1, 0, None)
+
+    # blank lines, CRLF line ends and a last line without one are whole rows
+    batch = parse_station_data(b"\n19850101 1 0 1\r\n\r\n19850102 2 0 1", "USC00331541")
+    assert batch.column("max_temp") == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(b"19850101 1 2", id="missing column"),
+        pytest.param(b"19850231 1 2 3", id="invalid date"),
+        pytest.param(b"19850101 1 2 x", id="not a number"),
+        # three values then five: reshaped as rows of four, every date would still be valid
+        pytest.param(b"19850101 1 2\n0 19850102 3 4 5\n", id="misaligned columns"),
+    ],
+)
+def test_parse_station_data__invalid(data: bytes):
+    with pytest.raises(ValueError):
+        parse_station_data(data, "USC00331541")
+
+
+def test_parse_station_stream():
+    """Rows split across blocks parse the same as the whole content."""
+    data = b"19850101\t1\t0\t-9999\n19850102\t-9999\t-2\t4\n19850103\t3\t1\t0"
+    expected = parse_station_data(data, "USC00331541")
+    batch = parse_station_stream(io.BytesIO(data), "USC00331541", block_size=7)
+
+    assert batch.rows() == expected.rows()
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz", ".zst", ".tar", ".tar.gz", ".tar.zst"])
+def test_load_data__compressed(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    suffix: str,
+):
+    """Compressed station files and tar bundles load the same as plain files."""
+    if suffix.endswith(".zst"):
+        zstandard = pytest.importorskip("zstandard")
+    compress = {
+        "": lambda data: data,
+        ".gz": gzip.compress,
+        ".bz2": bz2.compress,
+        ".xz": lzma.compress,
+        ".zst": lambda data: zstandard.ZstdCompressor().compress(data),
+    }
+    try:
+        dir = here() / "tests/data"
+        files = get_files(str(dir))
+        if suffix.startswith(".tar"):
+            bundle = io.BytesIO()
+            with tarfile.open(fileobj=bundle, mode="w") as tar:
+                for f in files:
+                    tar.add(f, arcname=f"stations/{f.name}")
+            (dir / f"bundle{suffix}").write_bytes(compress[suffix[4:]](bundle.getvalue()))
+        else:
+            for f in files:
+                f.with_name(f.name + suffix).write_bytes(compress[suffix](f.read_bytes()))
+        for f in files:
+            f.unlink()
+
+        load_main(data_dir=str(dir), db=SQLALCHEMY_DATABASE_URL)
+        with engine.connect() as connection:
+            df_station_data = pd.read_sql("station_data", con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data)
+    finally:
+        remove_files(dir)
+
+
+def test_load_data__incremental(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    capsys: pytest.CaptureFixture,
+):
+    """A rerun skips unchanged files and only loads rows appended to a file."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, incremental=True)
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, incremental=True)
+        assert "Skipping 2 unchanged files" in capsys.readouterr().out
+
+        with open(here() / "tests/data/USC00331541.txt", "a") as f:
+            f.write("19850104\t5\t-5\t0\n")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, incremental=True)
+        out = capsys.readouterr().out
+        assert "Skipping 1 unchanged files" in out
+        assert "Loaded USC00331541.txt: 1 rows" in out
+
+        # a second, older file of the same station does not move its watermark back
+        gz = here() / "tests/data/USC00331541.old.txt.gz"
+        gz.write_bytes(gzip.compress(b"19850101\t1\t0\t1\n"))
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, incremental=True)
+        assert "Skipping 2 unchanged files" in capsys.readouterr().out
+
+        with engine.connect() as connection:
+            df_station_data = pd.read_sql("station_data", con=connection)
+            assert len(df_station_data) == 7
+            df_manifest = pd.read_sql("ingest_manifest", con=connection)
+            assert sorted(df_manifest["station_id"]) == ["USC00123456", *["USC00331541"] * 2]
+            df_watermarks = pd.read_sql(
+                "SELECT * FROM ingest_watermarks ORDER BY station_id", con=connection
+            )
+            assert df_watermarks["station_id"].tolist() == ["USC00123456", "USC00331541"]
+            assert pd.to_datetime(df_watermarks["last_date"]).tolist() == [
+                datetime(1985, 1, 3),
+                datetime(1985, 1, 4),
+            ]
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("schema", ["v1", "v2", "clustered"])
+def test_load_data__records(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    schema: str,
+):
+    """Records from read_data load the same rows into every layout.
+
+    Schema v1 takes the multi-VALUES path; other layouts convert the records to parsed columns.
+    """
+    if schema != "v1":
+        request.getfixturevalue(f"schema_{schema}")
+    try:
+        dir = str(here() / "tests/data")
+        headers = ["date", "max_temp", "min_temp", "total_precip"]
+        for f in get_files(dir):
+            assert load_data(engine, read_data(f, headers=headers)) == 3
+
+        with engine.connect() as connection:
+            layout = station_layout(connection)
+            stmt = select(*layout.columns).select_from(layout.source).order_by(layout.id)
+            df_station_data = pd.read_sql(stmt, con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data, check_dtype=False)
+            changes = connection.execute(select(StationDataChange.year)).scalars().all()
+            assert changes == [1985, 1985]
+    finally:
+        remove_files(dir)
+
+
+def test_load_data__merge(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    capsys: pytest.CaptureFixture,
+):
+    """Merging loads the same rows and counts inserts, updates and unchanged rows."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=True)
+        assert "Merged rows: 6 inserted, 0 updated, 0 unchanged" in capsys.readouterr().out
+
+        with open(here() / "tests/data/USC00331541.txt", "w") as f:
+            f.write("19850101\t1\t0\t1\n19850102\t3\t-2\t4\n19850104\t5\t-5\t0\n")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=True)
+        out = capsys.readouterr().out
+        assert "Loaded USC00331541.txt: 1 inserted, 1 updated, 1 unchanged" in out
+        assert "Merged rows: 1 inserted, 1 updated, 4 unchanged" in out
+
+        with engine.connect() as connection:
+            df_station_data = pd.read_sql("station_data", con=connection, parse_dates=["date"])
+            assert_frame_equal(
+                df_station_data.iloc[:6].drop(columns="max_temp"),
+                expected_station_data.drop(columns="max_temp"),
+            )
+            assert df_station_data["max_temp"].tolist() == [0, 0, 0, 1, 3, 0, 5]
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("schema", ["v1", "v2", "clustered"])
+def test_load_data__merge_duplicates(
+    client: Generator[TestClient, Any, None],
+    request: pytest.FixtureRequest,
+    create_files: None,
+    capsys: pytest.CaptureFixture,
+    schema: str,
+):
+    """A key repeated in a file is merged once, with the values of its last row."""
+    if schema != "v1":
+        request.getfixturevalue(f"schema_{schema}")
+    try:
+        dir = str(here() / "tests/data")
+        with open(here() / "tests/data/USC00331541.txt", "w") as f:
+            f.write("19850101\t1\t0\t1\n19850102\t2\t-2\t4\n19850101\t9\t0\t1\n")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=True)
+        out = capsys.readouterr().out
+        assert "Loaded USC00331541.txt: 2 inserted, 0 updated, 0 unchanged" in out
+
+        with engine.connect() as connection:
+            layout = station_layout(connection)
+            stmt = (
+                select(layout.date, layout.max_temp)
+                .select_from(layout.source)
+                .where(layout.station_id == "USC00331541")
+                .order_by(layout.date)
+            )
+            assert [(d.day, t) for d, t in connection.execute(stmt)] == [(1, 9), (2, 2)]
+            changes = connection.execute(select(StationDataChange.station_id)).scalars().all()
+            assert sorted(changes) == ["USC00123456", "USC00331541"]
+    finally:
+        remove_files(dir)
+
+
+def test_load_data__bulk(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+):
+    """A bulk load commits across files, rebuilds dropped indexes and gathers statistics."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, bulk=True, commit_rows=4)
+
+        with engine.connect() as connection:
+            df_station_data = pd.read_sql("station_data", con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data)
+
+            indexes = connection.exec_driver_sql("PRAGMA index_list('station_data')").all()
+            assert {index.name for index in StationData.__table__.indexes} <= {
+                index[1] for index in indexes
+            }
+            stats = connection.exec_driver_sql("SELECT tbl FROM sqlite_stat1").scalars().all()
+            assert "station_data" in stats
+    finally:
+        remove_files(dir)
+
+
+def test_load_summarize__postgres(
+    postgres_engine: Engine,
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    expected_summary_data: pd.DataFrame,
+):
+    """Loading copies into a staging table and merges; summaries use EXTRACT on PostgreSQL."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=postgres_engine.url.render_as_string(hide_password=False))
+        assert summarize_stations(engine=postgres_engine) == 2
+
+        with postgres_engine.connect() as connection:
+            df_station_data = pd.read_sql("station_data", con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data)
+            df_station_summary = pd.read_sql("station_summary", con=connection)
+            assert_frame_equal(df_station_summary, expected_summary_data)
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("method", ["sql", "numpy"])
+def test_summarize_data__incremental(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_summary_data: pd.DataFrame,
+    method: str,
+):
+    """Only the groups logged by the loader are recomputed, and the log is cleared."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        assert summarize_stations(engine=engine, method=method) == 2
+
+        with open(here() / "tests/data/USC00331541.txt", "w") as f:
+            f.write("19850101\t1\t0\t1\n19850102\t4\t-2\t4\n19850103\t0\t-9999\t1\n")
+            f.write("19860101\t5\t-5\t0\n")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=True)
+        with engine.connect() as connection:
+            df_changes = pd.read_sql("station_data_changes", con=connection)
+            assert df_changes.values.tolist() == [["USC00331541", 1985], ["USC00331541", 1986]]
+
+        assert summarize_stations(engine=engine, incremental=True, method=method) == 2
+
+        with engine.connect() as connection:
+            df_station_summary = pd.read_sql("station_summary", con=connection)
+            expected = pd.concat(
+                [
+                    expected_summary_data,
+                    pd.DataFrame(
+                        data={
+                            "id": [3],
+                            "station_id": ["USC00331541"],
+                            "year": [1986],
+                            "avg_max_temp": [5.0],
+                            "avg_min_temp": [-5.0],
+                            "cumulative_precip": [0.0],
+                            "n_max_temp": [1],
+                            "min_max_temp": [5.0],
+                            "max_max_temp": [5.0],
+                            "stddev_max_temp": [None],
+                            "n_min_temp": [1],
+                            "min_min_temp": [-5.0],
+                            "max_min_temp": [-5.0],
+                            "stddev_min_temp": [None],
+                            "n_precip": [1],
+                            "precip_days": [0],
+                        },
+                        dtype=object,
+                    ).astype(expected_summary_data.dtypes),
+                ],
+                ignore_index=True,
+            )
+            expected.loc[1, ["avg_max_temp", "max_max_temp", "stddev_max_temp"]] = [1.7, 4.0, 2.1]
+            assert_frame_equal(df_station_summary, expected)
+            assert pd.read_sql("station_data_changes", con=connection).empty
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_export(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    format: str,
+):
+    """Export writes every partition once, then only partitions whose rows changed."""
+    pytest.importorskip("pyarrow")
+    from pyarrow.dataset import field as ds_field
+
+    import scripts.export
+    from scripts.export import export, open_dataset
+
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+
+        counts = export(engine, tmp_path, format)
+        assert counts["station_data"] == {"written": 2, "removed": 0}
+        assert counts["station_summary"] == {"written": 2, "removed": 0}
+        assert (tmp_path / "station_data/station_id=USC00331541/year=1985").is_dir()
+
+        df = open_dataset(tmp_path).to_table().to_pandas()
+        df = df.sort_values("id", ignore_index=True)[expected_station_data.columns]
+        df["station_id"] = df["station_id"].astype(object)
+        df["date"] = pd.to_datetime(df["date"])
+        assert_frame_equal(df, expected_station_data, check_dtype=False)
+
+        assert export(engine, tmp_path, format)["station_data"] == {"written": 0, "removed": 0}
+
+        with open(here() / "tests/data/USC00331541.txt", "w") as f:
+            f.write("19860101\t5\t-5\t0\n")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        # a station removed outside the loader, which is logged by hand
+        (here() / "tests/data/USC00123456.txt").unlink()
+        with engine.begin() as connection:
+            connection.execute(delete(StationData).where(StationData.station_id == "USC00123456"))
+            stmt = upsert(StationExportChange.__table__, connection.dialect.name)
+            connection.execute(
+                stmt.on_conflict_do_nothing(), {"station_id": "USC00123456", "year": 1985}
+            )
+        counts = export(engine, tmp_path, format)
+        assert counts["station_data"] == {"written": 1, "removed": 1}
+        assert counts["station_summary"] == {"written": 0, "removed": 0}
+        assert not (tmp_path / "station_data/station_id=USC00123456").exists()
+
+        dataset = open_dataset(tmp_path)
+        assert dataset.count_rows() == 4
+        assert dataset.to_table(filter=ds_field("year") == 1986)["max_temp"].to_pylist() == [5.0]
+
+        # only the partitions of logged groups are hashed again, and changes that keep the
+        # count, sum and id-weighted sum of a partition are still exported
+        hashed = []
+        fingerprints = scripts.export.station_data_fingerprints
+
+        def record(connection, keys=None):
+            hashed.append(keys and [tuple(k) for k in keys])
+            return fingerprints(connection, keys)
+
+        monkeypatch.setattr(scripts.export, "station_data_fingerprints", record)
+        for max_temps in [(1, 2, 3), (2, 0, 4)]:
+            with open(here() / "tests/data/USC00331541.txt", "w") as f:
+                f.write("19860101\t5\t-5\t0\n")
+                f.writelines(f"1987010{day}\t{t}\t0\t0\n" for day, t in enumerate(max_temps, 1))
+            load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+            counts = export(engine, tmp_path, format)
+            assert counts["station_data"] == {"written": 1, "removed": 0}
+        assert hashed == [[("USC00331541", 1986), ("USC00331541", 1987)]] * 2
+        max_temps = open_dataset(tmp_path).to_table(filter=ds_field("year") == 1987)["max_temp"]
+        assert sorted(max_temps.to_pylist()) == [0.0, 2.0, 4.0]
+        with engine.connect() as connection:
+            assert not connection.execute(select(StationExportChange)).all()
+    finally:
+        remove_files(dir)
+
+
+def test_load_data__watch(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    expected_summary_data: pd.DataFrame,
+):
+    """Complete files are loaded with their summaries in one batch; partial or fresh files wait."""
+    try:
+        dir = str(here() / "tests/data")
+        watch_dir(engine, dir, interval=0, settle=0, polls=1)
+        with engine.connect() as connection:
+            df_station_data = pd.read_sql("station_data", con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data)
+            df_station_summary = pd.read_sql("station_summary", con=connection)
+            assert_frame_equal(df_station_summary, expected_summary_data)
+            assert pd.read_sql("station_data_changes", con=connection).empty
+
+        new_file = here() / "tests/data/USC00999999.txt"
+        with open(new_file, "w") as f:
+            f.write("19860101\t5\t-5\t0\n19860102\t3")
+        watch_dir(engine, dir, interval=0, settle=0, polls=1)
+        with open(new_file, "a") as f:
+            f.write("\t-3\t0\n")
+        watch_dir(engine, dir, interval=0, settle=60, polls=1)
+        with engine.connect() as connection:
+            assert pd.read_sql("station_data", con=connection).shape[0] == 6
+
+        watch_dir(engine, dir, interval=0, settle=0, polls=2)
+        with engine.connect() as connection:
+            assert pd.read_sql("station_data", con=connection).shape[0] == 8
+            df_station_summary = pd.read_sql(
+                "SELECT * FROM station_summary WHERE station_id = 'USC00999999'", con=connection
+            )
+            assert df_station_summary[["year", "avg_max_temp"]].values.tolist() == [[1986, 4.0]]
+    finally:
+        remove_files(dir)
+
+
+def test_load_data__report(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture,
+):
+    """The run report and JSON log lines carry per-file and total stage timings."""
+    try:
+        dir = str(here() / "tests/data")
+        report_path = tmp_path / "report.json"
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, report=str(report_path), log_json=True)
+
+        report = json.loads(report_path.read_text())
+        assert report["run"] == "load"
+        assert report["rows"] == 6
+        assert report["touched"] == 6
+        assert {"compile", "parse", "convert", "write", "log_changes", "commit"} <= set(
+            report["stages"]
+        )
+        assert [f["file"] for f in report["files"]] == ["USC00123456.txt", "USC00331541.txt"]
+        assert all(f["rows"] == 3 and f["rows_per_sec"] > 0 for f in report["files"])
+        assert "compile" not in report["files"][0]["stages"]
+
+        lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+        assert [line["event"] for line in lines] == ["file", "file", "report"]
+
+        telemetry = Telemetry("summarize")
+        summarize_stations(engine=engine, telemetry=telemetry)
+        assert telemetry.report(rows=2)["stages"].keys() == {
+            "aggregate",
+            "rollup",
+            "clear_changes",
+            "commit",
+        }
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize(
+    "merge,method",
+    [pytest.param(False, "sql", id="upsert"), pytest.param(True, "numpy", id="merge")],
+)
+def test_load_summarize__schema_v2(
+    client: Generator[TestClient, Any, None],
+    schema_v2: None,
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    expected_summary_data: pd.DataFrame,
+    merge: bool,
+    method: str,
+):
+    """Schema v2 stores station keys, day numbers and integers but reads as station_data."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=merge)
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=merge)
+        assert summarize_stations(engine=engine, method=method) == 2
+
+        with engine.connect() as connection:
+            layout = station_layout(connection)
+            assert layout.version == 2
+            stmt = select(*layout.columns).select_from(layout.source).order_by(layout.id)
+            df_station_data = pd.read_sql(stmt, con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data, check_dtype=False)
+            df_station_summary = pd.read_sql("station_summary", con=connection)
+            assert_frame_equal(df_station_summary, expected_summary_data)
+            raw = connection.exec_driver_sql("SELECT * FROM station_observations").first()
+            assert raw == (1, 1, 5479, 0, -1, 2)
+    finally:
+        remove_files(dir)
+
+
+def test_migrate(
+    client: Generator[TestClient, Any, None],
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    expected_summary_data: pd.DataFrame,
+):
+    """A schema v1 database is carried over to schema v2 and keeps loading and summarizing."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL)
+        summarize_stations(engine=engine)
+        assert migrate(engine) == 6
+        assert not inspect(engine).has_table("station_data")
+
+        with engine.connect() as connection:
+            layout = station_layout(connection)
+            stmt = select(*layout.columns).select_from(layout.source).order_by(layout.id)
+            df_station_data = pd.read_sql(stmt, con=connection, parse_dates=["date"])
+            assert_frame_equal(df_station_data, expected_station_data, check_dtype=False)
+
+        with open(here() / "tests/data/USC00331541.txt", "a") as f:
+            f.write("19860101\t5\t-5\t0\n")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=True)
+        assert summarize_stations(engine=engine, incremental=True) == 2
+        with engine.connect() as connection:
+            df_station_summary = pd.read_sql("station_summary", con=connection)
+            assert_frame_equal(df_station_summary.iloc[:2], expected_summary_data)
+            assert df_station_summary["year"].tolist() == [1985, 1985, 1986]
+
+        with pytest.raises(ValueError):
+            migrate(engine)
+    finally:
+        remove_files(dir)
+
+
+@pytest.mark.parametrize(
+    "merge", [pytest.param(False, id="upsert"), pytest.param(True, id="merge")]
+)
+def test_load_summarize__clustered(
+    client: Generator[TestClient, Any, None],
+    schema_clustered: int,
+    create_files: None,
+    expected_station_data: pd.DataFrame,
+    expected_summary_data: pd.DataFrame,
+    merge: bool,
+):
+    """Clustered tables number new rows as rowid tables would, and stay clustered on v2."""
+    try:
+        dir = str(here() / "tests/data")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=merge)
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=merge)
+        assert summarize_stations(engine=engine) == 2
+        assert summarize_stations(engine=engine) == 2
+
+        with engine.connect() as connection:
+            layout = station_layout(connection)
+            assert layout.clustered
+            df_station_data = pd.read_sql(
+                select(StationData).order_by(StationData.id), con=connection, parse_dates=["date"]
+            )
+            assert_frame_equal(df_station_data, expected_station_data, check_dtype=False)
+            df_station_summary = pd.read_sql("station_summary", con=connection)
+            assert_frame_equal(df_station_summary, expected_summary_data)
+
+        with open(here() / "tests/data/USC00331541.txt", "a") as f:
+            f.write("19860101\t5\t-5\t0\n")
+        load_main(data_dir=dir, db=SQLALCHEMY_DATABASE_URL, merge=merge)
+        summarize_stations(engine=engine, incremental=True)
+        with engine.connect() as connection:
+            new_id = connection.scalar(
+                select(StationData.id).where(StationData.date == datetime(1986, 1, 1).date())
+            )
+            # a merge only numbers new rows; an upsert reserves ids for every row it writes
+            assert new_id == (7 if merge else 19)
+            df_station_summary = pd.read_sql("station_summary", con=connection)
+            assert df_station_summary["id"].tolist() == [1, 2, 3]
+
+        assert migrate(engine) == 7
+        with engine.connect() as connection:
+            layout = station_layout(connection)
+            assert (layout.version, layout.clustered) == (2, True)
+            stmt = select(*layout.columns).select_from(layout.source).order_by(layout.id)
+            df_migrated = pd.read_sql(stmt, con=connection, parse_dates=["date"])
+            assert_frame_equal(df_migrated.iloc[:6], expected_station_data, check_dtype=False)
+    finally:
+        remove_files(dir)